@@ -3,10 +3,29 @@ from typing import Iterable
 import uuid
 import bpy
 
+# Custom property of the world storing the last background set by this module
+BACKGROUND_SIGNATURE_KEY = '_bp_bg_sig'
+
+def _background_signature(kind: str, *values) -> str:
+    """Identifier of a background configuration."""
+    return repr((kind,) + tuple(values))
+
+def clear_background_signature(world: bpy.types.World) -> None:
+    """Forget the background set by this module, call it when the world nodes are rebuilt elsewhere."""
+    world.pop(BACKGROUND_SIGNATURE_KEY, None)
+
+def _is_background_set(scene: bpy.types.Scene, signature: str) -> bool:
+    """Check if the world of the scene already has the given background."""
+    return scene.world.get(BACKGROUND_SIGNATURE_KEY) == signature
+
 def set_hdri_background(scene: bpy.types.Scene,
                         hdri_image_path: str,) -> None:
     """Set the background image to the given image path."""
 
+    signature = _background_signature('hdri', hdri_image_path)
+    if _is_background_set(scene, signature):
+        return
+
     # Get the environment node tree of the current scene
     node_tree = scene.world.node_tree
     tree_nodes = node_tree.nodes
@@ -19,8 +38,10 @@ def set_hdri_background(scene: bpy.types.Scene,
 
     # Add Environment Texture node
     node_environment = tree_nodes.new('ShaderNodeTexEnvironment')
-    # Load and assign the image to the node property
-    node_environment.image = bpy.data.images.load(hdri_image_path)
+    # Load and assign the image to the node property, reusing it if it was already loaded
+    hdri_image = bpy.data.images.load(hdri_image_path, check_existing=True)
+    hdri_image.use_fake_user = True  # keep it loaded between scene rebuilds
+    node_environment.image = hdri_image
     node_environment.location = -300, 0
 
     # Add Output node
@@ -33,10 +54,16 @@ def set_hdri_background(scene: bpy.types.Scene,
     links.new(node_environment.outputs["Color"], node_background.inputs["Color"])
     links.new(node_background.outputs["Background"], node_output.inputs["Surface"])
 
+    scene.world[BACKGROUND_SIGNATURE_KEY] = signature
+
 def set_pastel_background(scene: bpy.types.Scene,
                           color: Iterable = (0.01, 0.01, 0.01, 0.1)) -> None:
     """Set the background to a pastel color."""
 
+    signature = _background_signature('pastel', *map(float, color))
+    if _is_background_set(scene, signature):
+        return
+
     # Get the environment node tree of the current scene
     node_tree = scene.world.node_tree
     tree_nodes = node_tree.nodes
@@ -58,6 +85,8 @@ def set_pastel_background(scene: bpy.types.Scene,
     links = node_tree.links
     links.new(node_background.outputs["Background"], node_output.inputs["Surface"])
 
+    scene.world[BACKGROUND_SIGNATURE_KEY] = signature
+
 def set_solid_color_background(scene: bpy.types.Scene,
                                base_color: Iterable = (0.01, 0.01, 0.01, 0.1)) -> None:
     """Create a solid material background
@@ -69,6 +98,9 @@ def set_solid_color_background(scene: bpy.types.Scene,
             Default is (0.6, 0.6, 0.6, 1.0).
     """
 
+    signature = _background_signature('solid', *map(float, base_color))
+    if _is_background_set(scene, signature):
+        return
 
     # Create unique name
     name = 'Background_Texture_' + str(uuid.uuid4())
@@ -109,3 +141,5 @@ def set_solid_color_background(scene: bpy.types.Scene,
     # Environment_[Color] -> [Color]_Background_[Background] --> [Surface]_World
     links.new(node_environment.outputs["Color"], node_background.inputs["Color"])
     links.new(node_background.outputs["Background"], node_output.inputs["Surface"])
+
+    scene.world[BACKGROUND_SIGNATURE_KEY] = signature
@@ -1,8 +1,74 @@
+import os
+import pathlib
+from typing import Optional
+
 import bpy
+import numpy as np
 
 from .materials import create_solid_material
 from .movement import set_world_pose
 
+# Layout of a triangle record in a binary STL file
+STL_TRIANGLE_DTYPE = np.dtype([('normal', '<f4', (3,)),
+                               ('vertices', '<f4', (3, 3)),
+                               ('attribute', '<u2')])
+
+def read_binary_stl(filepath: str) -> Optional[np.ndarray]:
+    """Read the triangles of a binary STL file.
+
+    Args:
+        filepath (str): Filepath of the STL file.
+
+    Returns:
+        Optional[np.ndarray]: (N, 3, 3) array with the vertices of each triangle, or None
+            if the file is not a binary STL (e.g. an ASCII STL).
+    """
+    with open(filepath, 'rb') as file:
+        header = file.read(84)
+
+    if len(header) < 84:
+        return None
+
+    n_triangles = int(np.frombuffer(header, dtype='<u4', count=1, offset=80)[0])
+
+    # ASCII files do not match the size of the binary layout
+    if os.path.getsize(filepath) != 84 + n_triangles * STL_TRIANGLE_DTYPE.itemsize:
+        return None
+
+    triangles = np.fromfile(filepath, dtype=STL_TRIANGLE_DTYPE, count=n_triangles, offset=84)
+
+    return triangles['vertices']
+
+def create_mesh_from_triangles(name: str, triangles: np.ndarray) -> bpy.types.Mesh:
+    """Create a mesh from a triangle soup, merging the shared vertices.
+
+    Args:
+        name (str): Name of the mesh.
+        triangles (np.ndarray): (N, 3, 3) array with the vertices of each triangle.
+
+    Returns:
+        bpy.types.Mesh: The created mesh.
+    """
+    n_triangles = len(triangles)
+    vertices, loop_vertices = np.unique(triangles.reshape(-1, 3), axis=0, return_inverse=True)
+
+    mesh = bpy.data.meshes.new(name)
+
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set('co', vertices.astype(np.float32).ravel())
+
+    mesh.loops.add(3 * n_triangles)
+    mesh.loops.foreach_set('vertex_index', loop_vertices.astype(np.int32).ravel())
+
+    mesh.polygons.add(n_triangles)
+    mesh.polygons.foreach_set('loop_start', np.arange(0, 3 * n_triangles, 3, dtype=np.int32))
+    mesh.polygons.foreach_set('loop_total', np.full(n_triangles, 3, dtype=np.int32))
+
+    mesh.update()
+    mesh.validate()
+
+    return mesh
+
 def import_stl(filepath: str,
                scale: float = 1.0,
                location: tuple = (0.0, 0.0, 0.0),
@@ -10,6 +76,9 @@ def import_stl(filepath: str,
                color: tuple = (1.0, 1.0, 1.0, 1.0)) -> bpy.types.Object:
     """Import an STL file.
 
+    Binary files are loaded directly into a mesh, ASCII files go through the
+    blender STL importer.
+
     Args:
         filepath (str): Filepath of the STL file.
         scale (float): Scale of the imported object.
@@ -21,8 +90,15 @@ def import_stl(filepath: str,
         bpy_types.Object: Imported object.
     """
 
-    bpy.ops.import_mesh.stl(filepath=filepath)
-    stl_mesh = bpy.context.object
+    triangles = read_binary_stl(filepath)
+    if triangles is not None:
+        name = pathlib.Path(filepath).stem
+        stl_mesh = bpy.data.objects.new(name, create_mesh_from_triangles(name, triangles))
+        bpy.context.collection.objects.link(stl_mesh)
+    else:
+        bpy.ops.import_mesh.stl(filepath=filepath)
+        stl_mesh = bpy.context.object
+
     stl_mesh.data.materials.append(create_solid_material(color))
 
     set_world_pose(stl_mesh,
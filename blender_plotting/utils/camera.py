@@ -75,30 +75,51 @@ def point_at(obj: bpy.types.Object,
     tracker, rotator = (('-Z', 'Y'),'Z') if obj.type=='CAMERA' else (('X', 'Z'),'Y')
     quat = direction.to_track_quat(*tracker)
 
+    # Without roll the track rotation can be written directly to the rotation channel
+    if roll == 0 and obj.parent is None and obj.rotation_mode != 'AXIS_ANGLE':
+        if obj.rotation_mode == 'QUATERNION':
+            obj.rotation_quaternion = quat
+        else:
+            obj.rotation_euler = quat.to_euler(obj.rotation_mode)
+        return
+
     # /usr/share/blender/scripts/addons/add_advanced_objects_menu/arrange_on_curve.py
     quat = quat.to_matrix().to_4x4()
     roll_matrix = mathutils.Matrix.Rotation(roll, 4, rotator)
 
     # remember the current location, since assigning to obj.matrix_world changes it
     loc = loc.to_tuple()
+    # keep the scale, like the rotation-only path above
+    scale_matrix = mathutils.Matrix.Diagonal(obj.matrix_world.to_scale()).to_4x4()
     #obj.matrix_world = quat * rollMatrix
     # in blender 2.8 and above @ is used to multiply matrices
     # using * still works but results in unexpected behaviour!
-    obj.matrix_world = quat @ roll_matrix
+    obj.matrix_world = quat @ roll_matrix @ scale_matrix
     obj.location = loc
 
-def get_perspective(camera):
+def get_perspective(camera,
+                    depsgraph: Optional[bpy.types.Depsgraph] = None,
+                    render: Optional[bpy.types.RenderSettings] = None):
     """Compute projection matrix of blender camera.
 
     Arguments:
         camera {bpy.types.Camera} -- Blender camera.
+        depsgraph {bpy.types.Depsgraph} -- Evaluated depsgraph. Defaults to the one of
+            the current context. Pass it when computing many projections.
+        render {bpy.types.RenderSettings} -- Render settings. Defaults to the ones of
+            the current scene.
 
     Returns:
         mathutils.Matrix -- Projection matrix.
     """
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    if render is None:
+        render = bpy.context.scene.render
+
     return camera.calc_matrix_camera(
-        depsgraph=bpy.context.evaluated_depsgraph_get(),
-        x=bpy.context.scene.render.resolution_x,
-        y=bpy.context.scene.render.resolution_y,
-        scale_x=bpy.context.scene.render.pixel_aspect_x,
-        scale_y=bpy.context.scene.render.pixel_aspect_y)
+        depsgraph=depsgraph,
+        x=render.resolution_x,
+        y=render.resolution_y,
+        scale_x=render.pixel_aspect_x,
+        scale_y=render.pixel_aspect_y)
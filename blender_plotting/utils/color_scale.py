@@ -52,28 +52,42 @@ COMMON_SCALES = {
 
 def squaredlerp(points, t):
     """Returns the squared linear interpolation of the points.
+
+    Args:
+        points: The colors to interpolate between.
+        t: Interpolation value in [0, 1]. Either a scalar or an array of values.
     """
     points = np.asarray(points)
-    N = len(points) - 1
+    return _squaredlerp_sq(points**2, t)
+
+
+def _squaredlerp_sq(points_sq, t):
+    """Squared linear interpolation from the already squared points."""
+    N = len(points_sq) - 1
     if N == 0:
-        return points[0]
+        if np.ndim(t) == 0:
+            return np.sqrt(points_sq[0])
+        return np.tile(np.sqrt(points_sq[0]), (len(t), 1))
 
-    for i, a in enumerate(np.linspace(0,1,N+1)):
-        if t <= a + 1/N:
-            delta = t - a
-            delta = np.clip(delta / (1/N), 0, 1)  # prevent floating point errors
-            if delta < 0:
-                raise ValueError(f't is out of range: t: {t}, a: {a}, delta: {delta}')
-            p = np.sqrt((1-delta)*points[i]**2 + delta*points[i+1]**2)
-            break
+    if np.ndim(t) == 0:
+        # Scalar path: plain python arithmetic to find the segment
+        idx = min(max(int(t*N), 0), N-1)
+        delta = min(max(t*N - idx, 0), 1)  # prevent floating point errors
+        return np.sqrt((1-delta)*points_sq[idx] + delta*points_sq[idx+1])
 
-    return p
+    t = np.asarray(t)
+    idx = np.clip((t*N).astype(np.intp), 0, N-1)
+    delta = np.clip(t*N - idx, 0, 1)[:, None]  # prevent floating point errors
+    return np.sqrt((1-delta)*np.take(points_sq, idx, axis=0) + delta*np.take(points_sq, idx+1, axis=0))
 
 
 # create color map
 class ColorScale():
     """Class to convert a scalar value in a range to a color."""
 
+    # Number of precomputed colors in the lookup table
+    LUT_SIZE = 1024
+
     def __init__(self,
                  min_value: float = 0,
                  max_value: float = 1,
@@ -107,6 +121,14 @@ class ColorScale():
         if invert:
             self.colors = self.colors[::-1]
 
+        # squared colors used by the interpolation
+        self.colors_sq = self.colors**2
+
+        # precomputed colors, sampled uniformly over the normalized range
+        self._lut = _squaredlerp_sq(self.colors_sq, np.linspace(0, 1, self.LUT_SIZE))
+        self._lut_hex = ['#{:02x}{:02x}{:02x}'.format(int(r*255), int(g*255), int(b*255))
+                         for r, g, b in self._lut]
+
     def get_color(self,
                   value,
                   ret_type='rgb'):
@@ -131,12 +153,46 @@ class ColorScale():
         # normalize the value
         value = (value - self.min_value) / (self.max_value - self.min_value)
 
-        # Interpolate between the colors
-        rgb_color = squaredlerp(self.colors, value)
+        # Look up the interpolated color
+        lut_index = int(value * (self.LUT_SIZE - 1) + 0.5)
+        if ret_type == 'hex':
+            return self._lut_hex[lut_index]
+        rgb_color = self._lut[lut_index].copy()
 
         # return the color
         return self.__as_color_type(rgb_color, ret_type)
 
+    def get_colors(self,
+                   values,
+                   ret_type='rgb'):
+        """
+        Convert an array of scalar values to colors in one pass.
+
+        Args:
+            values (np.ndarray): values to convert
+            ret_type (str): 'rgb', 'hsv', or 'hex'
+
+        Returns:
+            np.ndarray: (N, 3) array of RGB colors if ret_type is 'rgb',
+                otherwise a list with one color per value.
+        """
+
+        # make sure the values are in the range
+        values = np.clip(np.asarray(values, dtype=float), self.min_value, self.max_value)
+
+        # normalize the values
+        values = (values - self.min_value) / (self.max_value - self.min_value)
+
+        # Look up the interpolated colors
+        lut_indices = np.rint(values.ravel() * (self.LUT_SIZE - 1)).astype(np.intp)
+        if ret_type == 'hex':
+            return [self._lut_hex[i] for i in lut_indices]
+        rgb_colors = self._lut[lut_indices]
+
+        if ret_type == 'rgb':
+            return rgb_colors
+        return [self.__as_color_type(rgb_color, ret_type) for rgb_color in rgb_colors]
+
     def __as_color_type(self, rgb_color, ret_type='rgb'):
         r = rgb_color[0]
         g = rgb_color[1]
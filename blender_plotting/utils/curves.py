@@ -1,16 +1,49 @@
-from typing import Callable, List, Tuple
+from typing import Callable, List, Optional, Tuple
 
 import bpy
 import numpy as np
 
 from .materials import create_solid_material
+from .shapes import create_uv_sphere_mesh
+from .utils import deferred_scene_update
+
+def _instance_on_points(points: List[Tuple[float, float, float]],
+                       mesh: bpy.types.Mesh,
+                       collection: bpy.types.Collection,
+                       name: str = 'instances') -> bpy.types.Object:
+    """Instances a mesh on every point using vertex instancing.
+
+    Creates a single object whose vertices are the points, with an object of the given
+    mesh as its child instanced on each vertex.
+
+    Returns:
+        bpy.types.Object: The object holding the points.
+    """
+    coords = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+
+    points_mesh = bpy.data.meshes.new(name)
+    points_mesh.vertices.add(len(coords))
+    points_mesh.vertices.foreach_set('co', coords.ravel())
+
+    instancer = bpy.data.objects.new(name, points_mesh)
+    instancer.instance_type = 'VERTS'
+
+    instance = bpy.data.objects.new(name + '_instance', mesh)
+    instance.parent = instancer
+
+    collection.objects.link(instancer)
+    collection.objects.link(instance)
+
+    return instancer
 
 def draw_polyline(points: List[Tuple[float, float, float]],
                   color: Tuple[float, float, float, float] = (1, 0, 0, 1.0),
                   thickness: float = 0.01,
                   draw_markers: bool = False,
                   marker_radius: float = 0.05,
-                  draw_line: bool = True):
+                  draw_line: bool = True,
+                  instance_markers: bool = False,
+                  collection: Optional[bpy.types.Collection] = None):
     """Draws a line along a list of points.
 
     Args:
@@ -22,13 +55,23 @@ def draw_polyline(points: List[Tuple[float, float, float]],
             Defaults to False.
         marker_radius (float): Radius of the markers. Defaults to 0.05.
         draw_line (bool): Whether to draw the line. Defaults to True.
+        instance_markers (bool): Draw all the markers as instances of a single sphere on
+            the vertices of one object, instead of one object per marker. Defaults to False.
+        collection (Optional[bpy.types.Collection]): Collection to link the objects to.
+            Defaults to the collection of the first scene.
 
     Returns:
-        Tupel[bpy.types.Object, bpy.types.Object]: The line and markers.
+        Tupel[bpy.types.Object, bpy.types.Object]: The line and markers. With
+            instance_markers the markers list only holds the instancing object.
     """
     bpy_curve = None
     bpy_points = None
 
+    mat = create_solid_material(color)
+
+    if collection is None:
+        collection = bpy.data.scenes[0].collection
+
     if draw_line:
         curve_data = bpy.data.curves.new('crv', 'CURVE')
         curve_data.dimensions = '3D'
@@ -38,22 +81,74 @@ def draw_polyline(points: List[Tuple[float, float, float]],
 
         spline = curve_data.splines.new(type='POLY')
         spline.points.add(len(points) - 1)
-        for p, new_co in zip(spline.points, points):
-            p.co = (list(new_co) + [1.0])
+        # (x, y, z, w) coordinates written in a single call
+        coords = np.ones((len(points), 4), dtype=np.float32)
+        coords[:, :3] = np.asarray(points, dtype=np.float32)
+        spline.points.foreach_set('co', coords.ravel())
         bpy_curve = bpy.data.objects.new('object_name', curve_data)
-        bpy_curve.data.materials.append(create_solid_material(color))
-        bpy.data.scenes[0].collection.objects.link(bpy_curve)
+        bpy_curve.data.materials.append(mat)
+        collection.objects.link(bpy_curve)
 
     if draw_markers:
-        bpy_points = []
-        for point in points:
-            bpy.ops.mesh.primitive_uv_sphere_add(radius=marker_radius, location=point)
-            point = bpy.context.active_object
-            point.data.materials.append(create_solid_material(color))
-            bpy_points.append(point)
+        # All the markers share the same sphere mesh and material
+        marker_mesh = create_uv_sphere_mesh(radius=marker_radius, name='marker')
+        marker_mesh.materials.append(mat)
+
+        with deferred_scene_update():
+            if instance_markers:
+                bpy_points = [_instance_on_points(points, marker_mesh, collection, name='markers')]
+            else:
+                bpy_points = []
+                for i, point in enumerate(points):
+                    marker = bpy.data.objects.new(f'marker_{i}', marker_mesh)
+                    marker.location = point
+                    bpy_points.append(marker)
+
+                # link all the markers in one pass
+                collection_objects = collection.objects
+                for marker in bpy_points:
+                    collection_objects.link(marker)
 
     return bpy_curve, bpy_points
 
+def _sample_function(f: Callable[[float], float],
+                     xs: np.ndarray) -> np.ndarray:
+    """Evaluates the real function f at every x in xs.
+
+    f is called once with the whole array if it supports NumPy broadcasting,
+    otherwise it is called once per x.
+    """
+    try:
+        ys = np.asarray(f(xs), dtype=float)
+        if ys.shape == xs.shape and np.allclose(ys[:1], f(xs[0]), equal_nan=True):
+            return ys
+    except (TypeError, ValueError, IndexError):
+        pass
+
+    return np.fromiter((f(x) for x in xs), dtype=float, count=len(xs))
+
+def _sample_curve(f: Callable[[float], np.ndarray],
+                  ts: np.ndarray) -> np.ndarray:
+    """Evaluates the parametric curve f at every t in ts.
+
+    f is called once with the whole array if it supports NumPy broadcasting, returning
+    either one point per row or one coordinate per row. Otherwise it is called once per t.
+
+    Returns:
+        np.ndarray: (N, D) array with one point per t.
+    """
+    try:
+        first = np.asarray(f(ts[0]), dtype=float)
+        points = np.asarray(f(ts), dtype=float)
+        if points.shape == (len(ts),) + first.shape and np.allclose(points[0], first, equal_nan=True):
+            return points
+        if points.shape == first.shape + (len(ts),) and np.allclose(points[..., 0], first, equal_nan=True):
+            return np.moveaxis(points, -1, 0)
+    except (TypeError, ValueError, IndexError):
+        pass
+
+    return np.asarray([f(t) for t in ts], dtype=float)
+
 def draw_function(f: Callable[[float], float],
                   x_min: float = -1,
                   x_max: float = 1,
@@ -63,7 +158,8 @@ def draw_function(f: Callable[[float], float],
     """Creates a curve following the function f.
 
     Args:
-        f (Callable[[float], float]): Function to draw.
+        f (Callable[[float], float]): Function to draw. If it supports NumPy
+            broadcasting it is evaluated for all the x values in a single call.
         x_min (float): Minimum x value.
         x_max (float): Maximum x value.
 
@@ -71,9 +167,11 @@ def draw_function(f: Callable[[float], float],
         bpy.types.Object: The curve.
     """
 
-    coords_list = [[x, f(x), 0] for x in np.linspace(x_min, x_max, resolution)]
+    xs = np.linspace(x_min, x_max, resolution)
+    ys = _sample_function(f, xs)
+    coords = np.column_stack((xs, ys, np.zeros_like(xs)))
 
-    return draw_polyline(coords_list,
+    return draw_polyline(coords,
                          color=color,
                          thickness=thickness,
                          draw_markers=False,
@@ -88,7 +186,8 @@ def draw_parametric_curve(f: Callable[[float], np.ndarray],
     """Draws a parametric curve.
 
     Args:
-        f (Callable[[float], np.ndarray]): Parametric curve.
+        f (Callable[[float], np.ndarray]): Parametric curve. If it supports NumPy
+            broadcasting it is evaluated for all the t values in a single call.
         t_min (float): Minimum t value.
         t_max (float): Maximum t value.
         resolution (int): Resolution of the curve. Defaults to 10.
@@ -97,9 +196,10 @@ def draw_parametric_curve(f: Callable[[float], np.ndarray],
         bpy.types.Object: The curve.
     """
 
-    points_list = [list(f(t)) for t in np.linspace(t_min, t_max, resolution)]
+    ts = np.linspace(t_min, t_max, resolution)
+    points = _sample_curve(f, ts)
 
-    return draw_polyline(points_list,
+    return draw_polyline(points,
                          color=color,
                          thickness=thickness,
                          draw_markers=False,
@@ -1,13 +1,80 @@
-
+import functools
+import os
 import subprocess
+import tempfile
+
+# ffmpeg output options for each h264 encoder, in order of preference
+H264_ENCODER_OPTIONS = {
+    'h264_nvenc': ['-c:v', 'h264_nvenc', '-preset', 'p4', '-cq', '25'],
+    'h264_qsv': ['-c:v', 'h264_qsv', '-global_quality', '23'],
+    'libx264': ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '25', '-threads', '0'],
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_h264_encoder() -> str:
+    """
+    Get the preferred h264 encoder available in the installed ffmpeg.
+
+    Hardware encoders are preferred over libx264. The result is cached, ffmpeg is only
+    queried once.
+    """
+    try:
+        encoders = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'],
+                                  stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL,
+                                  text=True,
+                                  check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return 'libx264'
+
+    for encoder in H264_ENCODER_OPTIONS:
+        if f' {encoder} ' in encoders:
+            return encoder
+
+    return 'libx264'
 
 
 def avi2mp4(filepath_avi: str):
     """
     Convert an avi file to a mp4 file.
+
+    Uses a hardware h264 encoder if ffmpeg has one, falling back to libx264 if the
+    hardware encoder fails (e.g. listed by ffmpeg but no device present).
     """
     filepath_mp4 = filepath_avi.replace('.avi', '.mp4')
-    bash_command = f"ffmpeg -i {filepath_avi} -vcodec libx264 -crf 25 -pix_fmt yuv420p -y {filepath_mp4}"
-    process = subprocess.Popen(bash_command.split(), stdout=subprocess.PIPE)
-    process.communicate()
-    return filepath_mp4
\ No newline at end of file
+
+    def run_ffmpeg(encoder):
+        command = ['ffmpeg', '-i', filepath_avi, *H264_ENCODER_OPTIONS[encoder],
+                   '-pix_fmt', 'yuv420p', '-y', filepath_mp4]
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+    encoder = get_h264_encoder()
+    try:
+        run_ffmpeg(encoder)
+    except subprocess.CalledProcessError:
+        if encoder == 'libx264':
+            raise
+        run_ffmpeg('libx264')
+
+    return filepath_mp4
+
+
+def concat_videos(filepaths: list, filepath_out: str):
+    """
+    Concatenate videos with the same encoding into one file.
+
+    Uses the ffmpeg concat demuxer, the streams are copied without re-encoding.
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as file_list:
+        for filepath in filepaths:
+            file_list.write(f"file '{os.path.abspath(filepath)}'\n")
+
+    try:
+        command = ['ffmpeg', '-f', 'concat', '-safe', '0', '-i', file_list.name,
+                   '-c', 'copy', '-y', filepath_out]
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    finally:
+        os.remove(file_list.name)
+
+    return filepath_out
@@ -4,8 +4,9 @@ import bpy
 import numpy as np
 
 from .color_scale import ColorScale
-from .curves import draw_polyline
+from .curves import draw_function
 from .shapes import draw_arrow
+from .utils import deferred_scene_update
 
 def draw_real_function(f: Callable[[float], float],
                        x_min: float = -1,
@@ -26,13 +27,37 @@ def draw_real_function(f: Callable[[float], float],
     Returns:
         bpy.types.Object: The curve.
     """
-    coords_list = [[x, f(x), 0] for x in np.linspace(x_min, x_max, resolution)]
-
-    return draw_polyline(coords_list,
-                         color=color,
+    return draw_function(f,
+                         x_min=x_min,
+                         x_max=x_max,
+                         resolution=resolution,
                          thickness=thickness,
-                         draw_markers=False,
-                         draw_line=True)[0] # curve
+                         color=color)
+
+def _evaluate_vector_field(f: Callable[[float, float], Tuple[float, float]],
+                           X: np.ndarray,
+                           Y: np.ndarray) -> np.ndarray:
+    """Evaluates the vector field f over a grid.
+
+    f is first called once with the whole grid, which works for fields written with
+    NumPy broadcasting in mind. If that fails, or the result does not match a point-wise
+    evaluation, f is evaluated point by point.
+
+    Returns:
+        np.ndarray: (N, 2) array with the vector at each grid point, in the order of
+            X.ravel(), Y.ravel().
+    """
+    n_points = X.size
+    try:
+        vectors = np.asarray(f(X, Y), dtype=float)
+        vectors = vectors.reshape(2, n_points).T
+        # make sure the function actually broadcasts element-wise
+        if n_points > 0 and not np.allclose(vectors[0], f(X.flat[0], Y.flat[0])):
+            raise ValueError('f does not broadcast over the grid')
+    except (TypeError, ValueError):
+        vectors = [f(x, y) for x, y in zip(X.flat, Y.flat)]
+
+    return np.asarray(vectors, dtype=float).reshape(n_points, 2)
 
 def draw_vector_field(f: Callable[[float, float], Tuple[float, float]],
                       x_min: float = -1,
@@ -48,7 +73,8 @@ def draw_vector_field(f: Callable[[float, float], Tuple[float, float]],
     """Draws a vector field.
 
     Args:
-        f (Callable[[float, float], Tuple[float, float]]): Vector field.
+        f (Callable[[float, float], Tuple[float, float]]): Vector field. If it supports
+            NumPy broadcasting it is evaluated over the whole grid in a single call.
         x_min (float): Minimum x value.
         x_max (float): Maximum x value.
         y_min (float): Minimum y value.
@@ -62,21 +88,29 @@ def draw_vector_field(f: Callable[[float, float], Tuple[float, float]],
     color_scale = ColorScale(min_value=min_vector_magnitude,
                              max_value=max_vector_magnitude,
                              colors=colors)
-    x_res = np.int(np.floor((x_max - x_min) * resolution))
-    y_res = np.int(np.floor((y_max - y_min) * resolution))
+    x_res = int((x_max - x_min) * resolution)
+    y_res = int((y_max - y_min) * resolution)
     x_coords = np.linspace(x_min, x_max, x_res)
     y_coords = np.linspace(y_min, y_max, y_res)
 
-    coords_list = [[x, y] for x in x_coords for y in y_coords]
+    X, Y = np.meshgrid(x_coords, y_coords, indexing='ij')
+    origins = np.stack((X.ravel(), Y.ravel()), axis=-1)
+    vectors = _evaluate_vector_field(f, X, Y)
+    lengths = np.hypot(vectors[:, 0], vectors[:, 1])
+
+    # only draw the vectors above the minimum magnitude
+    mask = lengths > min_vector_magnitude
+    origins = origins[mask]
+    vectors = vectors[mask]
+    lengths = lengths[mask]
 
-    for origin in coords_list:
-        origin = np.asarray(origin)
-        vector = f(origin[0], origin[1])
-        length = np.linalg.norm(vector)
-        if length > min_vector_magnitude:
-            color=[0,0,0,1]
-            color[0], color[1], color[2]  = color_scale.get_color(length, ret_type='rgb')
-            draw_arrow(origin, origin+vector*vector_length/length,
+    # compute all the colors and arrow tips at once
+    colors = color_scale.get_colors(lengths, ret_type='rgb')
+    tips = origins + vectors * (vector_length / lengths)[:, None]
+
+    with deferred_scene_update():
+        for origin, tip, rgb_color in zip(origins, tips, colors):
+            color = [rgb_color[0], rgb_color[1], rgb_color[2], 1]
+            draw_arrow(origin, tip,
                       thickness=vector_thickness,
                       color=color)
-
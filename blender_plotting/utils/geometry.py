@@ -14,62 +14,215 @@ ACCEPTED_ROT_TYPES = (
     'matrix'
 )
 
+# Shared read-only identities, used as default origins
+_I3 = Matrix.Identity(3).freeze()
+_I4 = Matrix.Identity(4).freeze()
+
+def _q_to_mat(q4: np.ndarray) -> np.ndarray:
+    """Rotation matrix of a unit (w, x, y, z) quaternion."""
+    w, x, y, z = q4
+
+    return np.array([[1 - 2*(y*y + z*z), 2*(x*y - w*z), 2*(x*z + w*y)],
+                     [2*(x*y + w*z), 1 - 2*(x*x + z*z), 2*(y*z - w*x)],
+                     [2*(x*z - w*y), 2*(y*z + w*x), 1 - 2*(x*x + y*y)]])
+
+def _q_to_rotvec(q4: np.ndarray) -> np.ndarray:
+    """Rotation vector (axis * angle) of a unit (w, x, y, z) quaternion."""
+    w = q4[0]
+    v = np.asarray(q4[1:], dtype=np.float64)
+    v_norm = np.linalg.norm(v)
+
+    # same branch as numpy-quaternion's as_rotation_vector, angles in [0, 2 pi]
+    if v_norm < 1e-12:
+        # -1 is a full turn, numpy-quaternion puts it around x
+        return np.array([2 * np.pi, 0.0, 0.0]) if w < 0 else np.zeros(3)
+
+    return v * (2 * np.arctan2(v_norm, w) / v_norm)
+
+def _q_to_rotvec_batch(q: np.ndarray) -> np.ndarray:
+    """Rotation vectors of (..., 4) unit (w, x, y, z) quaternions, vectorized _q_to_rotvec."""
+    q = np.asarray(q, dtype=np.float64)
+
+    # same branch as numpy-quaternion's as_rotation_vector, angles in [0, 2 pi]
+    v = q[..., 1:]
+    v_norm = np.linalg.norm(v, axis=-1, keepdims=True)
+
+    angle = 2 * np.arctan2(v_norm, q[..., :1])
+    scale = np.divide(angle, v_norm, out=np.zeros_like(v_norm), where=v_norm >= 1e-12)
+    rot_vec = v * scale
+
+    # -1 is a full turn, numpy-quaternion puts it around x
+    full_turn = (v_norm[..., 0] < 1e-12) & (q[..., 0] < 0)
+    rot_vec[full_turn] = (2 * np.pi, 0.0, 0.0)
+
+    return rot_vec
+
+def _as_axis_angle(q4: np.ndarray) -> Tuple[np.ndarray, float]:
+    rot_vec = _q_to_rotvec(q4)
+    angle = np.linalg.norm(rot_vec)
+    if angle < 1e-12:
+        # identity, any axis is valid
+        return np.array([0.0, 0.0, 1.0]), 0.0
+    axis = rot_vec / angle
+    return axis, angle
+
+def _as_rigid_matrix(q4: np.ndarray) -> np.ndarray:
+    rigid_mat = np.identity(4)
+    rigid_mat[0:3, 0:3] = _q_to_mat(q4)
+    return rigid_mat
+
+def _as_euler_angles(q4: np.ndarray) -> np.ndarray:
+    return quat.as_euler_angles(quat.from_float_array(q4))
+
+def _as_float4(rot) -> np.ndarray:
+    """Get any rotation accepted by to_quaternion as a (w, x, y, z) array."""
+    if len(rot) != 2:
+        rot_np = np.asarray(rot, dtype=np.float64)
+        if rot_np.shape == (4,):
+            return rot_np
+
+    return quat.as_float_array(to_quaternion(rot, type='quat'))
+
+def qmul_conj_batch(q_a: np.ndarray, q_b: np.ndarray) -> np.ndarray:
+    """
+    Hamilton product q_a * conj(q_b) of (w, x, y, z) quaternions.
+
+    Works on single quaternions as well as on (N, 4) arrays, computed column-wise so NumPy
+    runs each term as one vectorized operation over all the quaternions.
+
+    Args:
+        q_a (np.ndarray): (..., 4) quaternions.
+        q_b (np.ndarray): (..., 4) quaternions.
+
+    Returns:
+        np.ndarray: (..., 4) products.
+    """
+    q_a = np.asarray(q_a, dtype=np.float64)
+    q_b = np.asarray(q_b, dtype=np.float64)
+    w1, x1, y1, z1 = q_a[..., 0], q_a[..., 1], q_a[..., 2], q_a[..., 3]
+    w2, x2, y2, z2 = q_b[..., 0], q_b[..., 1], q_b[..., 2], q_b[..., 3]
+
+    return np.stack([w1*w2 + x1*x2 + y1*y2 + z1*z2,
+                     -w1*x2 + x1*w2 - y1*z2 + z1*y2,
+                     -w1*y2 + x1*z2 + y1*w2 - z1*x2,
+                     -w1*z2 - x1*y2 + y1*x2 + z1*w2], axis=-1)
+
+# numpy-quaternion constructor for each rotation shape (4x4 matrices are cropped to 3x3)
+_FROM_DISPATCH = {
+    (3, 3): quat.from_rotation_matrix,
+    (3,): quat.from_rotation_vector,
+    (4,): quat.from_float_array,
+}
+
+# conversion of a (w, x, y, z) quaternion for each rot_type of as_rot_type
+_AS_DISPATCH = {
+    'quaternion': lambda q4: q4,
+    'euler_ZYZ': _as_euler_angles,
+    'rot_mat': _q_to_mat,
+    'rot_vec': _q_to_rotvec,
+    'axis_angle': _as_axis_angle,
+    'matrix': _as_rigid_matrix,
+}
+
+def _so3_log(rot: np.ndarray) -> np.ndarray:
+    """Logarithm map of SO(3), the rotation vector (axis * angle) of rotation matrices.
+
+    Args:
+        rot (np.ndarray): (..., 3, 3) rotation matrices.
+
+    Returns:
+        np.ndarray: (..., 3) rotation vectors.
+    """
+    rot = np.asarray(rot, dtype=np.float64)
+
+    cos_t = (np.einsum('...ii->...', rot) - 1) * 0.5
+    skew = np.stack([rot[..., 2, 1] - rot[..., 1, 2],
+                     rot[..., 0, 2] - rot[..., 2, 0],
+                     rot[..., 1, 0] - rot[..., 0, 1]], axis=-1)
+
+    # |skew| = 2 sin(theta), atan2 keeps the angle accurate near 0 and pi
+    sin_t = 0.5 * np.linalg.norm(skew, axis=-1)
+    theta = np.arctan2(sin_t, np.clip(cos_t, -1.0, 1.0))
+
+    small = sin_t < 1e-8
+    rot_vec = skew * np.where(small, 0.5, theta / np.where(small, 1.0, 2 * sin_t))[..., None]
+
+    # close to pi the skew part vanishes, the axis is taken from the symmetric part
+    # (R + R^T) / 2 - cos(theta) I = (1 - cos(theta)) k k^T, with the sign of skew
+    near_pi = (sin_t < 1e-3) & (cos_t < 0)
+    if np.any(near_pi):
+        rot_pi = rot[near_pi]
+        sym = ((rot_pi + np.swapaxes(rot_pi, -1, -2)) * 0.5
+               - cos_t[near_pi][:, None, None] * np.identity(3))
+        diag = np.diagonal(sym, axis1=-2, axis2=-1)
+        col = np.argmax(diag, axis=-1)
+        rows = np.arange(len(col))
+        axis = sym[rows, :, col]
+        axis /= np.linalg.norm(axis, axis=-1, keepdims=True)
+        sign = np.where(np.einsum('ni,ni->n', axis, skew[near_pi]) < 0, -1.0, 1.0)
+        rot_vec[near_pi] = axis * (sign * theta[near_pi])[:, None]
+
+    return rot_vec
+
 def so3_as_vector(so3_point: Matrix,
-                  so3_origin: Matrix = Matrix.Identity(3),
+                  so3_origin: Matrix = _I3,
                   scale: float = 1.0) -> Tuple[float, float, float]:
     """
     Returns the SO(3) point as a represented as a vector.
 
-    Where the vector direction is the new z axis, and the vector length is the rotation around the new z axis.
+    The vector is the rotation vector (axis * angle) of the point relative to the origin.
 
     Args:
         so3_point (Matrix): SO(3) point.
         so3_origin (Matrix): SO(3) origin.
+        scale (float): Scale applied to the vector length.
 
     Returns:
         Tuple[float, float, float]: Vector representation of the SO(3) point.
 
     """
 
-    so3_origin = Matrix(so3_origin)
-    so3_point = Matrix(so3_point)
-
-    # Get the rot_vector beween the origin and the point
-    z_origin = so3_origin.col[2]
-    z_point = so3_point.col[2]
+    point = np.asarray(so3_point, dtype=np.float64)[:3, :3]
 
-    rot_diff = z_point.rotation_difference(z_origin)
+    return tuple(so3_as_vector_batch(point[None], so3_origin, scale=scale)[0])
 
-    # apply the rotation to the origin coordinate system
-    rot_origin = so3_origin.to_3x3()
-    rot_origin.rotate(rot_diff)
-
-    # get the rotation beween either the old and the new x axis or the old and the new y axis
-    x_origin = rot_origin.col[0]
+def so3_as_vector_batch(so3_points: np.ndarray,
+                        so3_origin: Matrix = _I3,
+                        scale: float = 1.0) -> np.ndarray:
+    """
+    Returns an array of SO(3) points represented as vectors.
 
+    Batched version of so3_as_vector.
 
-    # Get the rotation matrix
-    x_origin = so3_origin.col[2]
-    x_point = so3_point.col[2]
+    Args:
+        so3_points (np.ndarray): (N, 3, 3) SO(3) points.
+        so3_origin (Matrix): SO(3) origin.
+        scale (float): Scale applied to the vector length.
 
-    rot_diff = x_point.rotation_difference(x_origin)
+    Returns:
+        np.ndarray: (N, 3) vector representations of the SO(3) points.
+    """
+    origin = np.asarray(so3_origin, dtype=np.float64)[:3, :3]
+    points = np.asarray(so3_points, dtype=np.float64)[..., :3, :3]
 
-    # transform to rotation vector
-    rot_vector, rot_angle = rot_diff.to_axis_angle()
+    # rotation of the points relative to the origin
+    rot_rel = origin.T @ points
 
-    return rot_vector * rot_angle * scale
+    return _so3_log(rot_rel) * scale
 
 def se3_as_vector(se3_point: Matrix,
-                  se3_origin: Matrix = Matrix.Identity(4),
+                  se3_origin: Matrix = _I4,
                   scale:float = 1.0) -> Tuple[Tuple[float, float, float], Tuple[float, float, float]]:
     """
     Returns the SE(3) point represented as a vector.
 
-    Where the vector direction is the new z axis, and the vector length is the rotation around the new z axis.
+    The vector is the rotation vector (axis * angle) of the point rotation relative to the
+    origin rotation, placed at the point location.
 
     Args:
         se3_point (Matrix): SE(3) point.
         se3_origin (Matrix): SE(3) origin.
+        scale (float): Scale applied to the vector length.
 
     Returns:
         Tuple[Tuple[float, float, float], Tuple[float, float, float]]: Vector representation of the SE(3) point, and
@@ -86,6 +239,35 @@ def se3_as_vector(se3_point: Matrix,
 
     return rot_vector, vector_origin
 
+def se3_as_vector_batch(se3_points: np.ndarray,
+                        se3_origin: Matrix = _I4,
+                        scale: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns an array of SE(3) points represented as vectors.
+
+    Batched version of se3_as_vector.
+
+    Args:
+        se3_points (np.ndarray): (N, 4, 4) SE(3) points.
+        se3_origin (Matrix): SE(3) origin.
+        scale (float): Scale applied to the vector length.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (N, 3) vector representations of the SE(3) points, and
+            their (N, 3) origins.
+    """
+    origin = np.asarray(se3_origin, dtype=np.float64)[:3, :3]
+    points = np.asarray(se3_points, dtype=np.float64)
+
+    # remove the scale from the rotation part, as Matrix.decompose does
+    origin = origin / np.linalg.norm(origin, axis=0)
+    rots = points[..., :3, :3] / np.linalg.norm(points[..., :3, :3], axis=-2, keepdims=True)
+
+    rot_vectors = so3_as_vector_batch(rots, origin, scale=scale)
+    vector_origins = points[..., :3, 3].copy()
+
+    return rot_vectors, vector_origins
+
 def rot_diff(rot_a,
              rot_b,
              rot_type='quaternion'):
@@ -101,13 +283,41 @@ def rot_diff(rot_a,
 
     """
 
-    q_a: quat.quaternion = to_quaternion(rot_a, type='quat')
-    q_b: quat.quaternion = to_quaternion(rot_b, type='quat')
+    q_diff = qmul_conj_batch(_as_float4(rot_a), _as_float4(rot_b))
 
-    q_diff = q_a * q_b.conjugate()
+    if rot_type == 'quaternion':
+        return q_diff
 
     return as_rot_type(q_diff, rot_type)
 
+def rot_diff_batch(q_a: np.ndarray,
+                   q_b: np.ndarray,
+                   rot_type='quaternion'):
+    """
+    Returns the rotation differences between two arrays of quaternions.
+
+    Batched version of rot_diff.
+
+    Args:
+        q_a (np.ndarray): (N, 4) first quaternions (w, x, y, z).
+        q_b (np.ndarray): (N, 4) second quaternions (w, x, y, z).
+        rot_type (str): Rotation type to return.
+
+    Returns:
+        Rotation differences, as an (N, 4) array for 'quaternion', an (N, 3) array for
+        'rot_vec' or a list of rot_type otherwise.
+    """
+
+    q_diff = qmul_conj_batch(q_a, q_b)
+
+    if rot_type == 'quaternion':
+        return q_diff
+
+    if rot_type == 'rot_vec':
+        return _q_to_rotvec_batch(q_diff)
+
+    return [as_rot_type(q, rot_type) for q in q_diff]
+
 def to_quaternion(rot, type='tuple') -> Union[Tuple[float, float, float, float], quat.quaternion]:
     """
     Tries to identify teh rotation type and returns the quaternion representation.
@@ -122,24 +332,24 @@ def to_quaternion(rot, type='tuple') -> Union[Tuple[float, float, float, float],
     """
 
     if len(rot) == 2:
-        quat.from_rotation_vector(np.asarray(rot[0])*rot[1])
+        # (axis, angle)
+        q = quat.from_rotation_vector(np.asarray(rot[0])*rot[1])
     else:
         rot_np = np.asarray(rot)
-        if rot_np.shape == (3, 3):
-            q = quat.from_rotation_matrix(rot_np)
-        elif rot_np.shape == (4, 4):
-            q = quat.from_rotation_matrix(rot_np[0:3, 0:3])
-        elif rot_np.shape == (3,):
-            q = quat.from_rotation_vector(rot_np)
-        elif rot_np.shape == (4,):
-            q = quat.from_float_array(rot_np)
-        else:
+        if rot_np.shape == (4, 4):
+            rot_np = rot_np[0:3, 0:3]
+
+        from_rot = _FROM_DISPATCH.get(rot_np.shape)
+        if from_rot is None:
             raise ValueError(f"Unknown rotation type {rot}")
+        q = from_rot(rot_np)
 
     if type == 'tuple':
         return q.x, q.y, q.z, q.w
     elif type == 'quat':
         return q
+    else:
+        raise ValueError(f"type must be one of: {['tuple', 'quat']}")
 
 def as_rot_type(q: Tuple[float, float, float, float],
                 rot_type='quaternion'):
@@ -147,25 +357,16 @@ def as_rot_type(q: Tuple[float, float, float, float],
     Returns the quaternion as a rotation type.
 
     Args:
-        q (Tuple[float, float, float, float]): Quaternion.
+        q (Tuple[float, float, float, float]): Quaternion, (w, x, y, z) or a numpy-quaternion.
+        rot_type (str): Rotation type to return.
     """
-    if rot_type == 'quaternion':
-        return quat.as_float_array(q)
-    elif rot_type == 'euler_ZYZ':
-        return quat.as_euler_angles(q)
-    elif rot_type == 'rot_mat':
-        return quat.as_rotation_matrix(q)
-    elif rot_type == 'rot_vec':
-        return quat.as_rotation_vector(q)
-    elif rot_type == 'axis_angle':
-        rot_vec = quat.as_rotation_vector(q)
-        angle = np.linalg.norm(rot_vec)
-        axis = rot_vec / angle
-        return axis, angle
-    elif rot_type == 'matrix':
-        rigid_mat = np.identity(4)
-        rot_mat = quat.as_rotation_matrix(q)
-        rigid_mat[0:3, 0:3] = rot_mat
-        return rigid_mat
-    else:
+    as_rot = _AS_DISPATCH.get(rot_type)
+    if as_rot is None:
         raise ValueError(f'rot_type must be one of: {ACCEPTED_ROT_TYPES}')
+
+    if isinstance(q, quat.quaternion):
+        q4 = quat.as_float_array(q)
+    else:
+        q4 = np.asarray(q, dtype=np.float64)
+
+    return as_rot(q4)
@@ -1,11 +1,73 @@
 """ Material creation and utility functions"""
 
+import os
 from typing import Optional, Tuple, Union
 import uuid
 
 import bpy
 import numpy as np
 
+# Unnamed solid materials already created, keyed by their parameters
+_SOLID_MATERIAL_CACHE = {}
+
+# Levels of each color channel of the cached solid materials (8 bits)
+SOLID_COLOR_LEVELS = 255
+
+# Custom property of a material holding the image used by recolor_material
+RECOLOR_IMAGE_KEY = '_bp_recolor_img'
+
+# Images already loaded, keyed by their absolute filepath and modification time
+_IMAGE_CACHE = {}
+
+def _load_image(filepath: str) -> bpy.types.Image:
+    """Load an image, reusing it if it was already loaded and the file has not changed.
+
+    Args:
+        filepath (str): Filepath of the image.
+
+    Returns:
+        bpy.types.Image: The loaded image.
+    """
+    key = (os.path.abspath(filepath), os.path.getmtime(filepath))
+    image = _IMAGE_CACHE.get(key)
+    if image is not None:
+        try:
+            image.name  # raises ReferenceError if the image was removed
+            return image
+        except ReferenceError:
+            del _IMAGE_CACHE[key]
+
+    image = bpy.data.images.load(filepath, check_existing=True)
+    _IMAGE_CACHE[key] = image
+
+    return image
+
+def _add_texture(nodes: bpy.types.Nodes,
+                 links: bpy.types.NodeLinks,
+                 mapping_node: bpy.types.ShaderNodeMapping,
+                 filepath: str,
+                 color_input: Optional[bpy.types.NodeSocket] = None) -> bpy.types.ShaderNodeTexImage:
+    """Add an image texture node mapped through the shared mapping node.
+
+    Args:
+        nodes (bpy.types.Nodes): Nodes of the material node tree.
+        links (bpy.types.NodeLinks): Links of the material node tree.
+        mapping_node (bpy.types.ShaderNodeMapping): Mapping node of the texture coordinates.
+        filepath (str): Filepath of the texture image.
+        color_input (Optional[bpy.types.NodeSocket]): Socket to link the texture color to.
+
+    Returns:
+        bpy.types.ShaderNodeTexImage: The created texture node.
+    """
+    tex_node = nodes.new('ShaderNodeTexImage')
+    links.new(mapping_node.outputs["Vector"], tex_node.inputs['Vector'])
+    tex_node.image = _load_image(filepath)
+
+    if color_input is not None:
+        links.new(tex_node.outputs['Color'], color_input)
+
+    return tex_node
+
 def create_material_from_pbr(base_image_file: str,
                              name: Optional[str] = None,
                              scale: float = 1.0,
@@ -45,33 +107,27 @@ def create_material_from_pbr(base_image_file: str,
     mat = bpy.data.materials.new(name=name)
     mat.use_nodes=True
     nodes = mat.node_tree.nodes
+    links = mat.node_tree.links
 
     # Create principled BSDF node
     bsdf = nodes["Principled BSDF"]
     output = nodes["Material Output"]
     mat.node_tree.links.new(bsdf.outputs["BSDF"], output.inputs["Surface"])
 
-    # Create mapping for all the inputs
+    # Create mapping for all the inputs, shared by every texture node
     mapping_node = nodes.new('ShaderNodeMapping')
     tex_coord = nodes.new('ShaderNodeTexCoord')
     mapping_node["Scale"] = [scale, scale, scale]
     mat.node_tree.links.new(tex_coord.outputs['UV'], mapping_node.inputs['Vector'])
 
     # Create an link base image texture node
-    tex_image = nodes.new('ShaderNodeTexImage')
-    tex_image.image = bpy.data.images.load(base_image_file)
-    mat.node_tree.links.new(tex_image.outputs['Color'], bsdf.inputs['Base Color'])
+    tex_image = _add_texture(nodes, links, mapping_node, base_image_file, bsdf.inputs['Base Color'])
 
     # Create normal map texture node
     if normal_file is not None:
-        # image node for the normal map image
-        tex_normal = nodes.new('ShaderNodeTexImage')
-        mat.node_tree.links.new(mapping_node.outputs["Vector"], tex_normal.inputs['Vector'])
-        tex_normal.image = bpy.data.images.load(normal_file)
-
         # passing by a normal map
         normal_map_node = nodes.new('ShaderNodeNormalMap')
-        mat.node_tree.links.new(tex_normal.outputs['Color'], normal_map_node.inputs['Color'])
+        _add_texture(nodes, links, mapping_node, normal_file, normal_map_node.inputs['Color'])
         normal_map_node['Strength'] = 1.0
 
         # link the normal map to the principled BSDF
@@ -79,30 +135,20 @@ def create_material_from_pbr(base_image_file: str,
 
     # Create specular map texture node
     if specular_file is not None:
-        tex_specular = nodes.new('ShaderNodeTexImage')
-        mat.node_tree.links.new(mapping_node.outputs["Vector"], tex_specular.inputs['Vector'])
-        tex_specular.image = bpy.data.images.load(specular_file)
-        mat.node_tree.links.new(tex_specular.outputs['Color'], bsdf.inputs['Specular'])
+        _add_texture(nodes, links, mapping_node, specular_file, bsdf.inputs['Specular'])
 
     # Create metallic map texture node
     if metallic_file is not None:
-        tex_metallic = nodes.new('ShaderNodeTexImage')
-        mat.node_tree.links.new(mapping_node.outputs["Vector"], tex_metallic.inputs['Vector'])
-        tex_metallic.image = bpy.data.images.load(metallic_file)
-        mat.node_tree.links.new(tex_metallic.outputs['Color'], bsdf.inputs['Metallic'])
+        _add_texture(nodes, links, mapping_node, metallic_file, bsdf.inputs['Metallic'])
 
     # Create roughness map texture node
     if roughness_file is not None:
-        tex_roughness = nodes.new('ShaderNodeTexImage')
-        mat.node_tree.links.new(mapping_node.outputs["Vector"], tex_roughness.inputs['Vector'])
-        tex_roughness.image = bpy.data.images.load(roughness_file)
-        mat.node_tree.links.new(tex_roughness.outputs['Color'], bsdf.inputs['Roughness'])
+        _add_texture(nodes, links, mapping_node, roughness_file, bsdf.inputs['Roughness'])
 
 
     # Create displacement texture node
     if displacement_file is not None:
-        tex_disp = nodes.new('ShaderNodeTexImage')
-        tex_disp.image = bpy.data.images.load(displacement_file)
+        tex_disp = _add_texture(nodes, links, mapping_node, displacement_file)
         disp_node = nodes.new('ShaderNodeDisplacement')
 
         # add a multiply node to the displacement node
@@ -116,23 +162,12 @@ def create_material_from_pbr(base_image_file: str,
 
     # Create occlusion map texture node
     if occlusion_file is not None:
-        tex_occlusion = nodes.new('ShaderNodeTexImage')
-        mat.node_tree.links.new(mapping_node.outputs["Vector"], tex_occlusion.inputs['Vector'])
-        tex_occlusion.image = bpy.data.images.load(occlusion_file)
-        mat.node_tree.links.new(tex_occlusion.outputs['Color'], bsdf.inputs['Occlusion'])
+        _add_texture(nodes, links, mapping_node, occlusion_file, bsdf.inputs['Occlusion'])
 
     # Create subsurface scattering node
     if subsurface_file is not None:
-        tex_subsurface = nodes.new('ShaderNodeTexImage')
-        mat.node_tree.links.new(mapping_node.outputs["Vector"], tex_subsurface.inputs['Vector'])
-        tex_subsurface.image = bpy.data.images.load(subsurface_file)
         subsurface_node = nodes.new('ShaderNodeSubsurfaceScattering')
-        mat.node_tree.links.new(tex_subsurface.outputs['Color'], subsurface_node.inputs['Color'])
-
-    # Create roughness texture node
-    tex_rough = nodes.new('ShaderNodeTexImage')
-    tex_rough.image = bpy.data.images.load(roughness_file)
-    mat.node_tree.links.new(tex_rough.outputs['Color'], bsdf.inputs['Roughness'])
+        _add_texture(nodes, links, mapping_node, subsurface_file, subsurface_node.inputs['Color'])
 
     if true_displacement:
         mat.cycles.displacement_method = 'BOTH'
@@ -145,17 +180,42 @@ def create_solid_material(base_color: Union[Tuple[float, float, float, float],st
                           metallic: float = 0.7,
                           specular: float = 0.5,
                           emission_strength: float = 0.0,
-                          name: Optional[str] = None)-> bpy.types.Material:
+                          name: Optional[str] = None,
+                          reuse: bool = True)-> bpy.types.Material:
     """Create a solid material.
 
+    Unnamed materials are cached: calling this function again with the same parameters
+    returns the material that was already created. The colors of cached materials are
+    quantized to 8 bits per channel, so colors that only differ by float noise or by less
+    than a display level (e.g. samples of a color scale) share one material.
+
     Args:
         name (str): Name of the material.
         base_color (Union[Tuple[float, float, float, float],str]): Base color of the material.
             Either as a tuple (r, g, b, a) or as a filepath to an image.
             Default is (0.6, 0.6, 0.6, 1.0).
+        reuse (bool): Return the cached material with the same parameters if there is one.
+            Set to False to always create a new material (e.g. to animate its color).
     """
 
-    # Create unique name if not given
+    key = None
+    if name is None and reuse:
+        # Reuse an existing material with the same parameters
+        if isinstance(base_color, str):
+            color_key = base_color
+        else:
+            # the material gets the quantized color, so it does not depend on the first caller
+            color_key = tuple(int(round(float(c) * SOLID_COLOR_LEVELS)) for c in base_color)
+            base_color = tuple(c / SOLID_COLOR_LEVELS for c in color_key)
+        key = (color_key, roughness, metallic, specular, emission_strength)
+        mat = _SOLID_MATERIAL_CACHE.get(key)
+        if mat is not None:
+            try:
+                mat.name  # raises ReferenceError if the material was removed
+                return mat
+            except ReferenceError:
+                del _SOLID_MATERIAL_CACHE[key]
+
     if name is None:
         # Create a unique name
         name = 'Solid_Material_' + str(uuid.uuid4())
@@ -182,9 +242,21 @@ def create_solid_material(base_color: Union[Tuple[float, float, float, float],st
     # For workbench renderer
     mat.diffuse_color = base_color
 
+    if key is not None:
+        _SOLID_MATERIAL_CACHE[key] = mat
+
     return mat
 
 
+def reset_material_cache() -> None:
+    """Forget the cached solid materials.
+
+    Later calls to create_solid_material create new materials instead of returning the
+    ones of a previous scene, the existing materials are not removed.
+    """
+    _SOLID_MATERIAL_CACHE.clear()
+
+
 def recolor_material(material: bpy.types.Material,
                      base_color: Union[Tuple[float, float, float, float],str] = (0.6, 0.6, 0.6, 1.0),
                      name: Optional[str] = None)-> bpy.types.Material:
@@ -195,16 +267,28 @@ def recolor_material(material: bpy.types.Material,
         base_color (Union[Tuple[float, float, float, float],str]): Base color of the material.
             Either as a tuple (r, g, b, a) or as a filepath to an image.
             Default is (0.6, 0.6, 0.6, 1.0).
-        name (str): Name of the material.
+        name (str): Name used for the recolor image, the material name by default.
+
+    Returns:
+        bpy.types.Material: The recolored material.
     """
 
-    name = material.name
     tex_image = material.node_tree.nodes['Image Texture']
 
-    image_name = name+"texture_image"+str(uuid.uuid4())
-    image = bpy.data.images.new(name=image_name, width=1, height=1, tiled=True)
+    # Recolor the generated image in place if there already is one
+    image = tex_image.image
+    if image is None or image.source != 'GENERATED' or tuple(image.size) != (1, 1):
+        image = material.get(RECOLOR_IMAGE_KEY)
+
+    if image is None:
+        if name is None:
+            name = material.name
+        image = bpy.data.images.new(name=name + "_recolor", width=1, height=1)
+        material[RECOLOR_IMAGE_KEY] = image
+
     image.generated_type = 'BLANK'
     image.generated_color = base_color
     image.source = 'GENERATED'
-    image.use_fake_user = True
     tex_image.image = image
+
+    return material
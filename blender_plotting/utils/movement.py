@@ -1,11 +1,11 @@
 """Utility functions to move objects in the scene."""
 
-from typing import Optional, Union
+import math
+from typing import Optional, Sequence, Union
 
 import bpy
-from mathutils import Matrix
+from mathutils import Matrix, Quaternion, Vector
 import numpy as np
-import quaternion as quat
 
 ROTATION_TYPES = [
     'quaternion',
@@ -14,6 +14,125 @@ ROTATION_TYPES = [
     'rot_vec'
 ]
 
+# Values of the keyframe interpolation enum, foreach_set only accepts the integer values
+KEYFRAME_INTERPOLATIONS = {
+    'CONSTANT': 0,
+    'LINEAR': 1,
+    'BEZIER': 2,
+}
+
+# Shared read-only identity, only read by the callers of _rotation_matrix
+_I3 = Matrix.Identity(3).freeze()
+
+def _quaternion_matrix(rotation) -> Matrix:
+    """Rotation matrix of a (w, x, y, z) quaternion."""
+    return Quaternion(rotation).normalized().to_matrix()
+
+def _euler_zyz_matrix(rotation) -> Matrix:
+    """Rotation matrix of ZYZ euler angles, Rz(alpha) @ Ry(beta) @ Rz(gamma).
+
+    Same convention as quaternion.from_euler_angles.
+    """
+    alpha, beta, gamma = rotation
+    ca, sa = math.cos(alpha), math.sin(alpha)
+    cb, sb = math.cos(beta), math.sin(beta)
+    cg, sg = math.cos(gamma), math.sin(gamma)
+
+    return Matrix(((ca*cb*cg - sa*sg, -ca*cb*sg - sa*cg, ca*sb),
+                   (sa*cb*cg + ca*sg, -sa*cb*sg + ca*cg, sa*sb),
+                   (-sb*cg, sb*sg, cb)))
+
+def _rot_mat_matrix(rotation) -> Matrix:
+    """Rotation matrix of a 3x3 or 4x4 matrix."""
+    return Matrix(rotation).to_3x3()
+
+def _rot_vec_matrix(rotation) -> Matrix:
+    """Rotation matrix of a rotation vector (axis * angle)."""
+    rot_vec = np.asarray(rotation, dtype=np.float64)
+    rot_angle = np.linalg.norm(rot_vec)
+    if rot_angle < 1e-12:
+        return _I3
+    return Matrix.Rotation(rot_angle, 3, rot_vec / rot_angle)
+
+# 3x3 rotation matrix constructor for each of the ROTATION_TYPES
+_ROT_TO_MATRIX = {
+    'quaternion': _quaternion_matrix,
+    'euler_ZYZ': _euler_zyz_matrix,
+    'rot_mat': _rot_mat_matrix,
+    'rot_vec': _rot_vec_matrix,
+}
+
+def _rotation_matrix(rotation, rot_type: str) -> Matrix:
+    """Get the 3x3 rotation matrix of a rotation.
+
+    Every type is converted directly, without going through a quaternion.
+
+    Args:
+        rotation: Rotation as given to rigid_movement or set_world_pose.
+        rot_type (str): Rotation type. One of 'quaternion', 'euler_ZYZ', 'rot_mat', 'rot_vec'.
+
+    Returns:
+        Matrix: 3x3 rotation matrix.
+    """
+    try:
+        to_matrix = _ROT_TO_MATRIX[rot_type]
+    except KeyError:
+        raise ValueError(f'rot_type must be one of: {ROTATION_TYPES}') from None
+
+    return to_matrix(rotation)
+
+def _quaternion_matrices(quaternions: np.ndarray) -> np.ndarray:
+    """Rotation matrices of (N, 4) (w, x, y, z) quaternions."""
+    quaternions = np.asarray(quaternions, dtype=np.float64)
+    w, x, y, z = (quaternions / np.linalg.norm(quaternions, axis=-1, keepdims=True)).T
+
+    return np.stack([np.stack([1 - 2*(y*y + z*z), 2*(x*y - w*z), 2*(x*z + w*y)], axis=-1),
+                     np.stack([2*(x*y + w*z), 1 - 2*(x*x + z*z), 2*(y*z - w*x)], axis=-1),
+                     np.stack([2*(x*z - w*y), 2*(y*z + w*x), 1 - 2*(x*x + y*y)], axis=-1)],
+                    axis=-2)
+
+def _rotation_matrices(rotations, rot_type: str) -> np.ndarray:
+    """Get the (N, 3, 3) rotation matrices of N rotations.
+
+    Quaternions and matrices are converted in one vectorized pass, the other types one by one.
+
+    Args:
+        rotations: N rotations, as given to rigid_movement_batch.
+        rot_type (str): Rotation type. One of 'quaternion', 'euler_ZYZ', 'rot_mat', 'rot_vec'.
+
+    Returns:
+        np.ndarray: (N, 3, 3) rotation matrices.
+    """
+    if rot_type == 'quaternion':
+        return _quaternion_matrices(rotations)
+    elif rot_type == 'rot_mat':
+        return np.asarray(rotations, dtype=np.float64)[:, :3, :3]
+
+    return np.stack([np.asarray(_rotation_matrix(rotation, rot_type)) for rotation in rotations])
+
+def _as_np(matrix: Matrix) -> np.ndarray:
+    """Copy a mathutils matrix into a float64 array."""
+    return np.array(matrix, dtype=np.float64)
+
+def _compose_trs(loc, rot3x3, scale) -> Matrix:
+    """Assemble a 4x4 transform from its translation, rotation and scale.
+
+    Equivalent to ``Translation(loc) @ rot3x3.to_4x4() @ Scale(scale)`` without building the
+    intermediate mathutils matrices.
+
+    Args:
+        loc: Translation (x, y, z).
+        rot3x3: 3x3 rotation matrix.
+        scale: Scale along each axis (x, y, z).
+
+    Returns:
+        Matrix: 4x4 transform matrix.
+    """
+    trs = np.identity(4)
+    trs[:3, :3] = np.asarray(rot3x3, dtype=np.float64) * np.asarray(scale, dtype=np.float64)[None, :]
+    trs[:3, 3] = loc
+    return Matrix(trs.tolist())
+
 def rigid_movement(obj: bpy.types.Object,
                    rotation: Optional[tuple] = None,
                    translation: Optional[tuple] = None,
@@ -27,44 +146,58 @@ def rigid_movement(obj: bpy.types.Object,
         rot_type (str): Rotation type. One of 'quaternion', 'euler_ZYZ', 'rot_mat', 'rot_vec'.
     """
 
-    if rotation is not None:
-        if rot_type == 'quaternion':
-            q_rot = quat.from_float_array(rotation)
-        elif rot_type == 'euler_ZYZ':
-            q_rot = quat.from_euler_angles(rotation)
-        elif rot_type == 'rot_mat':
-            q_rot = quat.from_rotation_matrix(rotation)
-        elif rot_type == 'rot_vec':
-            q_rot = quat.from_rotation_vector(rotation)
-        else:
-            raise ValueError(f'rot_type must be one of: {ROTATION_TYPES}')
-
-        axis_angle = quat.as_rotation_vector(q_rot)
-        rot_angle = np.linalg.norm(axis_angle)
-        rot_axis = axis_angle / rot_angle
-
-        # define some rotation
-        rot_mat = Matrix.Rotation(rot_angle, 4, rot_axis)
-    else:
-        rot_mat = Matrix.Identity(4)
+    if rotation is None:
+        if translation is not None:
+            # only move, the rotation and scale are left untouched
+            world = obj.matrix_world.copy()
+            world.translation += Vector(translation)
+            obj.matrix_world = world
+        return
 
-    if translation is not None:
-        loc_mat = Matrix.Translation(translation)
-    else:
-        loc_mat = Matrix.Identity(4)
+    rot_mat = np.asarray(_rotation_matrix(rotation, rot_type))
 
+    if translation is None:
+        translation = (0.0, 0.0, 0.0)
 
-    # decompose world_matrix's components, and from them assemble 4x4 matrices
-    orig_loc, orig_rot, orig_scale = obj.matrix_world.decompose()
-    orig_loc_mat = Matrix.Translation(orig_loc)
-    orig_rot_mat = orig_rot.to_matrix().to_4x4()
-    x_scaling = Matrix.Scale(orig_scale[0],4,(1,0,0))
-    y_scaling = Matrix.Scale(orig_scale[1],4,(0,1,0))
-    z_scaling = Matrix.Scale(orig_scale[2],4,(0,0,1))
-    orig_scale_mat = x_scaling @ y_scaling @ z_scaling
+    # the rotation applies to the rotation * scale block, the translation is added
+    world = _as_np(obj.matrix_world)
+    world[:3, :3] = rot_mat @ world[:3, :3]
+    world[:3, 3] += translation
 
     # assemble the new matrix
-    obj.matrix_world = (loc_mat @ orig_loc_mat) @ (rot_mat @ orig_rot_mat) @ orig_scale_mat
+    obj.matrix_world = Matrix(world.tolist())
+
+def rigid_movement_batch(objs: Sequence[bpy.types.Object],
+                         rotations: Optional[np.ndarray] = None,
+                         translations: Optional[np.ndarray] = None,
+                         rot_type='quaternion',):
+    """Apply a rigid movement to each object of a list.
+
+    Batched version of rigid_movement, the new world matrices are computed with a single
+    vectorized product and each object is assigned once.
+
+    Args:
+        objs (Sequence[bpy_types.Object]): Objects to move.
+        rotations (Optional[np.ndarray]): Rotation to apply to each object, e.g. (N, 4) quaternions.
+        translations (Optional[np.ndarray]): (N, 3) translation to apply to each object.
+        rot_type (str): Rotation type. One of 'quaternion', 'euler_ZYZ', 'rot_mat', 'rot_vec'.
+    """
+
+    if rotations is None and translations is None:
+        return
+
+    worlds = np.array([obj.matrix_world for obj in objs], dtype=np.float64).reshape(-1, 4, 4)
+
+    # the rotation applies to the rotation * scale block, the translation is added
+    if rotations is not None:
+        rot_mats = _rotation_matrices(rotations, rot_type)
+        worlds[:, :3, :3] = rot_mats @ worlds[:, :3, :3]
+
+    if translations is not None:
+        worlds[:, :3, 3] += np.asarray(translations, dtype=np.float64)
+
+    for obj, world in zip(objs, worlds):
+        obj.matrix_world = Matrix(world.tolist())
 
 def rotate_around_axis(obj: bpy.types.Object,
                        axis: Union[str, tuple],
@@ -78,16 +211,10 @@ def rotate_around_axis(obj: bpy.types.Object,
     """
 
     # define some rotation
-    rot_mat = Matrix.Rotation(angle, 4, axis)   # you can also use as axis Y,Z or a custom vector like (x,y,z)
+    rot_mat = _as_np(Matrix.Rotation(angle, 4, axis))   # you can also use as axis Y,Z or a custom vector like (x,y,z)
 
-    # decompose world_matrix's components, and from them assemble 4x4 matrices
-    orig_loc, orig_rot, orig_scale = obj.matrix_world.decompose()
-    orig_loc_mat = Matrix.Translation(orig_loc)
-    orig_rot_mat = orig_rot.to_matrix().to_4x4()
-    orig_scale_mat = Matrix.Scale(orig_scale[0],4,(1,0,0)) * Matrix.Scale(orig_scale[1],4,(0,1,0)) @ Matrix.Scale(orig_scale[2],4,(0,0,1))
-
-    # assemble the new matrix
-    obj.matrix_world = rot_mat @ orig_loc_mat @ orig_rot_mat @ orig_scale_mat
+    # assemble the new matrix, the rotation is around the world origin so it also moves the location
+    obj.matrix_world = Matrix((rot_mat @ _as_np(obj.matrix_world)).tolist())
 
 def set_world_pose(obj: bpy.types.Object,
                    rotation: Optional[tuple] = None,
@@ -108,42 +235,75 @@ def set_world_pose(obj: bpy.types.Object,
     orig_loc, orig_rot, orig_scale = obj.matrix_world.decompose()
 
     if rotation is not None:
-        if rot_type == 'quaternion':
-            q_rot = quat.from_float_array(rotation)
-        elif rot_type == 'euler_ZYZ':
-            q_rot = quat.from_euler_angles(rotation)
-        elif rot_type == 'rot_mat':
-            q_rot = quat.from_rotation_matrix(rotation)
-        elif rot_type == 'rot_vec':
-            q_rot = quat.from_rotation_vector(rotation)
-        else:
-            raise ValueError(f'rot_type must be one of: {ROTATION_TYPES}')
-
-        axis_angle = quat.as_rotation_vector(q_rot)
-        rot_angle = np.linalg.norm(axis_angle)
-        rot_axis = axis_angle / rot_angle
-
-        # define some rotation
-        rot_mat = Matrix.Rotation(rot_angle, 4, rot_axis)
+        rot_mat = _rotation_matrix(rotation, rot_type)
     else:
-        rot_mat = orig_rot.to_matrix().to_4x4()
+        rot_mat = orig_rot.to_matrix()
 
-    if translation is not None:
-        loc_mat = Matrix.Translation(translation)
-    else:
-        loc_mat = Matrix.Translation(orig_loc)
+    if translation is None:
+        translation = orig_loc
 
-    if scale is not None:
-        x_scaling = Matrix.Scale(scale[0],4,(1,0,0))
-        y_scaling = Matrix.Scale(scale[1],4,(0,1,0))
-        z_scaling = Matrix.Scale(scale[2],4,(0,0,1))
-        scale_mat = x_scaling @ y_scaling @ z_scaling
-    else:
-        # decompose world_matrix's components, and from them assemble 4x4 matrices
-        x_scaling = Matrix.Scale(orig_scale[0],4,(1,0,0))
-        y_scaling = Matrix.Scale(orig_scale[1],4,(0,1,0))
-        z_scaling = Matrix.Scale(orig_scale[2],4,(0,0,1))
-        scale_mat = x_scaling @ y_scaling @ z_scaling
+    if scale is None:
+        scale = orig_scale
 
     # assemble the new matrix
-    obj.matrix_world = loc_mat @ rot_mat @ scale_mat
+    obj.matrix_world = _compose_trs(translation, rot_mat, scale)
+
+def insert_keyframes(obj: bpy.types.ID,
+                     data_path: str,
+                     values: np.ndarray,
+                     frame_start: int = 1,
+                     frames: Optional[Sequence[float]] = None,
+                     interpolation: Optional[str] = None):
+    """Insert one keyframe per frame for every component of a property.
+
+    All the keyframes of each component are written at once with foreach_set, instead of
+    calling keyframe_insert once per frame. Existing keyframes of the property are replaced.
+
+    Args:
+        obj (bpy.types.ID): Object (or other ID, e.g. a material) to animate.
+        data_path (str): Path of the animated property, e.g. 'location'.
+        values (np.ndarray): (F, D) values of the D components of the property for F
+            consecutive frames.
+        frame_start (int): Frame of the first value.
+        frames (Optional[Sequence[float]]): Frame of each value, overrides frame_start for
+            keyframes that are not on consecutive frames.
+        interpolation (Optional[str]): Interpolation of the keyframes, one of
+            KEYFRAME_INTERPOLATIONS. Blender's default (BEZIER) if not given.
+    """
+    values = np.asarray(values, dtype=np.float32)
+    values = values.reshape(len(values), -1)
+    if frames is None:
+        frames = np.arange(frame_start, frame_start + len(values), dtype=np.float32)
+    else:
+        frames = np.asarray(frames, dtype=np.float32)
+
+    if interpolation is not None:
+        try:
+            interpolations = np.full(len(values), KEYFRAME_INTERPOLATIONS[interpolation], dtype=np.int32)
+        except KeyError:
+            raise ValueError(f'interpolation must be one of: {list(KEYFRAME_INTERPOLATIONS)}') from None
+
+    if obj.animation_data is None:
+        obj.animation_data_create()
+    if obj.animation_data.action is None:
+        obj.animation_data.action = bpy.data.actions.new(obj.name + 'Action')
+    fcurves = obj.animation_data.action.fcurves
+
+    # (frame, value) pairs
+    keyframes = np.empty((len(values), 2), dtype=np.float32)
+    keyframes[:, 0] = frames
+
+    for index in range(values.shape[1]):
+        fcurve = fcurves.find(data_path, index=index)
+        if fcurve is not None:
+            fcurves.remove(fcurve)
+        fcurve = fcurves.new(data_path, index=index)
+
+        keyframes[:, 1] = values[:, index]
+        fcurve.keyframe_points.add(len(values))
+        fcurve.keyframe_points.foreach_set('co', keyframes.ravel())
+        if interpolation is not None:
+            fcurve.keyframe_points.foreach_set('interpolation', interpolations)
+
+        # compute the handles of the new keyframes
+        fcurve.update()
@@ -1,6 +1,54 @@
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+import glob
+import math
+import os
+import pathlib
+import queue
+import shutil
+import subprocess
+import tempfile
+from typing import List, Optional
 import bpy
 
+from .files import concat_videos
+
+# Cycles GPU backends, in order of preference
+GPU_BACKENDS = ('OPTIX', 'HIP', 'METAL', 'ONEAPI', 'CUDA')
+
+# Run by each background blender of render_animation_batched to render on its GPUs
+WORKER_GPU_SETUP = """
+import bpy
+cprefs = bpy.context.preferences.addons['cycles'].preferences
+cprefs.compute_device_type = '{backend}'
+cprefs.get_devices()
+for d in cprefs.devices:
+    d.use = d.type != 'CPU'
+"""
+
+def pick_best_backend() -> str:
+    """Set the fastest available Cycles GPU backend as the compute device type.
+
+    Backends are tried in the order of GPU_BACKENDS, the first one with a device is kept.
+    Falls back to CUDA if none has a device.
+
+    Returns:
+        str: The selected backend.
+    """
+    cprefs = bpy.context.preferences.addons["cycles"].preferences
+
+    for backend in GPU_BACKENDS:
+        try:
+            cprefs.compute_device_type = backend
+        except TypeError:
+            # backend not supported by this blender build
+            continue
+
+        if any(d.type == backend for d in cprefs.get_devices_for_type(backend)):
+            return backend
+
+    cprefs.compute_device_type = "CUDA"
+    return "CUDA"
+
 def bake_textures():
     """Bake all the textures in the scene."""
     bpy.ops.object.select_all(action='SELECT')
@@ -14,17 +62,51 @@ def common_setup(scene: bpy.types.Scene,
     scene.render.use_persistent_data = True
 
     # set resolution
-    bpy.context.scene.render.resolution_x = resolution_x
-    bpy.context.scene.render.resolution_y = resolution_y
+    scene.render.resolution_x = resolution_x
+    scene.render.resolution_y = resolution_y
 
     # Performance optimizations
     scene.render.use_sequencer = False
     scene.render.use_compositing = False
 
+    # Plots don't deform, a static BVH without spatial splits is faster to build
+    scene.cycles.debug_use_spatial_splits = False
+    scene.cycles.debug_bvh_type = 'STATIC_BVH'
+
     # set transparent background
     if transparent:
-        bpy.context.scene.render.film_transparent = transparent
-        bpy.context.scene.render.image_settings.color_mode = 'RGBA'
+        scene.render.film_transparent = transparent
+        scene.render.image_settings.color_mode = 'RGBA'
+
+
+def set_output_path(scene: bpy.types.Scene,
+                    file_name: str,
+                    animation: bool = False) -> pathlib.Path:
+    """Set the render output path of a scene and create its directory.
+
+    Animations are saved as `animation/<file_name>.mp4` when rendered with FFMPEG, as
+    `animation/<file_name>.avi` otherwise. Images are saved as `<file_name>.png`.
+
+    Args:
+        scene (bpy.types.Scene): The scene to set.
+        file_name (str): The path to save the render to, without extension.
+        animation (bool, optional): Whether an animation is rendered. Defaults to False.
+
+    Returns:
+        pathlib.Path: The output path.
+    """
+    if animation:
+        extension = ".mp4" if scene.render.image_settings.file_format == 'FFMPEG' else ".avi"
+        output_path = pathlib.Path("animation") / (file_name + extension)
+    else:
+        scene.render.image_settings.file_format = 'PNG'
+        output_path = pathlib.Path(file_name + ".png")
+
+    # create the directory once instead of letting blender check it for every frame
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    scene.render.filepath = str(output_path)
+
+    return output_path
 
 
 def set_animation(scene: bpy.types.Scene,
@@ -41,7 +123,8 @@ def set_animation(scene: bpy.types.Scene,
         frame_start (int, optional): The first frame. Defaults to 1.
         frame_end (int, optional): The last frame. Defaults to 48.
         frame_current (int, optional): The current frame. Defaults to 1.
-        file_format (str, optional): The file extension. Defaults to 'FFMPEG'.
+        file_format (str, optional): The file extension. 'FFMPEG' renders straight to a
+            H264 mp4, 'AVI_JPEG' is faster for previews. Defaults to 'FFMPEG'.
     """
     scene.render.fps = fps
     scene.frame_start = frame_start
@@ -49,72 +132,270 @@ def set_animation(scene: bpy.types.Scene,
     scene.frame_current = frame_current
     scene.render.image_settings.file_format = file_format
     if file_format == 'FFMPEG':
+        scene.render.ffmpeg.format = 'MPEG4'
         scene.render.ffmpeg.codec = 'H264'
+        scene.render.ffmpeg.constant_rate_factor = 'MEDIUM'
+        scene.render.ffmpeg.ffmpeg_preset = 'GOOD'
 
-def cycles_render(scene: bpy.types.Scene,
-                  file_name: str,
-                  use_gpu: bool=True,
-                  resolution_x: int=1920,
-                  resolution_y:int =1080,
-                  samples: int=128,
-                  transparent: bool=False,
-                  animation: bool=False):
-    """Render a scene using th Cycles engine.
+# GPU backend selected by setup_gpu_devices, None until the devices are set up
+_GPU_BACKEND = None
+
+def setup_gpu_devices() -> str:
+    """Select the GPU backend and enable its devices.
+
+    The devices are only probed on the first call, later calls reuse the selected backend.
+
+    Returns:
+        str: The selected backend.
+    """
+    global _GPU_BACKEND
+
+    cprefs = bpy.context.preferences.addons["cycles"].preferences
+
+    if _GPU_BACKEND is not None and cprefs.compute_device_type == _GPU_BACKEND:
+        return _GPU_BACKEND
+
+    backend = pick_best_backend()
+
+    # get_devices() to let Blender detects GPU device, pick_best_backend already
+    # refreshed the device list unless it is empty
+    if not list(cprefs.devices):
+        cprefs.get_devices()
+
+    # Only use the GPUs, rendering on the CPU alongside them slows the render down
+    for d in cprefs.devices:
+        d.use = d.type != 'CPU'
+
+    _GPU_BACKEND = backend
+    return backend
+
+def get_gpu_free_memory() -> Optional[int]:
+    """Get the free memory of the first NVIDIA GPU in MiB, None if it can't be queried."""
+    try:
+        output = subprocess.run(['nvidia-smi', '--query-gpu=memory.free', '--format=csv,noheader,nounits'],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL,
+                                text=True,
+                                check=True).stdout
+        return int(output.split()[0])
+    except (OSError, subprocess.CalledProcessError, ValueError, IndexError):
+        return None
+
+def get_gpu_count() -> int:
+    """Get the number of NVIDIA GPUs, 0 if they can't be queried."""
+    try:
+        output = subprocess.run(['nvidia-smi', '-L'],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL,
+                                text=True,
+                                check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return 0
+
+    return sum(1 for line in output.splitlines() if line.startswith('GPU '))
+
+def pick_tile_size(device: str) -> int:
+    """Pick the render tile size for a device from its free memory.
+
+    Large tiles keep a GPU busy when it has memory to spare, small tiles keep the memory
+    usage down when it doesn't.
 
     Args:
-        scene (bpy.types.Scene): The scene to render.
-        file_name (str): The path to save the image to.
-        use_gpu (bool, optional): use GPU accelerated Rendering. Defaults to True.
-        resolution_x (int, optional): Defaults to 1920.
-        resolution_y (int, optional): Defaults to 1080.
-        samples (int, optional): Defaults to 128.
+        device (str): Cycles device, 'GPU' or 'CPU'.
+
+    Returns:
+        int: Tile size in pixels, for the tile_x/tile_y of Blender 2.x.
     """
-    common_setup(scene)
+    if device == 'CPU':
+        return 64
+
+    free_mib = get_gpu_free_memory()
+    if free_mib is None:
+        return 256
+    elif free_mib > 8192:
+        return 512
+    elif free_mib > 2048:
+        return 256
+    else:
+        return 128
 
-    if animation:
-        file_name = "animation/" + file_name
-        scene.render.filepath = file_name+".avi"
+def set_tile_size(scene: bpy.types.Scene, device: str):
+    """Set the render tile size of a scene for a device.
+
+    Args:
+        scene (bpy.types.Scene): The scene to set.
+        device (str): Cycles device, 'GPU' or 'CPU'.
+    """
+    size = pick_tile_size(device)
+
+    if bpy.app.version >= (3, 0, 0):
+        # Cycles X renders the whole image at once and only tiles to save memory, a single
+        # tile over the whole frame keeps the GPU busy unless its memory is short
+        scene.cycles.use_auto_tile = True
+        if device == 'GPU' and size >= 256:
+            scene.cycles.tile_size = max(scene.render.resolution_x, scene.render.resolution_y)
+        else:
+            scene.cycles.tile_size = size * 4 if device == 'GPU' else 2048
     else:
-        scene.render.image_settings.file_format = 'PNG'
-        scene.render.filepath = file_name+".png"
+        scene.cycles.tile_x = size
+        scene.cycles.tile_y = size
 
+def _setup_cycles_gpu(scene: bpy.types.Scene) -> str:
+    """Set up Cycles on the GPU, returns the selected GPU backend."""
     scene.render.engine = 'CYCLES'
 
-    if use_gpu:
-        # Set the device_type
-        bpy.context.preferences.addons[
-            "cycles"
-        ].preferences.compute_device_type = "CUDA"
+    # Set the device_type and the devices, only probed on the first render
+    backend = setup_gpu_devices()
 
-        # Set the device and feature set
-        bpy.context.scene.cycles.device = "GPU"
+    # Set the device and feature set
+    scene.cycles.device = "GPU"
 
-        # get_devices() to let Blender detects GPU device
-        bpy.context.preferences.addons["cycles"].preferences.get_devices()
+    # set tile size from the free GPU memory
+    set_tile_size(scene, "GPU")
 
-        # for d in bpy.context.preferences.addons["cycles"].preferences.devices:
-        #     print(d["name"], d["use"])
+    return backend
 
-        # set tile size to 256x256
-        bpy.context.scene.cycles.tile_x = 2048
-        bpy.context.scene.cycles.tile_y = 2048
-    else:
-        # Set the device_type
-        bpy.context.preferences.addons[
-            "cycles"
-        ].preferences.compute_device_type = "CPU"
+def _setup_cycles_cpu(scene: bpy.types.Scene) -> None:
+    """Set up Cycles on the CPU."""
+    scene.render.engine = 'CYCLES'
+
+    # Set the device_type
+    bpy.context.preferences.addons["cycles"].preferences.compute_device_type = "CPU"
 
-        bpy.context.scene.cycles.device = "CPU"
+    scene.cycles.device = "CPU"
 
-        # set tile size to 64x64
-        bpy.context.scene.cycles.tile_x = 64
-        bpy.context.scene.cycles.tile_y = 64
+    # set tile size to 64x64
+    set_tile_size(scene, "CPU")
 
-    # Set Optix as denoiser
-    # bpy.context.scene.view_layers['View Layer'].cycles.use_denoising = True
+def _remove_subsurf_with_warning(scene: bpy.types.Scene) -> None:
+    # Prevent segfault
+    # TODO find cause
+    rm_objects = remove_subsurf_modifiers(scene)
+
+    if rm_objects:
+        print("Warning: Removing subsurf modifiers from the following objects:")
+        print(rm_objects)
+
+def _setup_eevee(scene: bpy.types.Scene) -> None:
+    """Set up Eevee."""
+    _remove_subsurf_with_warning(scene)
+
+    scene.render.engine = 'BLENDER_EEVEE'
+    scene.render.resolution_percentage = 100
+
+def _setup_workbench(scene: bpy.types.Scene) -> None:
+    """Set up Workbench, displaying the material colors."""
+    _remove_subsurf_with_warning(scene)
+
+    # # add exposure (workbench renders are very dark)
+    # scene.render.image_settings.view_settings.exposure *= 10
+    # scene.view_settings.exposure *= 10
+
+    scene.render.engine = 'BLENDER_WORKBENCH'
+
+    # display material color
+    shading = scene.display.shading
+    shading.light = 'STUDIO'
+    shading.color_type = 'MATERIAL'
+
+    scene.render.resolution_percentage = 100
 
-    # set samples
-    bpy.context.scene.cycles.samples = samples
+# Engine specific setup for each engine accepted by render
+_ENGINE_SETUPS = {
+    'CYCLES_GPU': _setup_cycles_gpu,
+    'CYCLES_CPU': _setup_cycles_cpu,
+    'EEVEE': _setup_eevee,
+    'WORKBENCH': _setup_workbench,
+}
+
+def _prepare_render(scene: bpy.types.Scene,
+                    file_name: str,
+                    engine: str,
+                    resolution_x: int,
+                    resolution_y: int,
+                    transparent: bool,
+                    animation: bool):
+    """Apply the common and the engine setup, returns the result of the engine setup."""
+    try:
+        setup_engine = _ENGINE_SETUPS[engine]
+    except KeyError:
+        raise ValueError(f'engine must be one of: {list(_ENGINE_SETUPS)}') from None
+
+    common_setup(scene, resolution_x, resolution_y, transparent)
+
+    set_output_path(scene, file_name, animation)
+
+    return setup_engine(scene)
+
+def render(scene: bpy.types.Scene,
+           file_name: str,
+           engine: str = 'CYCLES_GPU',
+           resolution_x: int=1920,
+           resolution_y: int=1080,
+           transparent: bool=False,
+           animation: bool=False):
+    """Render a scene with one of the engines.
+
+    Uses the default settings of the engine, see cycles_render for the Cycles sampling settings.
+
+    Args:
+        scene (bpy.types.Scene): The scene to render.
+        file_name (str): The path to save the image to.
+        engine (str, optional): One of 'CYCLES_GPU', 'CYCLES_CPU', 'EEVEE', 'WORKBENCH'.
+            Defaults to 'CYCLES_GPU'.
+        resolution_x (int, optional): Defaults to 1920.
+        resolution_y (int, optional): Defaults to 1080.
+        transparent (bool, optional): Render with a transparent background. Defaults to False.
+        animation (bool, optional): Render the whole animation. Defaults to False.
+    """
+    _prepare_render(scene, file_name, engine, resolution_x, resolution_y, transparent, animation)
+
+    bpy.ops.render.render(write_still=1, animation=animation)
+
+def cycles_render(scene: bpy.types.Scene,
+                  file_name: str,
+                  use_gpu: bool=True,
+                  resolution_x: int=1920,
+                  resolution_y:int =1080,
+                  samples: int=32,
+                  transparent: bool=False,
+                  animation: bool=False,
+                  noise_threshold: float=0.01,
+                  use_denoising: bool=True):
+    """Render a scene using th Cycles engine.
+
+    Args:
+        scene (bpy.types.Scene): The scene to render.
+        file_name (str): The path to save the image to.
+        use_gpu (bool, optional): use GPU accelerated Rendering. Defaults to True.
+        resolution_x (int, optional): Defaults to 1920.
+        resolution_y (int, optional): Defaults to 1080.
+        samples (int, optional): Maximum samples per pixel. Defaults to 32, denoised renders
+            need far fewer samples than raw ones.
+        noise_threshold (float, optional): Adaptive sampling stops sampling a pixel once its
+            noise is below this threshold. Defaults to 0.01.
+        use_denoising (bool, optional): Denoise the render, with OptiX on OPTIX GPUs and
+            OpenImageDenoise otherwise. Defaults to True.
+    """
+    engine = 'CYCLES_GPU' if use_gpu else 'CYCLES_CPU'
+    backend = _prepare_render(scene, file_name, engine, resolution_x, resolution_y, transparent, animation)
+
+    cycles = scene.cycles
+
+    # Set Optix as denoiser on OPTIX GPUs, OpenImageDenoise everywhere else
+    cycles.use_denoising = use_denoising
+    if use_denoising:
+        cycles.denoiser = "OPTIX" if backend == "OPTIX" else "OPENIMAGEDENOISE"
+        cycles.denoising_input_passes = 'RGB_ALBEDO_NORMAL'
+        # denoise on the GPU too, only available in newer blender versions
+        if hasattr(cycles, 'denoising_use_gpu'):
+            cycles.denoising_use_gpu = use_gpu
+
+    # set samples, converged pixels stop early
+    cycles.use_adaptive_sampling = True
+    cycles.adaptive_threshold = noise_threshold
+    cycles.adaptive_min_samples = min(samples, max(16, samples // 8))
+    cycles.samples = samples
 
     bpy.ops.render.render(write_still=1, animation=animation)
 
@@ -129,32 +410,10 @@ def eevee_render(scene: bpy.types.Scene,
     Args:
         scene (bpy.types.Scene): The scene to render.
         file_name (str): The path to save the image to.
-        use_gpu (bool, optional): use GPU accelerated Rendering. Defaults to True.
         resolution_x (int, optional): Defaults to 1920.
         resolution_y (int, optional): Defaults to 1080.
     """
-    common_setup(scene)
-
-    # Prevent segfault
-    # TODO find cause
-    rm_objects = remove_subsurf_modifiers(scene)
-
-    if animation:
-        file_name = "animation/" + file_name
-        scene.render.filepath = file_name+".avi"
-    else:
-        scene.render.image_settings.file_format = 'PNG'
-        scene.render.filepath = file_name+".png"
-
-    if rm_objects:
-        print("Warning: Removing subsurf modifiers from the following objects:")
-        print(rm_objects)
-
-    scene.render.engine = 'BLENDER_EEVEE'
-    scene.render.resolution_x = resolution_x
-    scene.render.resolution_y = resolution_y
-    scene.render.resolution_percentage = 100
-    bpy.ops.render.render(write_still=1, animation=animation)
+    render(scene, file_name, 'EEVEE', resolution_x, resolution_y, transparent, animation)
 
 def workbench_render(scene: bpy.types.Scene,
                      file_name: str,
@@ -166,43 +425,136 @@ def workbench_render(scene: bpy.types.Scene,
 
     Very fast render for prototiping animations and positions.
     """
-    common_setup(scene)
+    render(scene, file_name, 'WORKBENCH', resolution_x, resolution_y, transparent, animation)
 
-    # Prevent segfault
-    # TODO find cause
-    rm_objects = remove_subsurf_modifiers(scene)
 
-    # # add exposure (workbench renders are very dark)
-    # scene.render.image_settings.view_settings.exposure *= 10
-    # scene.view_settings.exposure *= 10
+def render_animation(scene: bpy.types.Scene,
+                     file_name: str,
+                     frame_start: int,
+                     frame_end: int,
+                     renderer=cycles_render,
+                     **kwargs):
+    """Render a range of frames as one animation.
 
-    if animation:
-        file_name = "animation/" + file_name
-        scene.render.filepath = file_name+".avi"
-    else:
-        scene.render.image_settings.file_format = 'PNG'
-        scene.render.filepath = file_name+".png"
+    All the frames are rendered by a single render call instead of one call per frame, so
+    the persistent render data (BVH, textures) is kept between frames.
 
-    if rm_objects:
-        print("Warning: Removing subsurf modifiers from the following objects:")
-        print(rm_objects)
+    Args:
+        scene (bpy.types.Scene): The scene to render.
+        file_name (str): The path to save the animation to.
+        frame_start (int): The first frame.
+        frame_end (int): The last frame.
+        renderer (callable, optional): One of cycles_render, eevee_render or workbench_render.
+            Defaults to cycles_render.
+        **kwargs: Other arguments of the renderer.
+    """
+    scene.frame_start = frame_start
+    scene.frame_end = frame_end
 
-    scene.render.engine = 'BLENDER_WORKBENCH'
+    # keep the synced scene between frames
+    scene.render.use_persistent_data = True
 
-    # display material color
-    shading = scene.display.shading
-    shading.light = 'STUDIO'
-    shading.color_type = 'MATERIAL'
+    renderer(scene, file_name, animation=True, **kwargs)
 
-    scene.render.resolution_x = resolution_x
-    scene.render.resolution_y = resolution_y
-    scene.render.resolution_percentage = 100
 
-    # set transparent background
-    if transparent:
-        scene.render.alpha_mode = 'TRANSPARENT'
+def render_animation_batched(scene: bpy.types.Scene,
+                             file_name: str,
+                             num_workers: Optional[int] = None,
+                             frames_per_batch: Optional[int] = None,
+                             blender_binary: Optional[str] = None) -> List[str]:
+    """Render an animation split into frame batches over parallel background blender processes.
 
-    bpy.ops.render.render(write_still=1, animation=animation)
+    The scene is rendered with its current render settings (engine, format, frame range), so
+    set it up before calling this function. A copy of the file is saved and each batch is
+    rendered from it by a `blender -b` process. With NVIDIA GPUs each process sees one GPU
+    through CUDA_VISIBLE_DEVICES, shared round-robin when there are more workers than GPUs,
+    and Cycles GPU renders set up the GPU backend in the process, the device preferences
+    are not saved in the file. Movie batches are joined with the ffmpeg concat demuxer,
+    image frames are moved next to file_name.
+
+    Args:
+        scene (bpy.types.Scene): The scene to render.
+        file_name (str): The path to save the animation to, without extension.
+        num_workers (Optional[int]): Number of parallel renders. Defaults to one per GPU.
+        frames_per_batch (Optional[int]): Frames per batch. Defaults to splitting the frame
+            range evenly between the workers.
+        blender_binary (Optional[str]): Blender executable. Defaults to the running blender.
+
+    Returns:
+        List[str]: The rendered files.
+    """
+    n_gpus = get_gpu_count()
+    if num_workers is None:
+        num_workers = max(1, n_gpus)
+
+    n_frames = scene.frame_end - scene.frame_start + 1
+    if frames_per_batch is None:
+        frames_per_batch = math.ceil(n_frames / num_workers)
+
+    batches = [(start, min(start + frames_per_batch - 1, scene.frame_end))
+               for start in range(scene.frame_start, scene.frame_end + 1, frames_per_batch)]
+
+    if blender_binary is None:
+        # empty when running as the bpy python module
+        blender_binary = bpy.app.binary_path or shutil.which('blender')
+        if not blender_binary:
+            raise FileNotFoundError('blender executable not found, pass it as blender_binary')
+
+    # the compute device is a user preference, set it up again in each process
+    worker_args = []
+    if scene.render.engine == 'CYCLES' and scene.cycles.device == 'GPU':
+        backend = setup_gpu_devices()
+        worker_args = ['--python-expr', WORKER_GPU_SETUP.format(backend=backend)]
+
+    output_dir = os.path.dirname(os.path.abspath(file_name))
+    os.makedirs(output_dir, exist_ok=True)
+
+    # each worker takes a GPU from the pool and gives it back when its batch is done, None
+    # when the GPUs can't be listed
+    gpus = queue.Queue()
+    for worker in range(num_workers):
+        gpus.put(worker % n_gpus if n_gpus else None)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        blend_file = os.path.join(tmp_dir, 'scene.blend')
+        bpy.ops.wm.save_as_mainfile(filepath=blend_file, copy=True)
+
+        def render_batch(batch_index: int) -> List[str]:
+            start, end = batches[batch_index]
+            batch_output = os.path.join(tmp_dir, f'batch_{batch_index:04d}_')
+            gpu = gpus.get()
+            env = os.environ if gpu is None else dict(os.environ, CUDA_VISIBLE_DEVICES=str(gpu))
+            try:
+                subprocess.run([blender_binary, '-b', blend_file, '-S', scene.name, *worker_args,
+                                '-o', batch_output, '-s', str(start), '-e', str(end), '-a'],
+                               env=env,
+                               stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL,
+                               check=True)
+            finally:
+                gpus.put(gpu)
+            return sorted(glob.glob(batch_output + '*'))
+
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            batch_files = list(executor.map(render_batch, range(len(batches))))
+
+        if scene.render.is_movie_format:
+            extension = os.path.splitext(batch_files[0][0])[1]
+            output_file = file_name + extension
+
+            concat_videos([batch_file for files in batch_files for batch_file in files], output_file)
+            return [output_file]
+
+        # image sequence, the frames already carry their frame number
+        output_files = []
+        for files in batch_files:
+            for batch_file in files:
+                frame_name = os.path.basename(batch_file).split('_', 2)[2]
+                output_file = file_name + frame_name
+                shutil.move(batch_file, output_file)
+                output_files.append(output_file)
+
+        return output_files
 
 
 def remove_subsurf_modifiers(scene: bpy.types.Scene) -> List[str]:
@@ -214,16 +566,16 @@ def remove_subsurf_modifiers(scene: bpy.types.Scene) -> List[str]:
     Returns:
         List[str]: The names of the objects with subsurf modifiers.
     """
-    objects_with_subsurf = []
-
     objects: List[bpy.types.Object] = scene.objects
 
-    for ob in objects:
-        if ob.type == 'MESH':
-            for mod in ob.modifiers:
-                if mod.type == 'SUBSURF':
-                    objects_with_subsurf.append(ob.name)
-                    mod.show_render = False
-                    ob.modifiers.remove(mod)
+    # collect first, removing while iterating over the modifiers skips some of them
+    meshes = (ob for ob in objects if ob.type == 'MESH' and ob.modifiers)
+    targets = [(ob, mod)
+               for ob in meshes
+               for mod in ob.modifiers if mod.type == 'SUBSURF']
+
+    for ob, mod in targets:
+        mod.show_render = False
+        ob.modifiers.remove(mod)
 
-    return objects_with_subsurf
+    return [ob.name for ob, _ in targets]
@@ -4,20 +4,21 @@ import bpy
 import numpy as np
 
 from .camera import add_camera
+from .materials import reset_material_cache
 from .utils import clean_objects
 from .shapes import draw_arrow
 
 def draw_xy_axes(axes_length: float = 1.0,
                  origin: Tuple[float, float, float] = (0, 0, 0)):
 
-    origin = np.array([0, 0, 0])
+    origin = (0, 0, 0)
 
-    vector = np.array([1, 0, 0]) * axes_length
+    vector = (axes_length, 0, 0)
     x_axis = draw_arrow(origin, vector,
                        name = 'x_axis',
                        color = (1, 0, 0, 1.0))
 
-    vector = np.array([0, 1, 0]) * axes_length
+    vector = (0, axes_length, 0)
     y_axis = draw_arrow(origin, vector,
                        name = 'y_axis',
                        color = (0, 1, 0, 1.0))
@@ -27,19 +28,19 @@ def draw_xy_axes(axes_length: float = 1.0,
 def draw_xyz_axes(axes_length: float = 1.0,
                   origin: Tuple[float, float, float] = (0, 0, 0)):
 
-    origin = np.array([0, 0, 0])
+    origin = (0, 0, 0)
 
-    vector = np.array([1, 0, 0]) * axes_length
+    vector = (axes_length, 0, 0)
     x_axis = draw_arrow(origin, vector,
                        name = 'x_axis',
                        color = (1, 0, 0, 1.0))
 
-    vector = np.array([0, 1, 0]) * axes_length
+    vector = (0, axes_length, 0)
     y_axis = draw_arrow(origin, vector,
                        name = 'y_axis',
                        color = (0, 1, 0, 1.0))
 
-    vector = np.array([0, 0, 1]) * axes_length
+    vector = (0, 0, axes_length)
     z_axis = draw_arrow(origin, vector,
                        name = 'z_axis',
                        color = (0.3, 0.3, 1, 1.0))
@@ -56,6 +57,7 @@ def create_2d_scene(x_lim: Iterable[float],
     Delete all objects and create a new scene.
     """
     clean_objects()
+    reset_material_cache()
 
     scene = bpy.context.scene
 
@@ -102,6 +104,7 @@ def create_3d_scene(x_lim: Tuple[float],
     Delete all objects and create a new scene.
     """
     clean_objects()
+    reset_material_cache()
 
     # FOV = 2 arctan (d / (2 f))
     fov = 45.0
@@ -113,15 +116,6 @@ def create_3d_scene(x_lim: Tuple[float],
 
     center = (x_lim[0] + x_lim[1]) / 2.0, (y_lim[0] + y_lim[1]) / 2.0, (z_lim[0] + z_lim[1]) / 2.0
 
-    # r: radius
-    # theta: (90 - theta) from z axis
-    # gamma: angle from x axis
-    s2c = lambda r, theta, gamma : np.array([
-        r * np.cos(gamma) * np.cos(theta),
-        r * np.sin(gamma) * np.cos(theta),
-        r * np.sin(theta)
-    ])
-
     # TODO Make camera distance dependent on the scene size
     if camera_distance is None:
         camera_distance = 8.0
@@ -134,7 +128,16 @@ def create_3d_scene(x_lim: Tuple[float],
     theta_offs = np.radians(25)
     gamma_offs = np.radians(30)
 
-    camera_offset = s2c(camera_distance, camera_theta, camera_gamma)
+    # spherical to cartesian of the camera and the two lights at once
+    # theta: (90 - theta) from z axis
+    # gamma: angle from x axis
+    thetas = np.array([camera_theta, camera_theta + theta_offs, camera_theta + theta_offs])
+    gammas = np.array([camera_gamma, camera_gamma - gamma_offs, camera_gamma + gamma_offs])
+    positions = camera_distance * np.stack([np.cos(gammas) * np.cos(thetas),
+                                            np.sin(gammas) * np.cos(thetas),
+                                            np.sin(thetas)], axis=1)
+
+    camera_offset = positions[0]
 
     camera_location = np.asarray(center) + camera_offset
 
@@ -148,23 +151,22 @@ def create_3d_scene(x_lim: Tuple[float],
 
     # projection_matrix = get_perspective(camera)
 
-    # add two area lights
-
+    # add two point lights, their energies differ so each one needs its own light data
     light_energies = np.array([4000, 1000, 1000]) * light_energy
-    for i in range(2):
-        light_name = f'point-light-{i}'
-        # Create light datablock
-        light_data = bpy.data.lights.new(name=light_name+"-data", type='POINT')
-        light_data.energy = light_energies[i]
-
-        # Create new object, pass the light data
-        light_object = bpy.data.objects.new(name=light_name+"-object", object_data=light_data)
 
-        # Link object to collection in context
-        bpy.context.collection.objects.link(light_object)
+    light_data_0 = bpy.data.lights.new(name="point-light-0-data", type='POINT')
+    light_data_0.energy = light_energies[0]
+    light_object_0 = bpy.data.objects.new(name="point-light-0-object", object_data=light_data_0)
+    light_object_0.location = positions[1]
 
-        position = s2c(camera_distance, camera_theta+theta_offs, camera_gamma+gamma_offs*(-(-1)**i))
+    light_data_1 = bpy.data.lights.new(name="point-light-1-data", type='POINT')
+    light_data_1.energy = light_energies[1]
+    light_object_1 = bpy.data.objects.new(name="point-light-1-object", object_data=light_data_1)
+    light_object_1.location = positions[2]
 
-        light_object.location = position
+    # Link objects to collection in context
+    collection_objects = bpy.context.collection.objects
+    collection_objects.link(light_object_0)
+    collection_objects.link(light_object_1)
 
     return scene, camera
@@ -1,10 +1,217 @@
+import itertools
 from typing import Iterable, List, Optional, Tuple
 
 import bpy
-import bmesh
-import mathutils
 import numpy as np
 from blender_plotting.utils.materials import create_solid_material
+from blender_plotting.utils.utils import deferred_scene_update
+
+# Unit length arrow meshes (body, head) already created, keyed by thickness
+_ARROW_MESH_CACHE = {}
+
+# Rotations from the z axis to each coordinate axis, as (w, x, y, z) quaternions
+_SQRT1_2 = np.sqrt(0.5)
+_AXIS_ROTATIONS = {
+    (1.0, 0.0, 0.0): (_SQRT1_2, 0.0, _SQRT1_2, 0.0),
+    (-1.0, 0.0, 0.0): (_SQRT1_2, 0.0, -_SQRT1_2, 0.0),
+    (0.0, 1.0, 0.0): (_SQRT1_2, -_SQRT1_2, 0.0, 0.0),
+    (0.0, -1.0, 0.0): (_SQRT1_2, _SQRT1_2, 0.0, 0.0),
+    (0.0, 0.0, 1.0): (1.0, 0.0, 0.0, 0.0),
+    (0.0, 0.0, -1.0): (0.0, 1.0, 0.0, 0.0),
+}
+
+def create_uv_sphere_mesh(radius: float = 1.0,
+                          segments: int = 32,
+                          rings: int = 16,
+                          name: str = 'sphere') -> bpy.types.Mesh:
+    """Creates a UV sphere mesh without adding any object to the scene.
+
+    Objects created from the returned mesh share its geometry and materials. The faces are
+    shaded smooth.
+
+    Args:
+        radius (float): Radius of the sphere.
+        segments (int): Number of segments of the sphere.
+        rings (int): Number of rings of the sphere.
+        name (str): Name of the mesh.
+
+    Returns:
+        bpy.types.Mesh: The sphere mesh.
+    """
+    # rings of vertices between the two poles
+    theta, phi = np.meshgrid(np.linspace(0, 2*np.pi, segments, endpoint=False),
+                             np.linspace(0, np.pi, rings + 1)[1:-1])
+    ring_vertices = np.stack((np.sin(phi)*np.cos(theta),
+                              np.sin(phi)*np.sin(theta),
+                              np.cos(phi)), axis=-1).reshape(-1, 3)
+    vertices = radius * np.vstack(((0, 0, 1), ring_vertices, (0, 0, -1)))
+
+    # index of the vertices of each ring, the poles are the first and last vertex
+    ring_idx = 1 + np.arange((rings - 1) * segments).reshape(rings - 1, segments)
+    ring_nxt = np.roll(ring_idx, -1, axis=1)
+    south_pole = len(vertices) - 1
+
+    top = np.column_stack((np.zeros(segments, dtype=int), ring_idx[0], ring_nxt[0]))
+    quads = np.stack((ring_idx[:-1], ring_idx[1:], ring_nxt[1:], ring_nxt[:-1]), axis=-1)
+    bottom = np.column_stack((np.full(segments, south_pole), ring_nxt[-1], ring_idx[-1]))
+
+    loops = np.concatenate((top.ravel(), quads.ravel(), bottom.ravel()))
+    loop_totals = np.concatenate((np.full(segments, 3),
+                                  np.full(quads.shape[0] * segments, 4),
+                                  np.full(segments, 3)))
+
+    mesh = _mesh_from_loops(name, vertices, loops, loop_totals)
+    mesh.polygons.foreach_set('use_smooth', np.ones(len(loop_totals), dtype=bool))
+
+    return mesh
+
+
+def create_cone_mesh(radius1: float = 1.0,
+                     radius2: float = 0.0,
+                     depth: float = 2.0,
+                     segments: int = 32,
+                     name: str = 'cone') -> bpy.types.Mesh:
+    """Creates a cone (or cylinder) mesh along the z axis without adding any object to the scene.
+
+    The mesh is centered at the origin and its ends are filled with n-gons. The geometry is
+    computed with NumPy and written with foreach_set.
+
+    Args:
+        radius1 (float): Radius of the bottom end.
+        radius2 (float): Radius of the top end, 0 for a cone.
+        depth (float): Length of the cone.
+        segments (int): Number of segments of the cone.
+        name (str): Name of the mesh.
+
+    Returns:
+        bpy.types.Mesh: The cone mesh.
+    """
+    vertices, loops, loop_totals = _cone_geometry(radius1, radius2, depth, segments)
+
+    return _mesh_from_loops(name, vertices, loops, loop_totals)
+
+
+def _cone_geometry(radius1: float,
+                   radius2: float,
+                   depth: float,
+                   segments: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    angles = np.linspace(0, 2*np.pi, segments, endpoint=False)
+    ring = np.column_stack((np.cos(angles), np.sin(angles), np.zeros(segments)))
+    idx = np.arange(segments)
+    nxt = (idx + 1) % segments
+
+    bottom = ring * (radius1, radius1, 1) + (0, 0, -depth/2)
+
+    if radius2 > 0:
+        top = ring * (radius2, radius2, 1) + (0, 0, depth/2)
+        vertices = np.vstack((bottom, top))
+        # side quads, then the top and bottom n-gons
+        polygons = [*np.column_stack((idx, nxt, nxt + segments, idx + segments)),
+                    idx + segments,
+                    idx[::-1]]
+    else:
+        vertices = np.vstack((bottom, (0, 0, depth/2)))
+        # side triangles to the apex, then the bottom n-gon
+        polygons = [*np.column_stack((idx, nxt, np.full(segments, segments))),
+                    idx[::-1]]
+
+    loop_totals = np.array([len(polygon) for polygon in polygons])
+
+    return vertices, np.concatenate(polygons), loop_totals
+
+
+def _mesh_from_loops(name: str,
+                     vertices: np.ndarray,
+                     loops: np.ndarray,
+                     loop_totals: np.ndarray) -> bpy.types.Mesh:
+    loop_totals = loop_totals.astype(np.int32)
+    loop_starts = np.concatenate(([0], np.cumsum(loop_totals)[:-1])).astype(np.int32)
+    loops = loops.astype(np.int32)
+
+    mesh = bpy.data.meshes.new(name)
+
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set('co', vertices.astype(np.float32).ravel())
+
+    mesh.loops.add(len(loops))
+    mesh.loops.foreach_set('vertex_index', loops)
+
+    mesh.polygons.add(len(loop_totals))
+    mesh.polygons.foreach_set('loop_start', loop_starts)
+    mesh.polygons.foreach_set('loop_total', loop_totals)
+
+    mesh.update(calc_edges=True)
+
+    return mesh
+
+
+def z_rotation_to(direction: np.ndarray) -> np.ndarray:
+    """Get the shortest rotation from the z axis to a direction.
+
+    Closed form of the rotation difference from (0, 0, 1), the quaternion (1 + z, -y, x, 0)
+    normalized.
+
+    Args:
+        direction (np.ndarray): Direction to rotate to, does not need to be normalized.
+
+    Returns:
+        np.ndarray: The rotation as a (w, x, y, z) quaternion.
+    """
+    x, y, z = direction / np.linalg.norm(direction)
+
+    # axis aligned arrows, e.g. the plot axes
+    axis_rotation = _AXIS_ROTATIONS.get((x, y, z))
+    if axis_rotation is not None:
+        return np.array(axis_rotation)
+
+    w = 1 + z
+
+    # antiparallel, any half turn around an horizontal axis works
+    if w < 1e-8:
+        return np.array([0.0, 1.0, 0.0, 0.0])
+
+    return np.array([w, -y, x, 0.0]) / np.sqrt(2*w)
+
+
+def _arrow_head_ratio(thickness: float) -> float:
+    return 0.2 + 0.3 * max(0.0, min(1.0, (thickness - 1)/3))
+
+
+def _get_arrow_meshes(thickness: float) -> Tuple[bpy.types.Mesh, bpy.types.Mesh]:
+    """Get the body and head meshes of an arrow of length 1, creating them on first use.
+
+    The arrow geometry scales uniformly with its length, so every arrow of the same thickness
+    shares these meshes and is scaled by its length.
+
+    Args:
+        thickness (float): relative thickness of the arrow.
+
+    Returns:
+        Tuple[bpy.types.Mesh, bpy.types.Mesh]: The arrow body and head meshes.
+    """
+    meshes = _ARROW_MESH_CACHE.get(thickness)
+    if meshes is not None:
+        try:
+            meshes[0].name, meshes[1].name  # raises ReferenceError if a mesh was removed
+            return meshes
+        except ReferenceError:
+            del _ARROW_MESH_CACHE[thickness]
+
+    head_ratio = _arrow_head_ratio(thickness)
+
+    body = create_cone_mesh(radius1=0.01*thickness, radius2=0.01*thickness,
+                            depth=1 - head_ratio, segments=16, name='arrow_body')
+    head = create_cone_mesh(radius1=0.05*thickness, radius2=0,
+                            depth=head_ratio, segments=32, name='arrow_head')
+
+    # materials are set per object, the meshes only hold the slot
+    body.materials.append(None)
+    head.materials.append(None)
+
+    meshes = (body, head)
+    _ARROW_MESH_CACHE[thickness] = meshes
+
+    return meshes
 
 
 def draw_arrow(vector_origin: np.ndarray,
@@ -24,55 +231,42 @@ def draw_arrow(vector_origin: np.ndarray,
     Returns:
         Tuple[bpy.types.Object, bpy.types.Object]: The arrow body and the arrow head.
     """
-    # as np.array
-    vector_origin = np.array(vector_origin)
-    vector_end = np.array(vector_end)
-
+    # as np.array, without copying arrays
+    vector_origin = np.asarray(vector_origin, dtype=np.float64)
+    vector_end = np.asarray(vector_end, dtype=np.float64)
 
     if vector_origin.size == 2:
-        vector_origin = np.append(vector_origin, 0)
+        vector_origin = np.concatenate((vector_origin, (0.0,)))
     if vector_end.size == 2:
-        vector_end = np.append(vector_end, 0)
+        vector_end = np.concatenate((vector_end, (0.0,)))
 
 
     np_vector = vector_end - vector_origin
-    v = mathutils.Vector(np_vector)
-    up = mathutils.Vector((0,0,1))  # Z-Axis up convention
-    if v!=-up:
-        rot = up.rotation_difference(v)
-    else:
-        rot = mathutils.Quaternion((1,0,0),np.pi)
+    length = np.linalg.norm(np_vector)
+    direction = np_vector / length
+    rot = z_rotation_to(direction).tolist()  # Z-Axis up convention
 
-    head_ratio = 0.2 + 0.3 * np.clip((thickness - 1)/3, 0, 1)
+    head_ratio = _arrow_head_ratio(thickness)
+    body_mesh, head_mesh = _get_arrow_meshes(thickness)
+    collection = bpy.context.collection
 
     # Create the cylinder part
-    cyl_length = v.length*(1-head_ratio)
-    bpy.ops.mesh.primitive_cylinder_add(vertices=16,
-                                        radius=v.length*0.01*thickness,
-                                        depth=cyl_length,
-                                        end_fill_type='NGON',
-                                        enter_editmode=False)
-    cylinder = bpy.context.active_object
-    cylinder.location = vector_origin + cyl_length/2 * v.normalized()
+    cyl_length = length*(1-head_ratio)
+    cylinder = bpy.data.objects.new('arrow_body' if name is None else name + '_body', body_mesh)
+    collection.objects.link(cylinder)
+    cylinder.location = vector_origin + cyl_length/2 * direction
     cylinder.rotation_mode = 'QUATERNION'
     cylinder.rotation_quaternion = rot
-    if name is not None:
-        cylinder.name = name + '_body'
+    cylinder.scale = (length, length, length)
 
     # Create the cone part
-    cone_length = v.length*head_ratio
-    bpy.ops.mesh.primitive_cone_add(
-        radius1=v.length*0.05*thickness,
-        radius2=0,
-        depth=cone_length,
-        enter_editmode=False)
-    # bpy.ops.mesh.faces_shade_smooth()
-    cone = bpy.context.active_object
-    cone.location = vector_origin + (cyl_length + cone_length/2) * v.normalized()
+    cone_length = length*head_ratio
+    cone = bpy.data.objects.new('arrow_head' if name is None else name + '_head', head_mesh)
+    collection.objects.link(cone)
+    cone.location = vector_origin + (cyl_length + cone_length/2) * direction
     cone.rotation_mode = 'QUATERNION'
     cone.rotation_quaternion = rot
-    if name is not None:
-        cone.name = name + '_head'
+    cone.scale = (length, length, length)
 
     # Create the material
     if name is None:
@@ -80,33 +274,120 @@ def draw_arrow(vector_origin: np.ndarray,
     else:
         arrow_mat = create_solid_material(color, name=name + '_color')
 
-    cylinder.data.materials.append(arrow_mat)
-    cone.data.materials.append(arrow_mat)
+    # the meshes are shared, so the material is linked to the objects
+    for obj in (cylinder, cone):
+        obj.material_slots[0].link = 'OBJECT'
+        obj.material_slots[0].material = arrow_mat
 
     return (cylinder, cone)
 
+def draw_arrows(vector_origins: np.ndarray,
+                vector_ends: np.ndarray,
+                name: str = 'arrows',
+                thickness: float = 1,
+                color: tuple = (1, 0, 0, 1.0)) -> bpy.types.Object:
+    """Add many 3D arrows to the scene as a single object.
+
+    The arrows have the same geometry as the ones from draw_arrow, but are merged into
+    one mesh, which is much faster to create and to render for large numbers of arrows.
+
+    Args:
+        vector_origins (np.ndarray): (N, 2) or (N, 3) origins of the arrows.
+        vector_ends (np.ndarray): (N, 2) or (N, 3) ends of the arrows.
+        name (str): Name of the arrows object.
+        thickness (float): relative thickness of the arrows.
+        color (tuple): Color of the arrows.
+
+    Returns:
+        bpy.types.Object: The arrows object.
+    """
+    vector_origins = np.atleast_2d(np.asarray(vector_origins, dtype=float))
+    vector_ends = np.atleast_2d(np.asarray(vector_ends, dtype=float))
+
+    if vector_origins.shape[1] == 2:
+        vector_origins = np.pad(vector_origins, ((0, 0), (0, 1)))
+    if vector_ends.shape[1] == 2:
+        vector_ends = np.pad(vector_ends, ((0, 0), (0, 1)))
+
+    vectors = vector_ends - vector_origins
+    lengths = np.linalg.norm(vectors, axis=1)
+    x, y, z = (vectors / lengths[:, None]).T
+
+    # rotations from the z axis, I + K + K^2/(1 + z) with K the cross product matrix of z x v
+    antiparallel = 1 + z < 1e-8
+    inv_w = np.where(antiparallel, 0, 1 / np.where(antiparallel, 1, 1 + z))
+    rots = np.empty((len(vectors), 3, 3))
+    rots[:, 0] = np.column_stack((1 - x*x*inv_w, -x*y*inv_w, x))
+    rots[:, 1] = np.column_stack((-x*y*inv_w, 1 - y*y*inv_w, y))
+    rots[:, 2] = np.column_stack((-x, -y, z))
+    # half turn around x
+    rots[antiparallel] = np.diag((1.0, -1.0, -1.0))
+
+    # unit length arrow template starting at the origin
+    head_ratio = _arrow_head_ratio(thickness)
+    body_vertices, body_loops, body_totals = _cone_geometry(0.01*thickness, 0.01*thickness,
+                                                            1 - head_ratio, 16)
+    head_vertices, head_loops, head_totals = _cone_geometry(0.05*thickness, 0, head_ratio, 32)
+    template = np.vstack((body_vertices + (0, 0, (1 - head_ratio)/2),
+                          head_vertices + (0, 0, 1 - head_ratio/2)))
+    template_loops = np.concatenate((body_loops, head_loops + len(body_vertices)))
+    template_totals = np.concatenate((body_totals, head_totals))
+
+    vertices = np.einsum('nij,vj->nvi', rots * lengths[:, None, None], template)
+    vertices += vector_origins[:, None]
+
+    # the same polygons for every arrow, offset to its vertices
+    loops = template_loops + len(template) * np.arange(len(vectors))[:, None]
+    loop_totals = np.tile(template_totals, len(vectors))
+
+    arrows = bpy.data.objects.new(name, _mesh_from_loops(name,
+                                                         vertices.reshape(-1, 3),
+                                                         loops.ravel(),
+                                                         loop_totals))
+    bpy.context.collection.objects.link(arrows)
+
+    arrows.data.materials.append(create_solid_material(color, name=name + '_color'))
+
+    return arrows
+
+
 def draw_points(points: Iterable[Tuple[float, float, float]],
                 color: Tuple[float, float, float, float] = (1, 0, 0, 1.0),
-                radius: float = 0.05) -> List[bpy.types.Object]:
+                radius: float = 0.05,
+                colors: Optional[Iterable[Tuple[float, float, float, float]]] = None) -> List[bpy.types.Object]:
     """Draws a list of points.
 
     Args:
         points (List[Tuple[float, float, float]]): List of points.
         color (Tuple[float, float, float, float]): Color of the points.
         radius (float): Radius of the points.
+        colors (Optional[Iterable[Tuple[float, float, float, float]]]): Color of each point,
+            overrides color.
 
     Returns:
         List[bpy.types.Object]: List of points.
     """
 
-    points_objs = []
+    # All the points share the same sphere mesh, and the same material if they have one color
+    sphere_mesh = create_uv_sphere_mesh(radius=radius, name='point')
+    if colors is None:
+        sphere_mesh.materials.append(create_solid_material(color))
+        colors = itertools.repeat(None)
+    else:
+        # materials are set per object, the mesh only holds the slot
+        sphere_mesh.materials.append(None)
 
-    for point in points:
-        bpy.ops.mesh.primitive_uv_sphere_add(radius=radius, location=point)
-        points_objs.append(bpy.context.object)
-        bpy.context.object.data.materials.append(create_solid_material(color))
-        # shade smooth
-        bpy.ops.object.shade_smooth()
+    points_objs = []
+    collection_objects = bpy.context.collection.objects
+    with deferred_scene_update():
+        for i, (point, point_color) in enumerate(zip(points, colors)):
+            point_obj = bpy.data.objects.new(f'point_{i}', sphere_mesh)
+            point_obj.location = point
+            if point_color is not None:
+                point_obj.material_slots[0].link = 'OBJECT'
+                point_obj.material_slots[0].material = create_solid_material(point_color)
+            collection_objects.link(point_obj)
+            points_objs.append(point_obj)
 
     return points_objs
 
@@ -127,15 +408,12 @@ def draw_sphere(center: Tuple[float, float, float],
         bpy.types.Object: The sphere.
     """
 
-    bpy.ops.mesh.primitive_uv_sphere_add(radius=radius,
-                                         location=center,
-                                         segments=segments,
-                                         ring_count=rings)
-    sphere = bpy.context.object
+    # the mesh is already shaded smooth
+    sphere = bpy.data.objects.new('sphere', create_uv_sphere_mesh(radius=radius,
+                                                                  segments=segments,
+                                                                  rings=rings))
+    sphere.location = center
+    bpy.context.collection.objects.link(sphere)
     sphere.data.materials.append(create_solid_material(color))
 
-    # shade smooth
-    for face in sphere.data.polygons:
-        face.use_smooth = True
-
     return sphere
@@ -1,5 +1,5 @@
+import itertools
 import pathlib
-import uuid
 from typing import Tuple
 
 import bpy
@@ -9,9 +9,12 @@ from blender_plotting.utils.materials import create_solid_material
 # find the directory of this file
 base_module_dir = pathlib.Path(__file__).parent.parent
 
-# import CMU Fonts
+# Numbering of the unnamed texts, blender adds a suffix if a name is already taken
+_TEXT_COUNTER = itertools.count()
+
+# import CMU Fonts, reusing the ones already loaded (e.g. when the module is reloaded)
 for font_file in base_module_dir.glob('resources/fonts/*.ttf'):
-    bpy.data.fonts.load(filepath=str(font_file))
+    bpy.data.fonts.load(filepath=str(font_file), check_existing=True)
 
 def create_text(
     scene: bpy.types.Scene,
@@ -29,7 +32,7 @@ def create_text(
 ) -> bpy.types.Object:
 
     if name is None:
-        name = 'text-'+str(uuid.uuid4())
+        name = f'text-{next(_TEXT_COUNTER)}'
 
 
     new_text_data: bpy.types.Curve = bpy.data.curves.new(name=name, type='FONT')
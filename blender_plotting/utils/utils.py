@@ -1,12 +1,15 @@
 """ From https://github.com/yuki-koyama/blender-cli-rendering """
 
+import contextlib
 import math
 from typing import Tuple
 import uuid
 
 import bpy
 
+from .background import clear_background_signature
 from .node import arrange_nodes
+from .renderers import pick_best_backend
 
 
 ################################################################################
@@ -28,6 +31,7 @@ def set_animation(scene: bpy.types.Scene,
 def build_rgb_background(world: bpy.types.World,
                          rgb: Tuple[float, float, float, float] = (0.9, 0.9, 0.9, 1.0),
                          strength: float = 1.0) -> None:
+    clear_background_signature(world)
     world.use_nodes = True
     node_tree = world.node_tree
 
@@ -42,11 +46,13 @@ def build_rgb_background(world: bpy.types.World,
 
 
 def build_environment_texture_background(world: bpy.types.World, hdri_path: str, rotation: float = 0.0) -> None:
+    clear_background_signature(world)
     world.use_nodes = True
     node_tree = world.node_tree
 
     environment_texture_node = node_tree.nodes.new(type="ShaderNodeTexEnvironment")
-    environment_texture_node.image = bpy.data.images.load(hdri_path)
+    environment_texture_node.image = bpy.data.images.load(hdri_path, check_existing=True)
+    environment_texture_node.image.use_fake_user = True
 
     mapping_node = node_tree.nodes.new(type="ShaderNodeMapping")
     if bpy.app.version >= (2, 81, 0):
@@ -101,21 +107,26 @@ def set_cycles_renderer(scene: bpy.types.Scene,
     if prefer_cuda_use:
         bpy.context.scene.cycles.device = "GPU"
 
-        # Change the preference setting
-        bpy.context.preferences.addons["cycles"].preferences.compute_device_type = "CUDA"
+        # Change the preference setting to the fastest available backend
+        pick_best_backend()
 
-    # Call get_devices() to let Blender detects GPU device (if any)
-    bpy.context.preferences.addons["cycles"].preferences.get_devices()
+    cprefs = bpy.context.preferences.addons["cycles"].preferences
 
-    # Let Blender use all available devices, include GPU and CPU
-    for d in bpy.context.preferences.addons["cycles"].preferences.devices:
-        d["use"] = 1
+    # Call get_devices() to let Blender detects GPU device (if any), only if the
+    # device list is empty or the device type was not set by pick_best_backend
+    if not prefer_cuda_use or not list(cprefs.devices):
+        cprefs.get_devices()
+
+    # Let Blender use the GPUs only, or the CPU if no GPU is requested
+    for d in cprefs.devices:
+        d.use = not prefer_cuda_use or d.type != 'CPU'
 
     # Display the devices to be used for rendering
     print("----")
     print("The following devices will be used for path tracing:")
-    for d in bpy.context.preferences.addons["cycles"].preferences.devices:
-        print("- {}".format(d["name"]))
+    for d in cprefs.devices:
+        if d.use:
+            print("- {}".format(d.name))
     print("----")
 
 
@@ -179,3 +190,25 @@ def append_material(blend_file_path: str, material_name: str) -> bool:
 def clean_objects() -> None:
     for item in bpy.data.objects:
         bpy.data.objects.remove(item)
+
+
+@contextlib.contextmanager
+def deferred_scene_update():
+    """Defer the view layer update to the end of a block that creates many objects.
+
+    The interface is locked and the global undo disabled while the block runs, and the
+    view layer is updated once on exit, so the world matrices of every new object are
+    valid afterwards.
+    """
+    render = bpy.context.scene.render
+    edit_preferences = bpy.context.preferences.edit
+    use_lock_interface = render.use_lock_interface
+    use_global_undo = edit_preferences.use_global_undo
+    render.use_lock_interface = True
+    edit_preferences.use_global_undo = False
+    try:
+        yield
+    finally:
+        render.use_lock_interface = use_lock_interface
+        edit_preferences.use_global_undo = use_global_undo
+        bpy.context.view_layer.update()
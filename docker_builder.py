@@ -2,11 +2,10 @@
 """ CLI Tool to build bpy docker images and package the python modules.
 """
 import argparse
+import csv
+import shlex
 import subprocess
 
-import pandas as pd
-from packaging import version
-
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Build bpy docker images and package the python modules.')
@@ -27,6 +26,15 @@ def parse_args():
     args = parser.parse_args()
     return args
 
+def parse_version(version_str):
+    return tuple(int(part) for part in version_str.split('.'))
+
+def read_version_table(filepath='blender_python_table.csv'):
+    """ Read the options of each blender version, as strings, keyed by blender version.
+    """
+    with open(filepath, 'r', newline='') as file:
+        return {row['blender_version']: row for row in csv.DictReader(file)}
+
 def set_bpy_options(python_major_minor, gpu_support=False):
     file_in = "docker_utils/bpy_module.cmake.template"
     file_out = "docker_utils/bpy_module.cmake"
@@ -61,23 +69,22 @@ def main():
 
 
     # Read the csv as strings
-    df = pd.read_csv ('blender_python_table.csv', converters={i: str for i in range(100)})
+    version_table = read_version_table()
 
     if blender_version is None:
         blender_version = '3.1'
 
-    blender_versions = df['blender_version'].unique()
-
-    if blender_version not in blender_versions:
-        raise ValueError(f'Blender version {blender_version} not valid. Valid versions are {blender_versions}')
+    if blender_version not in version_table:
+        raise ValueError(f'Blender version {blender_version} not valid. Valid versions are {list(version_table)}')
 
-    min_python_version = df.loc[df['blender_version'] == blender_version, 'python_min_version'].values[0]
+    version_options = version_table[blender_version]
+    min_python_version = version_options['python_min_version']
 
     if python_version is None:
         default_python = True
         python_version = min_python_version
     else:
-        if version.parse(python_version) < version.parse(min_python_version):
+        if parse_version(python_version) < parse_version(min_python_version):
             err_msg = f'Python version {python_version} is lower than the minimum version {min_python_version}'
             err_msg += f' for blender version {blender_version}'
             raise ValueError(err_msg)
@@ -86,9 +93,9 @@ def main():
 
 
     # Get the options dependent on the blender version
-    gh_tag = df.loc[df['blender_version'] == blender_version, 'blender_gh_tag'].values[0]
-    bpy_stubs = df.loc[df['blender_version'] == blender_version, 'bpy_stubs'].values[0]
-    blender_svn_deps_tag = df.loc[df['blender_version'] == blender_version, 'blender_svn_deps_tag'].values[0]
+    gh_tag = version_options['blender_gh_tag']
+    bpy_stubs = version_options['bpy_stubs']
+    blender_svn_deps_tag = version_options['blender_svn_deps_tag']
 
     PYTHON_MAJ_MIN = python_version
     BLENDER_GH_TAG = gh_tag
@@ -107,29 +114,32 @@ def main():
     set_bpy_options(PYTHON_MAJ_MIN, gpu_support=gpu_support)
 
     # Build the docker image
-    build_command = f'docker build -t bpy:{IMAGE_TAG}'
+    build_command = ['docker', 'build', '-t', f'bpy:{IMAGE_TAG}']
     if args.no_cache:
-        build_command += ' --no-cache'
-        # set number of cpus via --cpuset-mems
+        build_command.append('--no-cache')
     if builder_cpus > 0:
-        build_command += f" --cpuset-cpus=0-{builder_cpus - 1}"
-    build_command += f' --build-arg USER={USER}'
-    build_command += f' --build-arg BASE_IMAGE={BASE_IMAGE}'
-    build_command += f' --build-arg BLENDER_VERSION={blender_version}'
-    build_command += f' --build-arg BLENDER_GH_TAG={BLENDER_GH_TAG}'
-    build_command += f' --build-arg BLENDER_SVN_DEPS_TAG={blender_svn_deps_tag}'
-    build_command += f' --build-arg PYTHON_MAJ_MIN={PYTHON_MAJ_MIN}'
-    build_command += f' --build-arg BPY_STUB_VERSION={BPY_STUB_VERSION}'
+        build_command.append(f'--cpuset-cpus=0-{builder_cpus - 1}')
+    build_args = {
+        'USER': USER,
+        'BASE_IMAGE': BASE_IMAGE,
+        'BLENDER_VERSION': blender_version,
+        'BLENDER_GH_TAG': BLENDER_GH_TAG,
+        'BLENDER_SVN_DEPS_TAG': blender_svn_deps_tag,
+        'PYTHON_MAJ_MIN': PYTHON_MAJ_MIN,
+        'BPY_STUB_VERSION': BPY_STUB_VERSION,
+    }
+    for name, value in build_args.items():
+        build_command.extend(['--build-arg', f'{name}={value}'])
     if not default_python:
         # TODO add argument to choose between building or using prebuilt deps
         raise NotImplementedError('Building with diffrent python version is not implemented yet')
-    build_command += f' .'
+    build_command.append('.')
 
     # Run the build command
     if args.dummy:
-        print(build_command)
+        print(shlex.join(build_command))
     else:
-        subprocess.run(build_command, shell=True, check=True)
+        subprocess.run(build_command, check=True)
 
 if __name__ == '__main__':
     main()
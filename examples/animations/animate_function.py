@@ -5,8 +5,9 @@ import bpy
 import numpy as np
 from blender_plotting.utils.curves import draw_function
 from blender_plotting.utils.files import avi2mp4
+from blender_plotting.utils.movement import insert_keyframes
 from blender_plotting.utils.renderers import (cycles_render, eevee_render,
-                                              workbench_render)
+                                              set_animation, workbench_render)
 from blender_plotting.utils.scenes import create_2d_scene, draw_xy_axes
 from blender_plotting.utils.shapes import draw_points
 
@@ -22,20 +23,6 @@ def parse_args():
     return args
 
 
-def set_animation(scene: bpy.types.Scene,
-                  fps: int = 24,
-                  frame_start: int = 1,
-                  frame_end: int = 48,
-                  frame_current: int = 1,
-                  file_extension: str = 'FFMPEG') -> None:
-    scene.render.fps = fps
-    scene.frame_start = frame_start
-    scene.frame_end = frame_end
-    scene.frame_current = frame_current
-    scene.render.image_settings.file_format = file_extension
-    if file_extension == 'FFMPEG':
-        scene.render.ffmpeg.codec = 'H264'
-
 def main():
     args = parse_args()
 
@@ -71,16 +58,14 @@ def main():
                   frame_start=1,
                   frame_end=TOTAL_FRAMES,
                   frame_current=1,
-                  file_extension='AVI_JPEG')
+                  file_format='AVI_JPEG')
 
 
     x_length = x_max - x_min
-    for i in range(1, TOTAL_FRAMES+1):
-        t = (i-1) / TOTAL_FRAMES
-        x = x_min + t * x_length
-        sphere.location = (x, f(x), 0)
-        print(f" frame {i}: t = {t}, location = {sphere.location}")
-        sphere.keyframe_insert(data_path='location', frame=i)
+    ts = np.arange(TOTAL_FRAMES) / TOTAL_FRAMES
+    xs = x_min + ts * x_length
+    locations = np.column_stack((xs, f(xs), np.zeros_like(xs)))
+    insert_keyframes(sphere, 'location', locations, frame_start=1)
 
 
 
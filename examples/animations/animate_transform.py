@@ -1,20 +1,23 @@
 import argparse
-import subprocess
 from typing import Callable, Tuple, List
 
 import bpy
 import numpy as np
 
 from blender_plotting.utils.background import set_pastel_background
+from blender_plotting.utils.files import avi2mp4
 from blender_plotting.utils.materials import create_solid_material
-from blender_plotting.utils.renderers import cycles_render, eevee_render, workbench_render
+from blender_plotting.utils.movement import insert_keyframes
+from blender_plotting.utils.renderers import cycles_render, eevee_render, set_animation, workbench_render
 from blender_plotting.utils.scenes import create_2d_scene
-from blender_plotting.utils.shapes import add_arrow
+from blender_plotting.utils.shapes import add_arrow, create_uv_sphere_mesh
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Draw a R2 plane.')
     parser.add_argument('--cycles', action='store_true', help='Use Cycles.')
     parser.add_argument('--eevee', action='store_true', help='Use Eevee.')
+    parser.add_argument('--fast-preview', action='store_true',
+                        help='Render to AVI_JPEG and convert it to mp4 afterwards.')
 
     args = parser.parse_args()
     return args
@@ -53,7 +56,19 @@ def draw_function(f: Callable[[float], float],
         bpy.types.Object: The curve.
     """
 
-    coords_list = [[x, f(x), 0] for x in np.linspace(x_min, x_max, control_points)]
+    # (x, y, z, w) coordinates, f is evaluated for all the x values at once if possible
+    xs = np.linspace(x_min, x_max, control_points)
+    coords = np.zeros((control_points, 4), dtype=np.float32)
+    coords[:, 0] = xs
+    try:
+        ys = np.asarray(f(xs), dtype=float)
+    except TypeError:
+        ys = None
+    # fall back to one call per x for functions that do not broadcast
+    if ys is None or ys.shape != xs.shape:
+        ys = np.array([f(x) for x in xs], dtype=float)
+    coords[:, 1] = ys
+    coords[:, 3] = 1.0
 
     curve_data = bpy.data.curves.new('crv', 'CURVE')
     curve_data.dimensions = '3D'
@@ -62,9 +77,8 @@ def draw_function(f: Callable[[float], float],
     curve_data.bevel_depth = thickness
 
     spline = curve_data.splines.new(type='POLY')
-    spline.points.add(len(coords_list) - 1)
-    for p, new_co in zip(spline.points, coords_list):
-        p.co = (new_co + [1.0])  # (add nurbs
+    spline.points.add(control_points - 1)
+    spline.points.foreach_set('co', coords.ravel())
     curve = bpy.data.objects.new('object_name', curve_data)
     bpy.data.scenes[0].collection.objects.link(curve)
 
@@ -85,12 +99,16 @@ def draw_points(points: List[Tuple[float, float, float]],
         List[bpy.types.Object]: List of points.
     """
 
-    points_objs = []
+    # All the points share the same sphere mesh and material
+    sphere_mesh = create_uv_sphere_mesh(radius=radius, name='point')
+    sphere_mesh.materials.append(create_solid_material(color))
 
-    for point in points:
-        bpy.ops.mesh.primitive_uv_sphere_add(radius=radius, location=point)
-        points_objs.append(bpy.context.object)
-        bpy.context.object.data.materials.append(create_solid_material(color))
+    points_objs = []
+    for i, point in enumerate(points):
+        point_obj = bpy.data.objects.new(f'point_{i}', sphere_mesh)
+        point_obj.location = point
+        bpy.context.collection.objects.link(point_obj)
+        points_objs.append(point_obj)
 
     return points_objs
 
@@ -116,6 +134,9 @@ def draw_line(points: List[Tuple[float, float, float]],
         bpy.types.Object: The line.
     """
 
+    # the line and the markers share the same material
+    mat = create_solid_material(color)
+
     if draw_line:
         curve_data = bpy.data.curves.new('crv', 'CURVE')
         curve_data.dimensions = '3D'
@@ -125,32 +146,22 @@ def draw_line(points: List[Tuple[float, float, float]],
 
         spline = curve_data.splines.new(type='POLY')
         spline.points.add(len(points) - 1)
-        for p, new_co in zip(spline.points, points):
-            p.co = (new_co + [1.0])
+        # (x, y, z, w) coordinates written in a single call
+        coords = np.ones((len(points), 4), dtype=np.float32)
+        coords[:, :3] = np.asarray(points, dtype=np.float32)
+        spline.points.foreach_set('co', coords.ravel())
         curve = bpy.data.objects.new('object_name', curve_data)
-        curve.data.materials.append(create_solid_material(color))
+        curve.data.materials.append(mat)
         bpy.data.scenes[0].collection.objects.link(curve)
 
     if draw_markers:
-        for point in points:
-            bpy.ops.mesh.primitive_uv_sphere_add(radius=marker_radius, location=point)
-            bpy.context.object.data.materials.append(create_solid_material(color))
-
-def set_animation(scene: bpy.types.Scene,
-                  fps: int = 24,
-                  frame_start: int = 1,
-                  frame_end: int = 48,
-                  frame_current: int = 1,
-                  file_extension: str = 'FFMPEG') -> None:
-    scene.render.fps = fps
-    scene.frame_start = frame_start
-    scene.frame_end = frame_end
-    scene.frame_current = frame_current
-    scene.render.image_settings.file_format = file_extension
-    if file_extension == 'FFMPEG':
-        scene.render.ffmpeg.codec = 'H264'
-
-
+        marker_mesh = create_uv_sphere_mesh(radius=marker_radius, name='marker')
+        marker_mesh.materials.append(mat)
+        collection_objects = bpy.data.scenes[0].collection.objects
+        for i, point in enumerate(points):
+            marker = bpy.data.objects.new(f'marker_{i}', marker_mesh)
+            marker.location = point
+            collection_objects.link(marker)
 
 def draw_grid(x_lim: Tuple[float, float],
               y_lim: Tuple[float, float],
@@ -172,61 +183,61 @@ def draw_grid(x_lim: Tuple[float, float],
     MAJOR_COLOR = (0.5, 0.5, 0.5, 1.0)
     MINOR_COLOR = (0.5, 0.5, 0.5, 0.5)
 
-    x_lim = np.asarray(x_lim)
-    y_lim = np.asarray(y_lim)
-
-    # Prevent coplanar mesh weirdness in cycles
-    random_z = lambda z: z + (1-2*np.random.rand()) * 0.0001
-
-    # Create the minor grid
-    minor_grid_lines = []
-
-    # create materials
-    minor_grid_mat = create_solid_material(MINOR_COLOR)
-    major_grid_mat = create_solid_material(MAJOR_COLOR)
-
-    x_minor_n_subdivisions = int(np.ceil((x_lim[1] - x_lim[0]) / minor_subdivision))
-    for x in np.linspace(x_lim[0], x_lim[1], x_minor_n_subdivisions + 1):
-        # if not in major grid
-        if x % main_subdivision != 0:
-            line = draw_line((x, y_lim[0], random_z(-0.001)),
-                             color=MINOR_COLOR)
-            minor_grid_lines.append(line)
-
-    y_minor_n_subdivisions = int(np.ceil((y_lim[1] - y_lim[0]) / minor_subdivision))
-    for y in np.linspace(y_lim[0], y_lim[1], y_minor_n_subdivisions + 1):
-        # if not in major grid
-        if y % main_subdivision != 0:
-            line = add_line((x_lim[0], y, random_z(-0.001)),
-                            (x_lim[1], y, random_z(-0.001)),
-                            name=f'grid_y_minor{y}',
-                            thickness=MINOR_THICKNESS,
-                            material=minor_grid_mat)
-            minor_grid_lines.append(line)
-
-    # Create the grid
-    major_grid_lines = []
-
-    x_major_n_subdivisions = int(np.ceil((x_lim[1] - x_lim[0]) / main_subdivision))
-    for x in np.linspace(x_lim[0], x_lim[1], x_major_n_subdivisions + 1):
-        line = add_line((x, y_lim[0], random_z(0)),
-                        (x, y_lim[1], random_z(0)),
-                        name='grid_x',
-                        thickness=MAIN_THICKNESS,
-                        material=major_grid_mat)
-        major_grid_lines.append(line)
-
-    y_major_n_subdivisions = int(np.ceil((y_lim[1] - y_lim[0]) / main_subdivision))
-    for y in np.linspace(y_lim[0], y_lim[1], y_major_n_subdivisions + 1):
-        line = add_line((x_lim[0], y, random_z(0)),
-                        (x_lim[1], y, random_z(0)),
-                        name='grid_y',
-                        thickness=MAIN_THICKNESS,
-                        material=major_grid_mat)
-        major_grid_lines.append(line)
-
-    # Merge the grids
-    return major_grid_lines , minor_grid_lines
+    x_lim = np.asarray(x_lim, dtype=float)
+    y_lim = np.asarray(y_lim, dtype=float)
+
+    # minor lines per major line, the major lines are skipped by index instead of a float %
+    step_ratio = int(round(main_subdivision / minor_subdivision))
+
+    def major_positions(lim):
+        n_subdivisions = int(np.ceil((lim[1] - lim[0]) / main_subdivision))
+        return np.linspace(lim[0], lim[1], n_subdivisions + 1)
+
+    def minor_positions(lim):
+        n_subdivisions = int(np.ceil((lim[1] - lim[0]) / minor_subdivision))
+        idxs = int(round(lim[0] / minor_subdivision)) + np.arange(n_subdivisions + 1)
+        positions = np.linspace(lim[0], lim[1], n_subdivisions + 1)
+        return positions[idxs % step_ratio != 0]
+
+    x_major = major_positions(x_lim)
+    y_major = major_positions(y_lim)
+    x_minor = minor_positions(x_lim)
+    y_minor = minor_positions(y_lim)
+
+    # (start, end) of every line, the minor lines slightly below the major ones
+    def vertical_lines(xs, z):
+        return np.stack((np.column_stack((xs, np.full_like(xs, y_lim[0]), np.full_like(xs, z))),
+                         np.column_stack((xs, np.full_like(xs, y_lim[1]), np.full_like(xs, z)))), axis=1)
+
+    def horizontal_lines(ys, z):
+        return np.stack((np.column_stack((np.full_like(ys, x_lim[0]), ys, np.full_like(ys, z))),
+                         np.column_stack((np.full_like(ys, x_lim[1]), ys, np.full_like(ys, z)))), axis=1)
+
+    major_lines = np.concatenate((vertical_lines(x_major, 0), horizontal_lines(y_major, 0)))
+    minor_lines = np.concatenate((vertical_lines(x_minor, -0.001), horizontal_lines(y_minor, -0.001)))
+
+    # A single curve holds every line, the thickness of each line is set by its point radius
+    curve_data = bpy.data.curves.new('grid', 'CURVE')
+    curve_data.dimensions = '3D'
+    curve_data.bevel_depth = MAIN_THICKNESS
+    curve_data.materials.append(create_solid_material(MAJOR_COLOR))
+    curve_data.materials.append(create_solid_material(MINOR_COLOR))
+
+    for lines, material_index, radius in ((major_lines, 0, 1.0),
+                                          (minor_lines, 1, MINOR_THICKNESS / MAIN_THICKNESS)):
+        coords = np.ones((2, 4), dtype=np.float32)
+        for line in lines:
+            spline = curve_data.splines.new(type='POLY')
+            spline.points.add(1)
+            coords[:, :3] = line
+            spline.points.foreach_set('co', coords.ravel())
+            spline.points.foreach_set('radius', np.full(2, radius, dtype=np.float32))
+            spline.material_index = material_index
+
+    grid = bpy.data.objects.new('grid', curve_data)
+    bpy.data.scenes[0].collection.objects.link(grid)
+
+    return grid
 
 
 def main():
@@ -264,19 +275,14 @@ def main():
                   frame_start=1,
                   frame_end=TOTAL_FRAMES,
                   frame_current=1,
-                  file_extension='AVI_JPEG')
+                  file_format='AVI_JPEG' if args.fast_preview else 'FFMPEG')
 
 
     x_length = x_max - x_min
-    for i in range(1, TOTAL_FRAMES+1):
-        t = (i-1) / TOTAL_FRAMES
-        if t < 0.5:
-            x = x_min + t ** 2 * x_length / 2
-        if t >= 0.5:
-            x = x_min + (1 - (t-0.5) ** 2) * x_length / 2
-        sphere.location = (x_min + t * x_length, f(x_min + t * x_length), 0)
-        print(f" frame {i}: t = {t}, location = {sphere.location}")
-        sphere.keyframe_insert(data_path='location', frame=i)
+    ts = np.arange(TOTAL_FRAMES) / TOTAL_FRAMES
+    xs = x_min + ts * x_length
+    locations = np.column_stack((xs, f(xs), np.zeros_like(xs)))
+    insert_keyframes(sphere, 'location', locations, frame_start=1)
 
 
 
@@ -290,9 +296,8 @@ def main():
         workbench_render(scene, imf_filename, animation=True)
 
     # avi to mp4
-    bashCommand = f"ffmpeg -i {scene.render.filepath} -vcodec libx264 -crf 25 -pix_fmt yuv420p -y {imf_filename}.mp4"
-    process = subprocess.Popen(bashCommand.split(), stdout=subprocess.PIPE)
-    output, error = process.communicate()
+    if args.fast_preview:
+        avi2mp4(scene.render.filepath)
 
     # Close blender
     bpy.ops.wm.quit_blender()
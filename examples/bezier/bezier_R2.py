@@ -10,7 +10,7 @@ from blender_plotting.utils.materials import create_solid_material
 from blender_plotting.utils.renderers import (cycles_render, eevee_render,
                                               workbench_render)
 from blender_plotting.utils.scenes import create_2d_scene
-from blender_plotting.utils.shapes import draw_points
+from blender_plotting.utils.shapes import create_uv_sphere_mesh, draw_points
 
 
 def parse_args():
@@ -24,14 +24,35 @@ def parse_args():
 def lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray)  -> np.ndarray:
     return (1-t)*a+t*b
 
-def bezierN(points,t) -> np.ndarray:
-    points = np.asarray(points)
-    if len(points) == 1:
-        return points[0]
-    if len(points)==2:
-        return lerp(points[0],points[1],t)
-    else:
-        return lerp(bezierN(points[:-1],t),bezierN(points[1:],t),t)
+def _cubic_bezier(points: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Closed form bernstein evaluation of a cubic bezier curve."""
+    u = 1 - t
+    return ((u*u*u)[..., None] * points[0] + (3*u*u*t)[..., None] * points[1]
+            + (3*u*t*t)[..., None] * points[2] + (t*t*t)[..., None] * points[3])
+
+def bezierN(points, t) -> np.ndarray:
+    """Evaluates the bezier curve of the control points with De Casteljau's algorithm.
+
+    Args:
+        points (np.ndarray): (N, D) control points.
+        t (np.ndarray): Scalar or (M,) curve parameters.
+
+    Returns:
+        np.ndarray: (D,) point for a scalar t, (M, D) points otherwise.
+    """
+    points = np.asarray(points, dtype=float)
+    t = np.asarray(t, dtype=float)
+
+    if len(points) == 4:
+        return _cubic_bezier(points, t)
+
+    # lerp every pair of consecutive points until only one is left, for all t at once
+    ts = np.atleast_1d(t)[:, None, None]
+    curve = np.broadcast_to(points, (len(ts),) + points.shape)
+    for _ in range(len(points) - 1):
+        curve = lerp(curve[:, :-1], curve[:, 1:], ts)
+
+    return curve[:, 0] if t.ndim else curve[0, 0]
 
 def bezier_curve_manim(points: np.ndarray , t: float) -> np.ndarray:
     return bezierN(points,t).tolist()+[0]
@@ -54,7 +75,19 @@ def draw_function(f: Callable[[float], float],
         bpy.types.Object: The curve.
     """
 
-    coords_list = [[x, f(x), 0] for x in np.linspace(x_min, x_max, control_points)]
+    # (x, y, z, w) coordinates, f is evaluated for all the x values at once if possible
+    xs = np.linspace(x_min, x_max, control_points)
+    coords = np.zeros((control_points, 4), dtype=np.float32)
+    coords[:, 0] = xs
+    try:
+        ys = np.asarray(f(xs), dtype=float)
+    except TypeError:
+        ys = None
+    # fall back to one call per x for functions that do not broadcast
+    if ys is None or ys.shape != xs.shape:
+        ys = np.array([f(x) for x in xs], dtype=float)
+    coords[:, 1] = ys
+    coords[:, 3] = 1.0
 
     curve_data = bpy.data.curves.new('crv', 'CURVE')
     curve_data.dimensions = '3D'
@@ -63,9 +96,8 @@ def draw_function(f: Callable[[float], float],
     curve_data.bevel_depth = thickness
 
     spline = curve_data.splines.new(type='POLY')
-    spline.points.add(len(coords_list) - 1)
-    for p, new_co in zip(spline.points, coords_list):
-        p.co = (new_co + [1.0])  # (add nurbs
+    spline.points.add(control_points - 1)
+    spline.points.foreach_set('co', coords.ravel())
     curve = bpy.data.objects.new('object_name', curve_data)
     bpy.data.scenes[0].collection.objects.link(curve)
 
@@ -93,6 +125,9 @@ def draw_line(points: List[Tuple[float, float, float]],
         bpy.types.Object: The line.
     """
 
+    # the line and the markers share the same material
+    mat = create_solid_material(color)
+
     if draw_line:
         curve_data = bpy.data.curves.new('crv', 'CURVE')
         curve_data.dimensions = '3D'
@@ -102,30 +137,22 @@ def draw_line(points: List[Tuple[float, float, float]],
 
         spline = curve_data.splines.new(type='POLY')
         spline.points.add(len(points) - 1)
-        for p, new_co in zip(spline.points, points):
-            p.co = (new_co + [1.0])
+        # (x, y, z, w) coordinates written in a single call
+        coords = np.ones((len(points), 4), dtype=np.float32)
+        coords[:, :3] = np.asarray(points, dtype=np.float32)
+        spline.points.foreach_set('co', coords.ravel())
         curve = bpy.data.objects.new('object_name', curve_data)
-        curve.data.materials.append(create_solid_material(color))
+        curve.data.materials.append(mat)
         bpy.data.scenes[0].collection.objects.link(curve)
 
     if draw_markers:
-        for point in points:
-            bpy.ops.mesh.primitive_uv_sphere_add(radius=marker_radius, location=point)
-            bpy.context.object.data.materials.append(create_solid_material(color))
-
-def set_animation(scene: bpy.types.Scene,
-                  fps: int = 24,
-                  frame_start: int = 1,
-                  frame_end: int = 48,
-                  frame_current: int = 1,
-                  file_extension: str = 'FFMPEG') -> None:
-    scene.render.fps = fps
-    scene.frame_start = frame_start
-    scene.frame_end = frame_end
-    scene.frame_current = frame_current
-    scene.render.image_settings.file_format = file_extension
-    if file_extension == 'FFMPEG':
-        scene.render.ffmpeg.codec = 'H264'
+        marker_mesh = create_uv_sphere_mesh(radius=marker_radius, name='marker')
+        marker_mesh.materials.append(mat)
+        collection_objects = bpy.data.scenes[0].collection.objects
+        for i, point in enumerate(points):
+            marker = bpy.data.objects.new(f'marker_{i}', marker_mesh)
+            marker.location = point
+            collection_objects.link(marker)
 
 def main():
     args = parse_args()
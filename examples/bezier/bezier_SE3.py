@@ -1,4 +1,7 @@
 import argparse
+import pathlib
+import subprocess
+import sys
 from audioop import lin2adpcm
 
 import bpy
@@ -11,14 +14,22 @@ import quaternion as quat
 from blender_plotting.utils.background import set_solid_color_background
 from blender_plotting.utils.cad import import_stl
 from blender_plotting.utils.color_scale import ColorScale
-from blender_plotting.utils.curves import draw_parametric_curve, draw_polyline
-from blender_plotting.utils.files import avi2mp4
-from blender_plotting.utils.geometry import rot_diff
-from blender_plotting.utils.movement import rigid_movement, rotate_around_axis, set_world_pose
+from blender_plotting.utils.curves import draw_polyline
+from blender_plotting.utils.files import avi2mp4, concat_videos
+from blender_plotting.utils.geometry import rot_diff, rot_diff_batch
+from blender_plotting.utils.movement import insert_keyframes, rigid_movement, rotate_around_axis, set_world_pose
 from blender_plotting.utils.renderers import cycles_render, eevee_render, set_animation, workbench_render
 from blender_plotting.utils.scenes import create_3d_scene, draw_xyz_axes
 from blender_plotting.utils.shapes import draw_arrow
 from blender_plotting.utils.text import create_text
+from blender_plotting.utils.utils import deferred_scene_update
+
+# rotation of the STL model, half a turn around the y axis
+STL_Q = quat.from_rotation_vector(np.array([0., 1., 0.])*np.pi)
+
+FPS = 60
+DURATION = 40
+TOTAL_FRAMES = FPS * DURATION
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Draw a R2 plane.')
@@ -27,6 +38,10 @@ def parse_args():
     parser.add_argument('--filename', type=str, default=None, help='Output filename.')
     parser.add_argument('--frame', type=int, default=0, help='Frame number.')
     parser.add_argument('--video', action='store_true', help='Render video.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes rendering a slice of the video each.')
+    parser.add_argument('--worker-id', type=int, default=None,
+                        help='Slice of the video rendered by this process, set by the launcher.')
 
     args = parser.parse_args()
     return args
@@ -40,12 +55,58 @@ def circle_orn(x, R):
     q = quat.from_rotation_vector(norm_ori_vector)
     return quat.as_float_array(q)
 
+def get_engine(args):
+    if args.cycles:
+        return 'cycles'
+    elif args.eevee:
+        return 'eevee'
+    return 'workbench'
+
+def get_filename(args):
+    if args.filename is None:
+        return __file__.split("/")[-1].split(".")[0]
+    return args.filename
+
+def get_workers(args):
+    """ Number of render processes, at most one per frame."""
+    return max(1, min(args.workers, TOTAL_FRAMES))
+
+def worker_frame_range(total_frames, workers, worker_id):
+    """ First and last frame rendered by a worker, the frames are split in contiguous slices."""
+    return 1 + worker_id * total_frames // workers, (worker_id + 1) * total_frames // workers
+
+def launch_workers(args):
+    """ Render the video in get_workers(args) processes and concatenate their slices."""
+    filename = get_filename(args)
+    imf_filename = f'renders/{filename}/{filename}_{get_engine(args)}'
+    n_workers = get_workers(args)
+
+    workers = [subprocess.Popen([sys.executable, __file__, *sys.argv[1:], '--worker-id', str(k)])
+               for k in range(n_workers)]
+    try:
+        for k, worker in enumerate(workers):
+            if worker.wait() != 0:
+                frame_start, frame_end = worker_frame_range(TOTAL_FRAMES, n_workers, k)
+                raise RuntimeError(f'render worker {k} (frames {frame_start}-{frame_end}) failed '
+                                   f'with exit code {worker.returncode}')
+    finally:
+        # don't leave the other workers rendering when one fails
+        for worker in workers:
+            if worker.poll() is None:
+                worker.terminate()
+                worker.wait()
+
+    # same path as set_output_path for each worker
+    parts = [str(pathlib.Path("animation") / f'{imf_filename}_part{k}.avi') for k in range(n_workers)]
+    filepath_avi = concat_videos(parts, str(pathlib.Path("animation") / f'{imf_filename}.avi'))
+    print("saved as " + avi2mp4(filepath_avi))
+
 def main():
     args = parse_args()
 
-    FPS = 60
-    DURATION = 40
-    TOTAL_FRAMES =  FPS * DURATION
+    if args.video and get_workers(args) > 1 and args.worker_id is None:
+        launch_workers(args)
+        return
 
     if args.video:
         print(f"Total frames: {TOTAL_FRAMES}")
@@ -107,6 +168,9 @@ def main():
                                 max_value=np.pi,
                                 colors='turbo')
 
+    # length of the arrows representing the rotations
+    VECTOR_SCALE = 0.4
+
     se3_origin = Matrix.Translation(points[0,0,:]).to_4x4() @ Quaternion(orns[0,0,:]).to_matrix().to_4x4()
 
 
@@ -114,23 +178,18 @@ def main():
         """ Transforms se3_points in the bezier curve into a vector representation."""
         position = np.asarray(position)
         rot_quaternion = np.asarray(rot_quaternion)
-        scale = 0.4
         # se3_point = Matrix.Translation(position).to_4x4() @ Quaternion(rot_quaternion).to_matrix().to_4x4()
         # vec_reprs, vec_origin = se3_as_vector(se3_point, se3_origin=se3_origin, scale=0.2)
         rot_vector = quat.as_rotation_vector(quat.from_float_array(rot_quaternion))
         vec_reprs = rot_diff(orns[0,0], rot_vector, rot_type='rot_vec')
         color = rot_color_scale.get_color(np.linalg.norm(vec_reprs))
-        return draw_arrow(position, position+vec_reprs*scale, color=list(color)+[1.0])
+        return draw_arrow(position, position+vec_reprs*VECTOR_SCALE, color=list(color)+[1.0])
 
     def pq2se3(points, orns):
         return [manifpy.SE3(p, q) for p, q in zip(points, orns)]
 
     bezier_curve_points = [pq2se3(p, q) for p, q in zip(points, orns)]
 
-    print("points:", points)
-    print("curve points:", [p.coeffs() for p in bezier_curve_points[0]])
-    print("curve points:", [p.coeffs() for p in bezier_curve_points[1]])
-
     bezier_curves = [bezier_fitting.SE3Bezier(curve_points) for curve_points in bezier_curve_points]
     bezier_spline = bezier_fitting.se3_bezier.SE3BezierSpline(bezier_curves)
 
@@ -167,24 +226,30 @@ def main():
 
 
 
-    for t in np.linspace(0,1,100):
-        curve_lie_pos = bezier_spline.evaluate_se3(t).coeffs()[:3]
-        curve_lie_quat = bezier_spline.evaluate_se3(t).coeffs()[3:]
+    # vector representation of the whole sweep at once, only the arrows are drawn one by one
+    sweep_coeffs = np.stack([bezier_spline.evaluate_se3(t).coeffs() for t in np.linspace(0,1,100)])
+    sweep_positions = sweep_coeffs[:, :3]
+    sweep_quats = sweep_coeffs[:, 3:] / np.linalg.norm(sweep_coeffs[:, 3:], axis=1, keepdims=True)
+    sweep_vec_reprs = rot_diff_batch(orns[0,0], sweep_quats, rot_type='rot_vec')
+    sweep_colors = rot_color_scale.get_colors(np.linalg.norm(sweep_vec_reprs, axis=1))
 
-        draw_vector_representation(curve_lie_pos, curve_lie_quat)
+    with deferred_scene_update():
+        for position, vec_reprs, color in zip(sweep_positions, sweep_vec_reprs, sweep_colors):
+            draw_arrow(position, position+vec_reprs*VECTOR_SCALE, color=list(color)+[1.0])
 
 
 
-    draw_parametric_curve(lambda t: bezier_spline.evaluate_se3(t).coeffs()[:3],
-                          resolution=200,
-                          color=(1,1,1, 1.0))
+    # the curve is drawn from the positions of one batch of samples
+    curve_coeffs = np.stack([bezier_spline.evaluate_se3(t).coeffs() for t in np.linspace(0,1,200)])
+    draw_polyline(curve_coeffs[:, :3],
+                  color=(1,1,1, 1.0),
+                  draw_markers=False)
 
     # add a stl model
-    stl_q = quat.as_float_array(quat.from_rotation_vector( np.array([0,1,0])*np.pi ))
     stl_model = import_stl("resources/stl/ManetaFT.stl",
                            scale=0.01,
                            location=(-0.50,1,0),
-                           rotation=stl_q
+                           rotation=quat.as_float_array(STL_Q)
                            )
 
     # # Keyframes
@@ -195,21 +260,29 @@ def main():
                   frame_current=1,
                   file_format='AVI_JPEG')
 
-    # rotate_around_axis
+    # evaluate the pose of the STL model for every frame at once
+    ts = np.arange(TOTAL_FRAMES) / TOTAL_FRAMES
+    se3_positions = np.stack([bezier_spline.evaluate_se3(t).coeffs() for t in ts])
+
+    # Rotate the camera and the text around the Z axis at a constant speed, parenting them to a
+    # pivot at the origin turns the orbit into two linear keyframes of the pivot's rotation
     total_cam_rot_angle = np.pi / 2
     rot_angle_increment = total_cam_rot_angle / TOTAL_FRAMES
-    for i in range(1, TOTAL_FRAMES+1):
-        # Rotate the camera and the text
-        t = (i-1) / TOTAL_FRAMES
-        rotate_around_axis(camera, 'Z', rot_angle_increment)
-        rotate_around_axis(text, 'Z', rot_angle_increment)
-        camera.keyframe_insert(data_path='rotation_euler', frame=i)
-        camera.keyframe_insert(data_path='location', frame=i)
-        text.keyframe_insert(data_path='rotation_euler', frame=i)
-        text.keyframe_insert(data_path='location', frame=i)
-
+    camera_pivot = bpy.data.objects.new('camera_pivot', None)
+    scene.collection.objects.link(camera_pivot)
+    camera.parent = camera_pivot
+    text.parent = camera_pivot
+    insert_keyframes(camera_pivot, 'rotation_euler',
+                     [[0, 0, rot_angle_increment], [0, 0, total_cam_rot_angle]],
+                     frames=[1, TOTAL_FRAMES],
+                     interpolation='LINEAR')
+
+    # record the pose of the STL model in each frame, then keyframe them at once
+    locations = np.empty((TOTAL_FRAMES, 3))
+    rotations = np.empty((TOTAL_FRAMES, 3))
+    for i in range(TOTAL_FRAMES):
         # Move the STL model
-        se3_position = bezier_spline.evaluate_se3(t).coeffs()
+        se3_position = se3_positions[i]
         position = se3_position[:3]
         rotation = se3_position[3:] # quaternion
         set_world_pose(stl_model,
@@ -217,18 +290,25 @@ def main():
                        rotation=rotation)
 
         # Rotation property is 'rotation_euler' independent of the rotation method
-        stl_model.keyframe_insert(data_path='rotation_euler', frame=i)
-        stl_model.keyframe_insert(data_path='location', frame=i)
+        locations[i] = stl_model.location
+        rotations[i] = stl_model.rotation_euler
+
+    insert_keyframes(stl_model, 'location', locations, frame_start=1)
+    insert_keyframes(stl_model, 'rotation_euler', rotations, frame_start=1)
 
 
 
     # Render the scene
-    if args.filename is None:
-        filename = __file__.split("/")[-1].split(".")[0]
-    else:
-        filename = args.filename
+    filename = get_filename(args)
     imf_filename = lambda s: f'renders/{filename}/{filename}_{s}'
 
+    if args.worker_id is not None:
+        # render only this worker's slice, the launcher concatenates them
+        scene.frame_start, scene.frame_end = worker_frame_range(TOTAL_FRAMES, get_workers(args),
+                                                                args.worker_id)
+        engine_filename = imf_filename
+        imf_filename = lambda s: f'{engine_filename(s)}_part{args.worker_id}'
+
     if args.video:
         animation = True
     else:
@@ -243,7 +323,7 @@ def main():
         else:
             workbench_render(scene, imf_filename('workbench'), animation=animation)
 
-        if args.video:
+        if args.video and args.worker_id is None:
             filepath_avi = scene.render.filepath
             print("saved as " + avi2mp4(filepath_avi))
 
@@ -9,14 +9,17 @@ import quaternion as quat
 
 from blender_plotting.utils.background import set_solid_color_background
 from blender_plotting.utils.cad import import_stl
-from blender_plotting.utils.curves import draw_parametric_curve
+from blender_plotting.utils.curves import draw_polyline
 from blender_plotting.utils.files import avi2mp4
-from blender_plotting.utils.movement import rigid_movement, rotate_around_axis, set_world_pose
+from blender_plotting.utils.movement import insert_keyframes, rigid_movement, rotate_around_axis, set_world_pose
 from blender_plotting.utils.renderers import cycles_render, eevee_render, set_animation, workbench_render
 from blender_plotting.utils.scenes import create_3d_scene, draw_xyz_axes
-from blender_plotting.utils.shapes import draw_arrow, draw_points
+from blender_plotting.utils.shapes import draw_arrows, draw_points
 from blender_plotting.utils.text import create_text
 
+# rotation of the STL model, half a turn around the y axis
+STL_Q = quat.from_rotation_vector(np.array([0., 1., 0.])*np.pi)
+
 def parse_args():
     parser = argparse.ArgumentParser(description='Draw a R2 plane.')
     parser.add_argument('--cycles', action='store_true', help='Use Cycles.')
@@ -31,12 +34,6 @@ def parse_args():
 def circle_y(x, R):
     return np.sqrt(R**2 - x**2)
 
-def circle_orn(x, R):
-    ori_vector = np.array([x, circle_y(x, R), 0.])
-    norm_ori_vector = ori_vector / np.linalg.norm(ori_vector)
-    q = quat.from_rotation_vector(norm_ori_vector)
-    return quat.as_float_array(q)
-
 def main():
     args = parse_args()
 
@@ -58,10 +55,14 @@ def main():
     MAX_ERROR = 0.001
     R = 2
 
-    noise = lambda : np.random.rand()*np.array([1,1,1])*NOISE_MAG
+    # points on a circle, oriented by their normalized position
+    xs = np.linspace(-R, R, NUM_POINTS)
+    circle_points = np.column_stack((xs, circle_y(xs, R), np.zeros_like(xs)))
+    ori_vectors = circle_points / np.linalg.norm(circle_points, axis=1, keepdims=True)
+    orns = quat.as_float_array(quat.from_rotation_vector(ori_vectors))
 
-    points = np.asarray([np.array([x, circle_y(x, R), 0]) + noise() for x in np.linspace(-R, R, NUM_POINTS)])
-    orns =  np.asarray([circle_orn(x, R) for x in np.linspace(-R, R, NUM_POINTS)])
+    # the same noise on every coordinate of a point
+    points = circle_points + np.random.rand(NUM_POINTS, 1) * NOISE_MAG
 
     se3_points = [manifpy.SE3(np.concatenate((point, orn))) for point, orn in zip(points, orns)]
 
@@ -93,36 +94,34 @@ def main():
 
     default_vector = np.array([0,0,-0.5])
 
-    for point in se3_points:
-        position = point.coeffs()[:3]
-        ori_vector = point.rotation().dot(default_vector)
-        draw_arrow(position, position+ori_vector, color=(0.7,0.,0.,0.5))
-
-    for curve in bezier_curves:
-        for t in np.linspace(0,1,10):
-            curve_lie_pos = curve.evaluate_se3(t).coeffs()[:3]
-            rotated_vector = curve.evaluate_se3(t).rotation().dot(default_vector)
-
-            torsion = np.linalg.norm(ori_vector)
+    # each group of arrows has one color, draw every group as a single object
+    positions = np.stack([point.coeffs()[:3] for point in se3_points])
+    ori_vectors = np.stack([point.rotation().dot(default_vector) for point in se3_points])
+    draw_arrows(positions, positions+ori_vectors, name='sample_arrows', color=(0.7,0.,0.,0.5))
 
-            draw_arrow(curve_lie_pos, curve_lie_pos+rotated_vector,
-                       color=(0.8,0.8,0.5, 1.0))
+    curve_se3s = [curve.evaluate_se3(t) for curve in bezier_curves for t in np.linspace(0,1,10)]
+    curve_lie_pos = np.stack([curve_se3.coeffs()[:3] for curve_se3 in curve_se3s])
+    rotated_vectors = np.stack([curve_se3.rotation().dot(default_vector) for curve_se3 in curve_se3s])
+    draw_arrows(curve_lie_pos, curve_lie_pos+rotated_vectors, name='curve_arrows',
+                color=(0.8,0.8,0.5, 1.0))
 
-        # draw_parametric_curve(lambda t: curve.evaluate_se3(t).coeffs()[:3],
-        #                       resolution=50,
-        #                       color=(0.8,0.8,0.5, 1.0))
+    # for curve in bezier_curves:
+    #     draw_parametric_curve(lambda t: curve.evaluate_se3(t).coeffs()[:3],
+    #                           resolution=50,
+    #                           color=(0.8,0.8,0.5, 1.0))
 
 
-    draw_parametric_curve(lambda t: bezier_spline.evaluate_se3(t).coeffs()[:3],
-                          resolution=200,
-                          color=(1,1,1, 1.0))
+    # the curve is drawn from the positions of one batch of samples
+    curve_coeffs = np.stack([bezier_spline.evaluate_se3(t).coeffs() for t in np.linspace(0,1,200)])
+    draw_polyline(curve_coeffs[:, :3],
+                  color=(1,1,1, 1.0),
+                  draw_markers=False)
 
     # add a stl model
-    stl_q = quat.as_float_array(quat.from_rotation_vector( np.array([0,1,0])*np.pi ))
     stl_model = import_stl("resources/stl/ManetaFT.stl",
                            scale=0.01,
                            location=(-0.50,1,0),
-                           rotation=stl_q
+                           rotation=quat.as_float_array(STL_Q)
                            )
 
     # # Keyframes
@@ -133,31 +132,41 @@ def main():
                   frame_current=1,
                   file_format='AVI_JPEG')
 
-    # rotate_around_axis
+    # evaluate the pose of the STL model for every frame at once
+    ts = np.arange(TOTAL_FRAMES) / TOTAL_FRAMES
+    se3_positions = np.stack([bezier_spline.evaluate_se3(t).coeffs() for t in ts])
+
+    # Rotate the camera and the text around the Z axis at a constant speed, parenting them to a
+    # pivot at the origin turns the orbit into two linear keyframes of the pivot's rotation
     total_cam_rot_angle = np.pi / 4
     rot_angle_increment = total_cam_rot_angle / TOTAL_FRAMES
-    for i in range(1, TOTAL_FRAMES+1):
-        # Rotate the camera and the text
-        t = (i-1) / TOTAL_FRAMES
-        rotate_around_axis(camera, 'Z', rot_angle_increment)
-        rotate_around_axis(text, 'Z', rot_angle_increment)
-        camera.keyframe_insert(data_path='rotation_euler', frame=i)
-        camera.keyframe_insert(data_path='location', frame=i)
-        text.keyframe_insert(data_path='rotation_euler', frame=i)
-        text.keyframe_insert(data_path='location', frame=i)
-
+    camera_pivot = bpy.data.objects.new('camera_pivot', None)
+    scene.collection.objects.link(camera_pivot)
+    camera.parent = camera_pivot
+    text.parent = camera_pivot
+    insert_keyframes(camera_pivot, 'rotation_euler',
+                     [[0, 0, rot_angle_increment], [0, 0, total_cam_rot_angle]],
+                     frames=[1, TOTAL_FRAMES],
+                     interpolation='LINEAR')
+
+    # record the pose of the STL model in each frame, then keyframe them at once
+    locations = np.empty((TOTAL_FRAMES, 3))
+    rotations = np.empty((TOTAL_FRAMES, 3))
+    for i in range(TOTAL_FRAMES):
         # Move the STL model
-        se3_position = bezier_spline.evaluate_se3(t).coeffs()
+        se3_position = se3_positions[i]
         position = se3_position[:3]
         rotation = se3_position[3:] # quaternion
-        print(rotation)
         set_world_pose(stl_model,
                        translation=position,
                        rotation=rotation)
 
         # Rotation property is 'rotation_euler' independent of the rotation method
-        stl_model.keyframe_insert(data_path='rotation_euler', frame=i)
-        stl_model.keyframe_insert(data_path='location', frame=i)
+        locations[i] = stl_model.location
+        rotations[i] = stl_model.rotation_euler
+
+    insert_keyframes(stl_model, 'location', locations, frame_start=1)
+    insert_keyframes(stl_model, 'rotation_euler', rotations, frame_start=1)
 
 
 
@@ -9,13 +9,17 @@ from blender_plotting.utils.background import set_solid_color_background
 from blender_plotting.utils.color_scale import ColorScale
 from blender_plotting.utils.curves import draw_parametric_curve
 from blender_plotting.utils.files import avi2mp4
-from blender_plotting.utils.movement import rigid_movement, rotate_around_axis, set_world_pose
+from blender_plotting.utils.movement import insert_keyframes, rigid_movement, rotate_around_axis, set_world_pose
 from blender_plotting.utils.renderers import (cycles_render, eevee_render,
                                               set_animation, workbench_render)
 from blender_plotting.utils.scenes import create_3d_scene
 from blender_plotting.utils.shapes import draw_arrow, draw_points, draw_sphere
 from blender_plotting.utils.text import create_text
 from blender_plotting.utils.cad import import_stl
+from blender_plotting.utils.utils import deferred_scene_update
+
+# rotation of the STL model, half a turn around the y axis
+STL_Q = quat.from_rotation_vector(np.array([0., 1., 0.])*np.pi)
 
 
 def parse_args():
@@ -92,11 +96,13 @@ def main():
 
 
     # plot the points as arrows from the origin
+    control_colors = []
     for p in control_points:
         torsion = np.linalg.norm(p)
         color_val = list(torsion_color_scale.get_color(torsion)) + [1.0]
         draw_arrow(SPHERE_CENTER, SPHERE_CENTER+p, color=color_val)
-        draw_points([SPHERE_CENTER+p], color=color_val)
+        control_colors.append(color_val)
+    draw_points([SPHERE_CENTER+p for p in control_points], colors=control_colors)
 
     # draw sphere
     draw_sphere(SPHERE_CENTER, SPHERE_R,
@@ -111,10 +117,6 @@ def main():
         rot = so3_curve.evaluate_so3(t)
         return quat.as_rotation_vector(np.quaternion(*rot.coeffs()))
 
-    def curve_quaternion(t):
-        rot = so3_curve.evaluate_so3(t)
-        return quat.from_float_array(rot.coeffs())
-
     text = create_text(scene, 'Lie Lerp',
                        align_y='BOTTOM',
                        size = 0.7)
@@ -127,18 +129,20 @@ def main():
     # interpolation curve
 
     # plot the rotation vectors as arrow from the origin
-    for t in np.linspace(0, 1, 20):
-        # evaluate orientation with squad
-        p = curve(t)
-        torsion = np.linalg.norm(p)
-        color_val = list(torsion_color_scale.get_color(torsion)) + [1.0]
-        draw_arrow(SPHERE_CENTER, p+SPHERE_CENTER, color=color_val)
+    arrow_coeffs = np.stack([so3_curve.evaluate_so3(t).coeffs() for t in np.linspace(0, 1, 20)])
+    rot_vectors = quat.as_rotation_vector(quat.from_float_array(arrow_coeffs))
+    torsion_colors = torsion_color_scale.get_colors(np.linalg.norm(rot_vectors, axis=1))
+    with deferred_scene_update():
+        for p, color in zip(rot_vectors, torsion_colors):
+            draw_arrow(SPHERE_CENTER, p+SPHERE_CENTER, color=list(color) + [1.0])
 
     # plot the rot_vector line
     draw_parametric_curve(lambda t : curve(t) + SPHERE_CENTER,
                           color=(1.0, 1.0, 0.0, 1.0),
                           resolution=30)
     bezier_point = draw_points([curve(0) + SPHERE_CENTER], color=(1.0, 1.0, 0.0, 1.0))[0]
+    # the point color is animated, give it its own copy of the shared material
+    bezier_point.active_material = bezier_point.active_material.copy()
 
     # Keyframes
     set_animation(scene,
@@ -150,29 +154,33 @@ def main():
 
 
     # add a stl model
-    stl_q = quat.as_float_array(quat.from_rotation_vector( np.array([0,1,0])*np.pi ))
     stl_model = import_stl("resources/stl/ManetaFT.stl",
                            scale=0.01,
                            location=(-0.50,1,0),
-                           rotation=stl_q
+                           rotation=quat.as_float_array(STL_Q)
                            )
 
-    # rotate_around_axis
+    # evaluate the curve once for all the frames, as quaternions and rotation vectors
+    ts = np.arange(1, TOTAL_FRAMES+1) / TOTAL_FRAMES
+    curve_quaternions = quat.from_float_array(np.stack([so3_curve.evaluate_so3(t).coeffs() for t in ts]))
+    stl_quaternions = quat.as_float_array(curve_quaternions * STL_Q)
+    rot_vectors = quat.as_rotation_vector(curve_quaternions)
 
-    for i in range(1, TOTAL_FRAMES+1):
-        rotation = np.quaternion(curve_quaternion(i/TOTAL_FRAMES)) * np.quaternion(*stl_q)
+    # record the rotation of the STL model in each frame, then keyframe them at once
+    stl_rotations = np.empty((TOTAL_FRAMES, 3))
+    for i in range(TOTAL_FRAMES):
         set_world_pose(stl_model,
-                       rotation=quat.as_float_array(rotation))
+                       rotation=stl_quaternions[i])
+        stl_rotations[i] = stl_model.rotation_euler
 
-        axis_angle = curve(i/TOTAL_FRAMES)
-        color_val = list(torsion_color_scale.get_color(np.linalg.norm(axis_angle))) + [1.0]
-        set_world_pose(bezier_point,
-                       translation=axis_angle + SPHERE_CENTER)
-        stl_model.keyframe_insert(data_path='rotation_euler', frame=i)
-        bezier_point.keyframe_insert(data_path='location', frame=i)
+    # the point follows the rotation vector, colored by its torsion
+    point_locations = rot_vectors + SPHERE_CENTER
+    point_colors = np.ones((TOTAL_FRAMES, 4))
+    point_colors[:, :3] = torsion_color_scale.get_colors(np.linalg.norm(rot_vectors, axis=1))
 
-        bezier_point.active_material.diffuse_color = color_val
-        bezier_point.active_material.keyframe_insert(data_path='diffuse_color', frame=i)
+    insert_keyframes(stl_model, 'rotation_euler', stl_rotations, frame_start=1)
+    insert_keyframes(bezier_point, 'location', point_locations, frame_start=1)
+    insert_keyframes(bezier_point.active_material, 'diffuse_color', point_colors, frame_start=1)
 
 
 
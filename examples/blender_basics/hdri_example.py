@@ -3,10 +3,15 @@
 import math
 
 import bpy
+import numpy as np
 
 from blender_plotting.utils.renderers import cycles_render, eevee_render, workbench_render
 from blender_plotting.utils.background import set_hdri_background
 
+# Subdivision level of the sphere in the cycles render, eevee and workbench remove
+# the subsurf modifiers before rendering
+SUBSURF_RENDER_LEVELS = 6
+
 # Delete the default cube
 bpy.ops.object.delete()
 
@@ -16,9 +21,10 @@ sphere = bpy.context.active_object
 
 # add subdivision
 bpy.ops.object.modifier_add(type='SUBSURF')
-sphere.modifiers[0].render_levels = 6
-bpy.ops.object.mode_set(mode = 'EDIT')
-bpy.ops.mesh.faces_shade_smooth()
+subsurf = sphere.modifiers[0]
+subsurf.levels = 1
+# shade smooth on the mesh data, without going through edit mode
+sphere.data.polygons.foreach_set('use_smooth', np.ones(len(sphere.data.polygons), dtype=bool))
 
 # create material
 mat = bpy.data.materials.new(name='PlaneMaterial')
@@ -54,6 +60,8 @@ constraint.target=sphere
 scene = bpy.context.scene
 scene.camera = cam
 
+# cycles renders first, the other engines remove the subsurf modifier
+subsurf.render_levels = SUBSURF_RENDER_LEVELS
 cycles_render(scene, 'renders/cycles/hdri_example.png')
 eevee_render(scene, 'renders/eevee/hdri_example.png')
 workbench_render(scene, 'renders/workbench/hdri_example.png')
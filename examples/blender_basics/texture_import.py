@@ -1,4 +1,5 @@
 import bpy
+import numpy as np
 from blender_plotting.utils.background import set_hdri_background
 
 from blender_plotting.utils.renderers import cycles_render, eevee_render, workbench_render
@@ -14,6 +15,85 @@ TX_DISP = TEXTURE_DIR+"castle_brick_02_red_disp_4k.png"
 TX_NORMAL = TEXTURE_DIR+"castle_brick_02_red_nor_gl_4k.exr"
 TX_ROUGH = TEXTURE_DIR+"castle_brick_02_red_rough_4k.jpg"
 
+# Subdivision level of the sphere in the cycles render, eevee and workbench remove
+# the subsurf modifiers before rendering
+SUBSURF_RENDER_LEVELS = 6
+
+def load_image(filepath: str, non_color: bool = False) -> bpy.types.Image:
+    """Load an image, reusing it if it is already loaded.
+
+    Args:
+        filepath (str): Filepath of the image.
+        non_color (bool): The image holds data (e.g. normals) instead of colors, skips
+            the sRGB conversion.
+
+    Returns:
+        bpy.types.Image: The image.
+    """
+    image = bpy.data.images.load(filepath, check_existing=True)
+    if non_color:
+        image.colorspace_settings.name = 'Non-Color'
+    return image
+
+def build_pbr_material(name: str,
+                       diffuse: str,
+                       displacement: str,
+                       normal: str,
+                       roughness: str) -> bpy.types.Material:
+    """Create a material from the image textures of a PBR set.
+
+    Args:
+        name (str): Name of the material.
+        diffuse (str): Filepath of the color texture.
+        displacement (str): Filepath of the displacement texture.
+        normal (str): Filepath of the normal map.
+        roughness (str): Filepath of the roughness texture.
+
+    Returns:
+        bpy.types.Material: The material.
+    """
+    mat = bpy.data.materials.new(name=name)
+    mat.use_nodes = True
+
+    nodes = mat.node_tree.nodes
+    links = mat.node_tree.links
+
+    bsdf = nodes["Principled BSDF"]
+    output = nodes["Material Output"]
+
+    # Create an link base image texture node
+    texImage = nodes.new('ShaderNodeTexImage')
+    texImage.image = load_image(diffuse)
+    links.new(texImage.outputs['Color'], bsdf.inputs['Base Color'])
+
+    # Create displacement texture node
+    tex_disp = nodes.new('ShaderNodeTexImage')
+    tex_disp.image = load_image(displacement, non_color=True)
+    disp_node = nodes.new('ShaderNodeDisplacement')
+    # add a multiply node to the displacement node
+    mult_node = nodes.new('ShaderNodeMath')
+    mult_node.operation = 'MULTIPLY'
+    mult_node.inputs[1].default_value = 0.1
+    links.new(tex_disp.outputs['Color'], mult_node.inputs[0])
+    links.new(mult_node.outputs[0], disp_node.inputs['Height'])
+    links.new(disp_node.outputs['Displacement'],  output.inputs['Displacement'])
+
+    # Create normal map texture node
+    tex_normal = nodes.new('ShaderNodeTexImage')
+    tex_normal.image = load_image(normal, non_color=True)
+    normal_node = nodes.new('ShaderNodeNormalMap')
+    links.new(tex_normal.outputs['Color'], bsdf.inputs['Normal'])
+
+    # Create roughness texture node
+    tex_rough = nodes.new('ShaderNodeTexImage')
+    tex_rough.image = load_image(roughness, non_color=True)
+    links.new(tex_rough.outputs['Color'], bsdf.inputs['Roughness'])
+
+    mat.cycles.displacement_method = 'BOTH'
+
+    return mat
+
+
 # Delete the default cube
 bpy.ops.object.delete()
 
@@ -32,52 +112,18 @@ sphere.scale = (2.5, 2.5, 2.5)
 # add subdivision
 bpy.ops.object.modifier_add(type='SUBSURF')
 
-sphere.modifiers[0].render_levels = 6
-bpy.ops.object.mode_set(mode = 'EDIT')
-bpy.ops.mesh.faces_shade_smooth()
+subsurf = sphere.modifiers[0]
+subsurf.levels = 1
+# shade smooth on the mesh data, without going through edit mode
+sphere.data.polygons.foreach_set('use_smooth', np.ones(len(sphere.data.polygons), dtype=bool))
 
-mat = bpy.data.materials.new(name="Brick_material")
+mat = build_pbr_material("Brick_material", TX_IMG, TX_DISP, TX_NORMAL, TX_ROUGH)
 sphere.data.materials.append(mat)
-mat.use_nodes=True
-
-nodes = mat.node_tree.nodes
-
-# Create principled BSDF node
-bsdf = mat.node_tree.nodes["Principled BSDF"]
-output = mat.node_tree.nodes["Material Output"]
-
-# Create an link base image texture node
-texImage = mat.node_tree.nodes.new('ShaderNodeTexImage')
-texImage.image = bpy.data.images.load(TX_IMG)
-mat.node_tree.links.new(texImage.outputs['Color'], bsdf.inputs['Base Color'])
-
-# Create displacement texture node
-tex_disp = mat.node_tree.nodes.new('ShaderNodeTexImage')
-tex_disp.image = bpy.data.images.load(TX_DISP)
-disp_node = mat.node_tree.nodes.new('ShaderNodeDisplacement')
-# add a multiply node to the displacement node
-mult_node = mat.node_tree.nodes.new('ShaderNodeMath')
-mult_node.operation = 'MULTIPLY'
-mult_node.inputs[1].default_value = 0.1
-mat.node_tree.links.new(tex_disp.outputs['Color'], mult_node.inputs[0])
-mat.node_tree.links.new(mult_node.outputs[0], disp_node.inputs['Height'])
-mat.node_tree.links.new(disp_node.outputs['Displacement'],  output.inputs['Displacement'])
-
-# Create normal map texture node
-tex_normal = mat.node_tree.nodes.new('ShaderNodeTexImage')
-tex_normal.image = bpy.data.images.load(TX_NORMAL)
-normal_node = mat.node_tree.nodes.new('ShaderNodeNormalMap')
-mat.node_tree.links.new(tex_normal.outputs['Color'], bsdf.inputs['Normal'])
-
-# Create roughness texture node
-tex_rough = mat.node_tree.nodes.new('ShaderNodeTexImage')
-tex_rough.image = bpy.data.images.load(TX_ROUGH)
-mat.node_tree.links.new(tex_rough.outputs['Color'], bsdf.inputs['Roughness'])
-
-mat.cycles.displacement_method = 'BOTH'
 
 set_hdri_background(C.scene, "resources/hdri/green_point_park_8k.exr")
 
+# cycles renders first, the other engines remove the subsurf modifier
+subsurf.render_levels = SUBSURF_RENDER_LEVELS
 cycles_render(scene, 'renders/cycles/texture_import.png')
 eevee_render(scene, 'renders/eevee/texture_import.png')
 workbench_render(scene, 'renders/workbench/texture_import.png')
@@ -40,14 +40,17 @@ def main():
                              invert=True,
                              colors ="viridis")
 
-    for _ in range(200):
-        point = np.random.normal(box_center, np.abs(bounding_box[:,0] - bounding_box[:,1])/8)
+    std = np.abs(bounding_box[:,0] - bounding_box[:,1])/8
+    points = np.random.normal(box_center, std, size=(200, 3))
 
-        distance_from_center = np.linalg.norm(point - box_center)
+    # look up the colors of all the points at once
+    distances_from_center = np.linalg.norm(points - box_center, axis=1)
+    colors = np.ones((len(points), 4))
+    colors[:, :3] = color_scale.get_colors(distances_from_center)
+    colors[:, 3] = 0.5  # alpha
 
-        color = list(color_scale.get_color(distance_from_center)) + [0.5]  # alpha
-
-        draw_points([point], color=color, radius=0.03)
+    # one call, all the points share the sphere mesh
+    draw_points(points, colors=colors, radius=0.03)
 
     # Render the scene
 
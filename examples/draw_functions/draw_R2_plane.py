@@ -1,11 +1,8 @@
 import argparse
-from hashlib import new
-from lib2to3.pgen2.token import OP
+import math
 import time
 from typing import Optional, Tuple, List
 
-import matplotlib.pyplot as plt
-
 import bpy
 import bmesh
 import mathutils
@@ -14,6 +11,8 @@ from blender_plotting.utils.background import set_pastel_background
 from blender_plotting.utils.materials import create_solid_material
 from blender_plotting.utils.renderers import cycles_render, eevee_render, workbench_render
 from blender_plotting.utils.scenes import create_2d_scene
+from blender_plotting.utils.shapes import create_cone_mesh, z_rotation_to
+from blender_plotting.utils.utils import deferred_scene_update
 
 
 def parse_args():
@@ -34,6 +33,50 @@ BG_LIGTNESS = 0.01
 BG_COLOR = (BG_LIGTNESS, BG_LIGTNESS, BG_LIGTNESS, 1.0)
 
 
+def to_3d(vector: np.ndarray) -> np.ndarray:
+    """Pad a 2D vector with a zero z coordinate, 3D vectors are returned as they are.
+
+    Args:
+        vector (np.ndarray): 2D or 3D vector.
+
+    Returns:
+        np.ndarray: 3D vector.
+    """
+    vector = np.asarray(vector, dtype=np.float64)
+    if vector.size == 3:
+        return vector
+    return np.array((vector[0], vector[1], 0.0))
+
+
+# Unit length body and head meshes shared by every arrow
+_UNIT_ARROW_MESHES = ()
+
+def get_unit_arrow_meshes() -> Tuple[bpy.types.Mesh, bpy.types.Mesh]:
+    """Get the unit length arrow body and head meshes, creating them on first use.
+
+    Returns:
+        Tuple[bpy.types.Mesh, bpy.types.Mesh]: The arrow body and head meshes.
+    """
+    global _UNIT_ARROW_MESHES
+
+    try:
+        _UNIT_ARROW_MESHES[0].name, _UNIT_ARROW_MESHES[1].name  # raises ReferenceError if a mesh was removed
+        return _UNIT_ARROW_MESHES
+    except (IndexError, ReferenceError):
+        pass
+
+    body = create_cone_mesh(radius1=0.01, radius2=0.01, depth=1, segments=16, name='arrow_body')
+    head = create_cone_mesh(radius1=0.05, radius2=0, depth=1, name='arrow_head')
+
+    # materials are set per object, the meshes only hold the slot
+    body.materials.append(None)
+    head.materials.append(None)
+
+    _UNIT_ARROW_MESHES = (body, head)
+
+    return _UNIT_ARROW_MESHES
+
+
 def add_arrow(vector_origin: np.ndarray,
               vector_end: np.ndarray,
               name: Optional[str] = None,
@@ -50,48 +93,40 @@ def add_arrow(vector_origin: np.ndarray,
         Tuple[bpy.types.Object, bpy.types.Object]: The arrow body and the arrow head.
     """
 
-    if vector_origin.size == 2:
-        vector_origin = np.append(vector_origin, 0)
-    if vector_end.size == 2:
-        vector_end = np.append(vector_end, 0)
+    vector_origin = to_3d(vector_origin)
+    vector_end = to_3d(vector_end)
 
 
     np_vector = vector_end - vector_origin
-    v = mathutils.Vector(np_vector)
-    up = mathutils.Vector((0,0,1))  # Z-Axis up convention
-    if v!=-up:
-        rot = up.rotation_difference(v)
-    else:
-        rot = mathutils.Quaternion((1,0,0),np.pi)
+    length = math.sqrt(np_vector.dot(np_vector))
+    direction = np_vector / length
+    rot = z_rotation_to(direction).tolist()  # Z-Axis up convention
+
+    body_mesh, head_mesh = get_unit_arrow_meshes()
+    collection = bpy.context.collection
+
+    # translation @ rotation @ scale, set at once instead of per property
+    rot_matrix = mathutils.Quaternion(rot).to_matrix().to_4x4()
+
+    def part_matrix(center, part_length):
+        return (mathutils.Matrix.Translation(center)
+                @ rot_matrix
+                @ mathutils.Matrix.Diagonal((1, 1, part_length, 1)))
 
     # Create the cylinder part
-    cyl_length = v.length*0.8
-    bpy.ops.mesh.primitive_cylinder_add(vertices=16,
-                                        radius=0.01,
-                                        depth=cyl_length,
-                                        end_fill_type='NGON',
-                                        enter_editmode=False)
-    cylinder = bpy.context.active_object
-    cylinder.location = vector_origin + cyl_length/2 * v.normalized()
+    cyl_length = length*0.8
+    cylinder = bpy.data.objects.new('arrow_body' if name is None else name + '_body', body_mesh)
+    collection.objects.link(cylinder)
     cylinder.rotation_mode = 'QUATERNION'
-    cylinder.rotation_quaternion = rot
-    if name is not None:
-        cylinder.name = name + '_body'
+    cylinder.matrix_basis = part_matrix(vector_origin + cyl_length/2 * direction, cyl_length)
 
     # Create the cone part
-    cone_length = v.length*0.2
-    bpy.ops.mesh.primitive_cone_add(
-        radius1=0.05,
-        radius2=0,
-        depth=cone_length,
-        enter_editmode=False)
-    # bpy.ops.mesh.faces_shade_smooth()
-    cone = bpy.context.active_object
-    cone.location = vector_origin + (cyl_length + cone_length/2) * v.normalized()
+    cone_length = length*0.2
+    cone = bpy.data.objects.new('arrow_head' if name is None else name + '_head', head_mesh)
+    collection.objects.link(cone)
     cone.rotation_mode = 'QUATERNION'
-    cone.rotation_quaternion = rot
-    if name is not None:
-        cone.name = name + '_head'
+    cone.matrix_basis = part_matrix(vector_origin + (cyl_length + cone_length/2) * direction,
+                                    cone_length)
 
     # Create the material
     if name is None:
@@ -99,83 +134,117 @@ def add_arrow(vector_origin: np.ndarray,
     else:
         arrow_mat = create_solid_material(color, name=name + '_color')
 
-    cylinder.data.materials.append(arrow_mat)
-    cone.data.materials.append(arrow_mat)
+    # the meshes are shared, so the material is linked to the objects
+    for obj in (cylinder, cone):
+        obj.material_slots[0].link = 'OBJECT'
+        obj.material_slots[0].material = arrow_mat
 
     return (cylinder, cone)
 
-def add_line(start: np.ndarray,
-             end: np.ndarray,
-             thickness: float = 0.1,
-             name: Optional[str] = None,
-             color: tuple = (1, 0, 0, 1.0),
-             material: Optional[bpy.types.Material] = None,
-             subdivisions: int = 20) -> bpy.types.Object:
-    """Add a line to the scene.
+def line_matrix(start: np.ndarray,
+                end: np.ndarray,
+                thickness: float) -> mathutils.Matrix:
+    """Transform of a unit cube into a line, same shape as the lines from add_line.
 
     Args:
-        origin (np.ndarray): Origin of the line.
+        start (np.ndarray): Start of the line.
         end (np.ndarray): End of the line.
         thickness (float): Thickness of the line.
-        name (Optional[str]): Name of the line.
-        color (tuple): Color of the line.
 
     Returns:
-        bpy.types.Object: The line.
+        mathutils.Matrix: The 4x4 transform.
     """
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+
+    line_vector = end - start
+    line_length = math.sqrt(line_vector.dot(line_vector))
+    dx, dy, dz = (line_vector / line_length).tolist()
+
+    # rotation from the x axis to the line, closed form of rotation_difference for a
+    # fixed x axis: the axis is x × d = (0, -dz, dy) and w = 1 + x · d
+    w = 1.0 + dx
+    if w < 1e-9:
+        # opposite to the x axis, half a turn around z
+        rot = mathutils.Quaternion((0, 0, 0, 1))
+    else:
+        s = 1.0 / math.sqrt(w*w + dy*dy + dz*dz)
+        rot = mathutils.Quaternion((w*s, 0, -dz*s, dy*s))
 
-    start = np.asarray(start)
-    end = np.asarray(end)
-
-    if start.size == 2:
-        start = np.append(start, 0)
-    if end.size == 2:
-        end = np.append(end, 0)
+    return (mathutils.Matrix.Translation((start + end) / 2)
+            @ rot.to_matrix().to_4x4()
+            @ mathutils.Matrix.Diagonal((line_length, thickness, 0.001, 1)))
 
-    # create a plane object
-    bpy.ops.mesh.primitive_cube_add(size=1, enter_editmode=False)  # Volume prevents merging issues
-    line = bpy.context.active_object
+# Subdivided unit cubes shared by the lines, keyed by the number of cuts
+_LINE_MESHES = {}
 
-    me = line.data
-    # New bmesh
-    bm = bmesh.new()
-    # load the mesh
-    bm.from_mesh(me)
+def get_line_mesh(subdivisions: int = 20) -> bpy.types.Mesh:
+    """Get the subdivided unit cube every line is made of, creating it on first use.
 
-    # subdivide
+    Args:
+        subdivisions (int): Cuts of each edge of the cube.
 
+    Returns:
+        bpy.types.Mesh: The line mesh.
+    """
+    mesh = _LINE_MESHES.get(subdivisions)
+    if mesh is not None:
+        try:
+            mesh.name  # raises ReferenceError if the mesh was removed
+            return mesh
+        except ReferenceError:
+            del _LINE_MESHES[subdivisions]
+
+    # Volume prevents merging issues
+    bm = bmesh.new()
+    bmesh.ops.create_cube(bm, size=1)
     bmesh.ops.subdivide_edges(bm,
                               edges=bm.edges,
                               cuts=subdivisions,
                               use_grid_fill=True,
                               )
 
-    # Write back to the mesh
+    mesh = bpy.data.meshes.new('line')
+    bm.to_mesh(mesh)
+    bm.free()
 
-    bm.to_mesh(me)
-    me.update()
+    # materials are set per object, the mesh only holds the slot
+    mesh.materials.append(None)
 
-    # strech the object to the desired size
-    line_length = np.linalg.norm(end - start)
-    line.scale = (line_length, thickness, 0.001)
+    _LINE_MESHES[subdivisions] = mesh
 
-    # rotate the object to the desired orientation
-    up = mathutils.Vector((1,0,0))
-    rot = up.rotation_difference(end - start)
-    line.rotation_mode = 'QUATERNION'
-    line.rotation_quaternion = rot
+    return mesh
 
+def add_line(start: np.ndarray,
+             end: np.ndarray,
+             thickness: float = 0.1,
+             name: Optional[str] = None,
+             color: tuple = (1, 0, 0, 1.0),
+             material: Optional[bpy.types.Material] = None,
+             subdivisions: int = 20) -> bpy.types.Object:
+    """Add a line to the scene.
 
-    # move the object to the desired location
-    line.location = (start + end) / 2
+    The lines share their mesh, a subdivided unit cube, and only differ in their transform.
 
-    # fix this orientation as the default
-    mb = line.matrix_basis
-    if hasattr(line.data, "transform"):
-        line.data.transform(mb)
-    for c in line.children:
-        c.matrix_local = mb @ c.matrix_local
-    line.matrix_basis.identity()
+    Args:
+        origin (np.ndarray): Origin of the line.
+        end (np.ndarray): End of the line.
+        thickness (float): Thickness of the line.
+        name (Optional[str]): Name of the line.
+        color (tuple): Color of the line.
+
+    Returns:
+        bpy.types.Object: The line.
+    """
+
+    start = to_3d(start)
+    end = to_3d(end)
+
+    line = bpy.data.objects.new('line' if name is None else name, get_line_mesh(subdivisions))
+    bpy.context.collection.objects.link(line)
+
+    # strech, rotate and move the cube to the line
+    line.matrix_world = line_matrix(start, end, thickness)
 
     # create the material
     if material is None:
@@ -186,7 +255,9 @@ def add_line(start: np.ndarray,
     else:
         line_mat = material
 
-    line.data.materials.append(line_mat)
+    # the mesh is shared, so the material is linked to the object
+    line.material_slots[0].link = 'OBJECT'
+    line.material_slots[0].material = line_mat
 
     return line
 
@@ -200,18 +271,15 @@ def merge_meshes(meshes: List[bpy.types.Object]) -> bpy.types.Object:
         bpy.types.Object: The merged mesh.
     """
 
-    # get objecs names
-    meshes_names = [obj.name for obj in meshes]
-
     # Deselect all meshes
     bpy.ops.object.select_all(action='DESELECT')
 
-    for o in bpy.data.objects:
-        # Check for given object names
-        if o.name in meshes_names:
-            o.select_set(True)
+    # select the given objects directly, instead of searching them by name
+    for obj in meshes:
+        obj.select_set(True)
 
-    # Select all meshes
+    # join into the first mesh
+    bpy.context.view_layer.objects.active = meshes[0]
     bpy.ops.object.join()
     merged_mesh = bpy.context.active_object
 
@@ -220,14 +288,19 @@ def merge_meshes(meshes: List[bpy.types.Object]) -> bpy.types.Object:
 def draw_grid(x_lim: Tuple[float, float],
               y_lim: Tuple[float, float],
               main_subdivision: float = 1,
-              minor_subdivision: float = 0.5) -> bpy.types.Object:
+              minor_subdivision: float = 0.5,
+              subdivisions: int = 20) -> bpy.types.Object:
     """Draw a grid on the scene.
 
+    All the lines are copies of the shared line mesh written to one object, the major and
+    minor lines use the first and second material of the mesh.
+
     Args:
         x_lim (Tuple[float, float]): X-axis limits.
         y_lim (Tuple[float, float]): Y-axis limits.
         main_subdivision (float): Main subdivision.
         minor_subdivision (float): Minor subdivision.
+        subdivisions (int): Cuts of each edge of the lines.
 
     Returns:
         bpy.types.Object: The grid.
@@ -240,61 +313,80 @@ def draw_grid(x_lim: Tuple[float, float],
     x_lim = np.asarray(x_lim)
     y_lim = np.asarray(y_lim)
 
-    # Prevent coplanar mesh weirdness in cycles
-    random_z = lambda z: z + (1-2*np.random.rand()) * 0.0001
-
-    # Create the minor grid
-    minor_grid_lines = []
+    # minor lines per major line, the major lines are skipped by index instead of a float %
+    step_ratio = int(round(main_subdivision / minor_subdivision))
+
+    def minor_positions(lim):
+        n_subdivisions = int(np.ceil((lim[1] - lim[0]) / minor_subdivision))
+        idxs = int(round(lim[0] / minor_subdivision)) + np.arange(n_subdivisions + 1)
+        positions = np.linspace(lim[0], lim[1], n_subdivisions + 1)
+        return positions[idxs % step_ratio != 0]
+
+    def major_positions(lim):
+        n_subdivisions = int(np.ceil((lim[1] - lim[0]) / main_subdivision))
+        return np.linspace(lim[0], lim[1], n_subdivisions + 1)
+
+    def grid_lines(xs, ys, z):
+        """(starts, ends) of the lines at each x along y_lim and at each y along x_lim."""
+        starts = np.concatenate((np.column_stack((xs, np.full_like(xs, y_lim[0]))),
+                                 np.column_stack((np.full_like(ys, x_lim[0]), ys))))
+        ends = np.concatenate((np.column_stack((xs, np.full_like(xs, y_lim[1]))),
+                               np.column_stack((np.full_like(ys, x_lim[1]), ys))))
+        # Prevent coplanar mesh weirdness in cycles
+        random_z = z + np.random.uniform(-0.0001, 0.0001, size=(2, len(starts)))
+        return np.column_stack((starts, random_z[0])), np.column_stack((ends, random_z[1]))
+
+    # start, end, thickness and material index of every line, minor lines first
+    minor_starts, minor_ends = grid_lines(minor_positions(x_lim), minor_positions(y_lim), -0.001)
+    major_starts, major_ends = grid_lines(major_positions(x_lim), major_positions(y_lim), 0)
+    starts = np.concatenate((minor_starts, major_starts))
+    ends = np.concatenate((minor_ends, major_ends))
+    thicknesses = np.repeat((MINOR_THICKNESS, MAIN_THICKNESS), (len(minor_starts), len(major_starts)))
+    material_indices = np.repeat((1, 0), (len(minor_starts), len(major_starts)))
+
+    # copy the shared line mesh once per line, transformed by numpy
+    line_mesh = get_line_mesh(subdivisions)
+    n_verts = len(line_mesh.vertices)
+    co = np.empty(n_verts * 3, dtype=np.float32)
+    line_mesh.vertices.foreach_get('co', co)
+    co = co.reshape(n_verts, 3)
+    loops = np.empty(len(line_mesh.loops), dtype=np.int32)
+    line_mesh.loops.foreach_get('vertex_index', loops)
+    loop_totals = np.empty(len(line_mesh.polygons), dtype=np.int32)
+    line_mesh.polygons.foreach_get('loop_total', loop_totals)
+
+    matrices = np.array([line_matrix(start, end, thickness)
+                         for start, end, thickness in zip(starts, ends, thicknesses)])
+    n_lines = len(matrices)
+
+    vertices = np.einsum('nij,vj->nvi', matrices[:, :3, :3], co) + matrices[:, None, :3, 3]
+    all_loops = (loops[None, :] + n_verts * np.arange(n_lines)[:, None]).ravel()
+    all_loop_totals = np.tile(loop_totals, n_lines)
+    loop_starts = np.concatenate(([0], np.cumsum(all_loop_totals)[:-1])).astype(np.int32)
+
+    me = bpy.data.meshes.new('grid')
+
+    me.vertices.add(n_lines * n_verts)
+    me.vertices.foreach_set('co', vertices.astype(np.float32).ravel())
+
+    me.loops.add(len(all_loops))
+    me.loops.foreach_set('vertex_index', all_loops.astype(np.int32))
+
+    me.polygons.add(len(all_loop_totals))
+    me.polygons.foreach_set('loop_start', loop_starts)
+    me.polygons.foreach_set('loop_total', all_loop_totals)
+    me.polygons.foreach_set('material_index', np.repeat(material_indices, len(loop_totals)).astype(np.int32))
+
+    me.update(calc_edges=True)
 
     # create materials
-    minor_grid_mat = create_solid_material(MINOR_COLOR)
-    major_grid_mat = create_solid_material(MAJOR_COLOR)
-
-    x_minor_n_subdivisions = int(np.ceil((x_lim[1] - x_lim[0]) / minor_subdivision))
-    for x in np.linspace(x_lim[0], x_lim[1], x_minor_n_subdivisions + 1):
-        # if not in major grid
-        if x % main_subdivision != 0:
-            line = add_line((x, y_lim[0], random_z(-0.001)),
-                            (x, y_lim[1], random_z(-0.001)),
-                            name=f'grid_x_minor{x}',
-                            thickness=MINOR_THICKNESS,
-                            material=minor_grid_mat)
-            minor_grid_lines.append(line)
-
-    y_minor_n_subdivisions = int(np.ceil((y_lim[1] - y_lim[0]) / minor_subdivision))
-    for y in np.linspace(y_lim[0], y_lim[1], y_minor_n_subdivisions + 1):
-        # if not in major grid
-        if y % main_subdivision != 0:
-            line = add_line((x_lim[0], y, random_z(-0.001)),
-                            (x_lim[1], y, random_z(-0.001)),
-                            name=f'grid_y_minor{y}',
-                            thickness=MINOR_THICKNESS,
-                            material=minor_grid_mat)
-            minor_grid_lines.append(line)
-
-    # Create the grid
-    major_grid_lines = []
-
-    x_major_n_subdivisions = int(np.ceil((x_lim[1] - x_lim[0]) / main_subdivision))
-    for x in np.linspace(x_lim[0], x_lim[1], x_major_n_subdivisions + 1):
-        line = add_line((x, y_lim[0], random_z(0)),
-                        (x, y_lim[1], random_z(0)),
-                        name='grid_x',
-                        thickness=MAIN_THICKNESS,
-                        material=major_grid_mat)
-        major_grid_lines.append(line)
-
-    y_major_n_subdivisions = int(np.ceil((y_lim[1] - y_lim[0]) / main_subdivision))
-    for y in np.linspace(y_lim[0], y_lim[1], y_major_n_subdivisions + 1):
-        line = add_line((x_lim[0], y, random_z(0)),
-                        (x_lim[1], y, random_z(0)),
-                        name='grid_y',
-                        thickness=MAIN_THICKNESS,
-                        material=major_grid_mat)
-        major_grid_lines.append(line)
-
-    # Merge the grids
-    return major_grid_lines , minor_grid_lines
+    me.materials.append(create_solid_material(MAJOR_COLOR))
+    me.materials.append(create_solid_material(MINOR_COLOR))
+
+    grid = bpy.data.objects.new('grid', me)
+    bpy.context.collection.objects.link(grid)
+
+    return grid
 
 def main():
 
@@ -307,45 +399,49 @@ def main():
     # Create the scene
     scene, camera = create_2d_scene(X_LIM, Y_LIM)
 
-    origin = np.array([0, 0, 0])
+    # build the axes and the grid without undo steps or intermediate scene updates
+    with deferred_scene_update():
+        origin = np.array([0, 0, 0])
 
-    t_start = time.time()
-    vector = np.array([1, 0, 0])
-    x_axis = add_arrow(origin, vector,
-                    name = 'x_axis',
-                    color = (1, 0, 0, 1.0))
+        t_start = time.time()
+        vector = np.array([1, 0, 0])
+        x_axis = add_arrow(origin, vector,
+                        name = 'x_axis',
+                        color = (1, 0, 0, 1.0))
 
-    vector = np.array([0, 1, 0])
-    y_axis = add_arrow(origin, vector,
-                    name = 'y_axis',
-                    color = (0, 1, 0, 1.0))
-    print(f'Time to create axes: {time.time() - t_start}')
+        vector = np.array([0, 1, 0])
+        y_axis = add_arrow(origin, vector,
+                        name = 'y_axis',
+                        color = (0, 1, 0, 1.0))
+        print(f'Time to create axes: {time.time() - t_start}')
 
-    set_pastel_background(scene, BG_COLOR)
+        set_pastel_background(scene, BG_COLOR)
 
-    resolution_x = int(DPI * (X_LIM[1] - X_LIM[0]) / 2)
-    resolution_y = int(DPI * (Y_LIM[1] - Y_LIM[0]) / 2)
+        resolution_x = int(DPI * (X_LIM[1] - X_LIM[0]) / 2)
+        resolution_y = int(DPI * (Y_LIM[1] - Y_LIM[0]) / 2)
 
 
-    # Create the grid
-    t_start = time.time()
-    grids = draw_grid(X_LIM, Y_LIM, main_subdivision=1, minor_subdivision=0.1)
-    print(f'Time to draw grid: {time.time() - t_start}')
+        # Create the grid
+        t_start = time.time()
+        grid = draw_grid(X_LIM, Y_LIM, main_subdivision=1, minor_subdivision=0.1)
+        print(f'Time to draw grid: {time.time() - t_start}')
 
     # get grid vertices
     t_start = time.time()
-    for grid in grids:
-        for line in grid:
-            me = line.data
-            mat = line.matrix_world
-            me.transform(mat)
-
-            for vert in me.vertices:
-                new_location = vert.co
-                new_location[1] = new_location[0] * np.sign(new_location[1])
-                vert.co = new_location
-
-            line.matrix_world = mathutils.Matrix()
+    me = grid.data
+
+    coords = np.empty(len(me.vertices) * 3, dtype=np.float32)
+    me.vertices.foreach_get('co', coords)
+    coords = coords.reshape(-1, 3)
+
+    # apply the world matrix together with the deformation
+    mat = np.array(grid.matrix_world, dtype=np.float32)
+    coords = coords @ mat[:3, :3].T + mat[:3, 3]
+    coords[:, 1] = coords[:, 0] * np.sign(coords[:, 1])
+    me.vertices.foreach_set('co', coords.ravel())
+    me.update()
+
+    grid.matrix_world = mathutils.Matrix()
 
     print(f'Time to apply transofmation: {time.time() - t_start}')
 
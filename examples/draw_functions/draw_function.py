@@ -8,7 +8,7 @@ from blender_plotting.utils.background import set_pastel_background
 from blender_plotting.utils.materials import create_solid_material
 from blender_plotting.utils.renderers import cycles_render, eevee_render, workbench_render
 from blender_plotting.utils.scenes import create_2d_scene
-from blender_plotting.utils.shapes import add_arrow
+from blender_plotting.utils.shapes import add_arrow, create_uv_sphere_mesh
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Draw a R2 plane.')
@@ -52,7 +52,19 @@ def draw_function(f: Callable[[float], float],
         bpy.types.Object: The curve.
     """
 
-    coords_list = [[x, f(x), 0] for x in np.linspace(x_min, x_max, control_points)]
+    # (x, y, z, w) coordinates, f is evaluated for all the x values at once if possible
+    xs = np.linspace(x_min, x_max, control_points)
+    coords = np.zeros((control_points, 4), dtype=np.float32)
+    coords[:, 0] = xs
+    try:
+        ys = np.asarray(f(xs), dtype=float)
+    except TypeError:
+        ys = None
+    # fall back to one call per x for functions that do not broadcast
+    if ys is None or ys.shape != xs.shape:
+        ys = np.array([f(x) for x in xs], dtype=float)
+    coords[:, 1] = ys
+    coords[:, 3] = 1.0
 
     curve_data = bpy.data.curves.new('crv', 'CURVE')
     curve_data.dimensions = '3D'
@@ -61,9 +73,8 @@ def draw_function(f: Callable[[float], float],
     curve_data.bevel_depth = thickness
 
     spline = curve_data.splines.new(type='POLY')
-    spline.points.add(len(coords_list) - 1)
-    for p, new_co in zip(spline.points, coords_list):
-        p.co = (new_co + [1.0])  # (add nurbs
+    spline.points.add(control_points - 1)
+    spline.points.foreach_set('co', coords.ravel())
     curve = bpy.data.objects.new('object_name', curve_data)
     bpy.data.scenes[0].collection.objects.link(curve)
 
@@ -84,12 +95,16 @@ def draw_points(points: List[Tuple[float, float, float]],
         List[bpy.types.Object]: List of points.
     """
 
-    points_objs = []
+    # All the points share the same sphere mesh and material
+    sphere_mesh = create_uv_sphere_mesh(radius=radius, name='point')
+    sphere_mesh.materials.append(create_solid_material(color))
 
-    for point in points:
-        bpy.ops.mesh.primitive_uv_sphere_add(radius=radius, location=point)
-        points_objs.append(bpy.context.object)
-        bpy.context.object.data.materials.append(create_solid_material(color))
+    points_objs = []
+    for i, point in enumerate(points):
+        point_obj = bpy.data.objects.new(f'point_{i}', sphere_mesh)
+        point_obj.location = point
+        bpy.context.collection.objects.link(point_obj)
+        points_objs.append(point_obj)
 
     return points_objs
 
@@ -115,6 +130,9 @@ def draw_line(points: List[Tuple[float, float, float]],
         bpy.types.Object: The line.
     """
 
+    # the line and the markers share the same material
+    mat = create_solid_material(color)
+
     if draw_line:
         curve_data = bpy.data.curves.new('crv', 'CURVE')
         curve_data.dimensions = '3D'
@@ -124,16 +142,22 @@ def draw_line(points: List[Tuple[float, float, float]],
 
         spline = curve_data.splines.new(type='POLY')
         spline.points.add(len(points) - 1)
-        for p, new_co in zip(spline.points, points):
-            p.co = (new_co + [1.0])
+        # (x, y, z, w) coordinates written in a single call
+        coords = np.ones((len(points), 4), dtype=np.float32)
+        coords[:, :3] = np.asarray(points, dtype=np.float32)
+        spline.points.foreach_set('co', coords.ravel())
         curve = bpy.data.objects.new('object_name', curve_data)
-        curve.data.materials.append(create_solid_material(color))
+        curve.data.materials.append(mat)
         bpy.data.scenes[0].collection.objects.link(curve)
 
     if draw_markers:
-        for point in points:
-            bpy.ops.mesh.primitive_uv_sphere_add(radius=marker_radius, location=point)
-            bpy.context.object.data.materials.append(create_solid_material(color))
+        marker_mesh = create_uv_sphere_mesh(radius=marker_radius, name='marker')
+        marker_mesh.materials.append(mat)
+        collection_objects = bpy.data.scenes[0].collection.objects
+        for i, point in enumerate(points):
+            marker = bpy.data.objects.new(f'marker_{i}', marker_mesh)
+            marker.location = point
+            collection_objects.link(marker)
 
 
 def main():
@@ -156,7 +180,8 @@ def main():
     curve = draw_function(f, -3, 3, control_points=200)
 
     # Draw the points
-    points = draw_points([(x, f(x), 0) for x in np.linspace(-3, 3, 5)], (0, 1, 0, 1.0))
+    point_xs = np.linspace(-3, 3, 5)
+    points = draw_points(np.column_stack((point_xs, f(point_xs), np.zeros_like(point_xs))), (0, 1, 0, 1.0))
 
 
     print(points[0].material_slots[0].material)
@@ -31,8 +31,9 @@ def main():
     # 90 degree rotation matrix
     R = np.array([[0, 1], [-1, 0]])
 
-    # Vector field rotation
-    f = lambda x, y: R @ np.array([x, y])
+    # Vector field rotation, tensordot broadcasts over the grid so draw_vector_field
+    # evaluates it in a single call
+    f = lambda x, y: np.tensordot(R, np.array([x, y]), axes=1)
 
     max_length = np.linalg.norm(np.array([2, 2]))
     min_length = 0